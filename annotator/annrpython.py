@@ -58,7 +58,8 @@ class RPythonAnnotator(object):
 
     def __getstate__(self):
         attrs = """translator genpendingblocks annotated links_followed
-        notify bookkeeper frozen policy added_blocks""".split()
+        notify bookkeeper frozen policy added_blocks fixed_graphs
+        keepgoing failed_blocks errors""".split()
         ret = self.__dict__.copy()
         for key, value in ret.items():
             if key not in attrs:
@@ -47,7 +47,9 @@ class Bookkeeper(object):
 
     def __setstate__(self, dic):
         self.__dict__.update(dic) # normal action
-        self.register_builtins()
+        # the classdefs of the standard exceptions are part of the state,
+        # which may not be fully loaded yet
+        import rpython.annotator.builtin  # for side-effects
 
     def __init__(self, annotator):
         self.annotator = annotator
@@ -4,6 +4,7 @@ var fs = require('fs');
 var path = require('path');
 var process = require('process');
 var child_process = require('child_process');
+var crypto = require('crypto');
 var rpython = path.join(__dirname, 'rpython');
 var rpydir = path.join(rpython, '../..')
 var platform = os.platform();
@@ -27,6 +28,96 @@ function cygpath(fullpath) {
   return child_process.execSync("cygpath '" + fullpath + "'").toString().trim();
 }
 
+function hash_files(directory, filter, hash, stat_only) {
+  //Feeds every matching file under directory into hash in a stable order, by content or (stat_only) by path, size and mtime
+  var entries;
+  try {
+    entries = fs.readdirSync(directory, {withFileTypes: true});
+  }
+  catch (error) {
+    return;
+  }
+  entries.sort(function (first, second) {return first.name < second.name ? -1 : first.name > second.name ? 1 : 0});
+  for (var entry of entries) {
+    if (entry.name[0] === '.' || entry.name === 'node_modules' || entry.name === '__pycache__' || entry.name === '_cache') continue;
+    var fullpath = path.join(directory, entry.name);
+    if (entry.isDirectory()) hash_files(fullpath, filter, hash, stat_only);
+    else if (entry.isFile() && filter.test(entry.name)) {
+      hash.update(fullpath + '\0');
+      if (stat_only) {
+        var stat = fs.statSync(fullpath);
+        hash.update(stat.size + ':' + stat.mtimeMs + '\0');
+      }
+      else hash.update(fs.readFileSync(fullpath));
+    }
+  }
+}
+
+function sync_directory(source, destination) {
+  //Copies only the files whose content changed so make keeps the objects of untouched C files, and drops sources that are gone
+  fs.mkdirSync(destination, {recursive: true});
+  var names = {};
+  for (var entry of fs.readdirSync(source, {withFileTypes: true})) {
+    var from = path.join(source, entry.name);
+    var to = path.join(destination, entry.name);
+    names[entry.name] = true;
+    if (entry.isDirectory()) {
+      sync_directory(from, to);
+      continue;
+    }
+    var content = fs.readFileSync(from);
+    if (fs.existsSync(to) && fs.readFileSync(to).equals(content)) continue;
+    fs.writeFileSync(to, content);
+  }
+  for (var name of fs.readdirSync(destination)) {
+    if (!names[name] && /\.(c|h)$/.test(name)) fs.unlinkSync(path.join(destination, name));
+  }
+}
+
+function hash_file(filename) {
+  try {
+    return crypto.createHash('sha256').update(fs.readFileSync(filename)).digest('hex');
+  }
+  catch (error) {
+    return null;
+  }
+}
+
+function read_dependencies(filename) {
+  //The translation writes every module it imported; the ones inside the RPython tree are already covered by the cache key
+  var dependencies = {};
+  var root = path.resolve(rpydir) + path.sep;
+  for (var module of fs.readFileSync(filename).toString().split('\n')) {
+    if (!module || path.resolve(module).startsWith(root)) continue;
+    dependencies[module] = hash_file(module);
+  }
+  return dependencies;
+}
+
+function restore_outputs(directory) {
+  var manifest = path.join(directory, 'manifest.json');
+  if (!fs.existsSync(manifest)) return false;
+  var filenames = JSON.parse(fs.readFileSync(manifest));
+  if (!filenames.every(function (filename) {return fs.existsSync(path.join(directory, filename))})) return false;
+  var dependencies = path.join(directory, 'dependencies.json');
+  if (!fs.existsSync(dependencies)) return false;
+  dependencies = JSON.parse(fs.readFileSync(dependencies));
+  for (var module in dependencies) if (hash_file(module) !== dependencies[module]) return false;
+  for (var filename of filenames) fs.copyFileSync(path.join(directory, filename), path.join(process.cwd(), filename));
+  return true;
+}
+
+function save_outputs(directory, filenames, dependencies) {
+  fs.mkdirSync(directory, {recursive: true});
+  var manifest = path.join(directory, 'manifest.json');
+  if (fs.existsSync(manifest)) fs.unlinkSync(manifest);
+  for (var filename of filenames) fs.copyFileSync(path.join(process.cwd(), filename), path.join(directory, filename));
+  fs.writeFileSync(path.join(directory, 'dependencies.json'), JSON.stringify(dependencies));
+  //The manifest is written last so an interrupted save is never picked up as a hit
+  fs.writeFileSync(manifest + '.tmp', JSON.stringify(filenames));
+  fs.renameSync(manifest + '.tmp', manifest);
+}
+
 if (platform === 'win32') {
   if (!check_exist('cygpath')) {
     throw new Error("Currently the only possible way to compile WASM RPython programs on Windows is with Cygwin, make sure to install python2.7, gcc-core and make on the Cygwin installer. And delete /usr/bin/python on Cygwin (It interferes with emscripten's Python 3)");
@@ -39,19 +130,88 @@ function deserialize_rpython_json(object) {
   if (Array.isArray(object)) object.forEach(function (each, index) {
     if (Array.isArray(each)) deserialize_rpython_json(each);
     else if (each && typeof each === 'object') deserialize_rpython_json(each);
-    else if (typeof each === 'string' && each.startsWith('RPYJSOBJECT:') && each.endsWith(':RPYJSOBJECT')) object[index] = global[each.slice(12, -12)];
+    else if (typeof each === 'string' && each.startsWith('RPYJSOBJECT:') && each.endsWith(':RPYJSOBJECT')) object[index] = global.rpython_handles[+each.slice(12, -12)];
     else if (each && typeof each === 'object') deserialize_rpython_json(each);
   });
-  else if (typeof object === 'string' && object.startsWith('RPYJSOBJECT:') && object.endsWith(':RPYJSOBJECT')) object = global[object.slice(12, -12)];
+  else if (typeof object === 'string' && object.startsWith('RPYJSOBJECT:') && object.endsWith(':RPYJSOBJECT')) object = global.rpython_handles[+object.slice(12, -12)];
   else if (object && typeof object === 'object') for (var key in object) {
     var each = object[key];
     if (Array.isArray(each)) deserialize_rpython_json(each);
-    else if (typeof each === 'string' && each.startsWith('RPYJSOBJECT:') && each.endsWith(':RPYJSOBJECT')) object[key] = global[each.slice(12, -12)];
+    else if (typeof each === 'string' && each.startsWith('RPYJSOBJECT:') && each.endsWith(':RPYJSOBJECT')) object[key] = global.rpython_handles[+each.slice(12, -12)];
     else if (each && typeof each === 'object') deserialize_rpython_json(each);
   }
   return object;
 }
 
+function deserialize_rpython_arguments(pointer) {
+  //Decodes the binary argument list written by javascript/bridge.py
+  var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
+  var view = new DataView(HEAPU8.buffer);
+  var count = view.getInt32(pointer, true);
+  var offset = pointer + 4;
+  var args = new Array(count);
+  var decoder = null;
+  for (var index = 0; index < count; index++) {
+    var tag = HEAPU8[offset++];
+    var length;
+    if (tag === 0) args[index] = null;
+    else if (tag === 1) args[index] = true;
+    else if (tag === 2) args[index] = false;
+    else if (tag === 3) {
+      args[index] = view.getInt32(offset, true);
+      offset += 4;
+    }
+    else if (tag === 4) {
+      args[index] = view.getFloat64(offset, true);
+      offset += 8;
+    }
+    else if (tag === 6) {
+      args[index] = global.rpython_handles[view.getInt32(offset, true)];
+      offset += 4;
+    }
+    else {
+      length = view.getInt32(offset, true);
+      //Decode the exact byte range: UTF8ArrayToString would stop at an embedded NUL
+      decoder = decoder || global.rpython_text_decoder || (global.rpython_text_decoder = new TextDecoder('utf-8'));
+      args[index] = decoder.decode(HEAPU8.subarray(offset + 4, offset + 4 + length));
+      if (tag === 7) args[index] = global.deserialize_rpython_json(JSON.parse(args[index]));
+      offset += 4 + length;
+    }
+  }
+  return args;
+}
+
+function write_rpython_result(value, buffer, size) {
+  //Writes a result string into the caller-provided buffer, falling back to _malloc when it does not fit
+  var lengthBytes = lengthBytesUTF8(value) + 1;
+  if (lengthBytes > size) buffer = _malloc(lengthBytes);
+  stringToUTF8(value, buffer, lengthBytes);
+  return buffer;
+}
+
+function bind_rpython_method(receiver, key, value) {
+  //Inline cache for property reads: whether a function is a plain method is decided once per function (so once per prototype),
+  //and every (receiver, key) pair reuses its bound function for as long as the property still holds the same function
+  var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
+  if (typeof value !== 'function') return value;
+  var methods = global.rpython_methods || (global.rpython_methods = new WeakMap());
+  var isMethod = methods.get(value);
+  if (isMethod === undefined) {
+    isMethod = !value.prototype || Object.getOwnPropertyNames(value.prototype).length === 1;
+    methods.set(value, isMethod);
+  }
+  if (!isMethod) return value;
+  if (receiver === null || (typeof receiver !== 'object' && typeof receiver !== 'function')) return value.bind(receiver);
+  var receivers = global.rpython_bound_methods || (global.rpython_bound_methods = new WeakMap());
+  var cache = receivers.get(receiver);
+  if (!cache) receivers.set(receiver, cache = new Map());
+  var entry = cache.get(key);
+  if (entry && entry.method === value) return entry.bound;
+  entry = {method: value, bound: value.bind(receiver)};
+  cache.set(key, entry);
+  return entry.bound;
+}
+
 function rpythonShrinkToInitial(copy) {
   var newBuffer = new ArrayBuffer(copy.byteLength);
   var newHEAP8 = new Int8Array(newBuffer);
@@ -90,7 +250,33 @@ fs.mkdirSync(tempdir);
 process.env.RPYTHON_TARGET_FILE = process.argv[2];
 process.env.PYPY_USESSION_DIR = platform === 'win32' ? cygpath(tempdir) : tempdir;
 process.env.USER = 'current';
-child_process.execSync([python, rpython, '--gc=none', '--no-translation-jit', '-s'].concat(process.argv.slice(2)).join(' '), {stdio: 'inherit', env: process.env});
+
+//Build cache: the final outputs of a target are stored under a key made of its path, the RPython tree and the flags,
+//and are only reused while every module the translation imported still has the same content.
+//Every target also keeps a build directory where make only recompiles the C files whose source or headers changed
+var use_cache = !!process.argv[2] && process.argv[2].indexOf('.py') !== -1 && process.argv.indexOf('--no-cache') === -1 && !process.env.RPYTHON_NO_CACHE;
+var cache_root = process.env.RPYTHON_CACHE_DIR || path.join(os.homedir(), '.cache', 'rpython');
+var cache_directory = null;
+var build_directory = null;
+if (use_cache) {
+  var flags = process.argv.slice(2).filter(function (arg) {return arg !== '--no-cache'}).join(' ');
+  var hash = crypto.createHash('sha256');
+  hash.update(flags + '\0' + path.resolve(process.argv[2]) + '\0');
+  hash_files(rpydir, /\.(py|c|h|js)$/, hash, true);
+  if (!use_docker) hash.update(child_process.execSync(emcc + ' --version').toString());
+  cache_directory = path.join(cache_root, 'outputs', hash.digest('hex'));
+  build_directory = path.join(cache_root, 'builds', crypto.createHash('sha256').update(path.resolve(process.argv[2]) + '\0' + flags).digest('hex'));
+  if (restore_outputs(cache_directory)) {
+    console.log('Nothing changed, using the cached build from ' + cache_directory);
+    fs.rmdirSync(tempdir);
+    process.exit(0);
+  }
+  process.env.RPYTHON_DEPS_FILE = path.join(tempdir, 'dependencies.txt');
+}
+
+//In the reused build directory --stable-sources keeps the C file names and contents of unchanged functions stable and adds header dependencies to the Makefile
+var translation_flags = ['--gc=none', '--no-translation-jit', '-s'].concat(build_directory && !use_docker ? ['--stable-sources'] : []);
+child_process.execSync([python, rpython].concat(translation_flags, process.argv.slice(2)).join(' '), {stdio: 'inherit', env: process.env});
 async function handle() {
   var file = process.argv[2].split('.py')[0];
   var usession = path.join(tempdir, 'usession-unknown-0');
@@ -108,6 +294,10 @@ async function handle() {
   make = make.replace('TARGET = ', 'TARGET = ' + file + '.js #');
   make = make.replace('DEFAULT_TARGET = ', 'DEFAULT_TARGET = ' + file + '.js #');
   fs.writeFileSync(makefile, make);
+  if (build_directory && !use_docker) {
+    sync_directory(usession, build_directory);
+    directory = path.join(build_directory, 'testing_1');
+  }
   var cores = process.env.CORE;
   if (!cores) cores = os.cpus().filter(function(cpu) {return cpu.speed}).length;
   if (!cores) cores = child_process.execSync('nproc').toString().trim();
@@ -139,23 +329,27 @@ async function handle() {
     child_process.execSync(`docker cp ${namedir}:/rpython/${namedir}/usession-unknown-0 ${tempdir}`);
     child_process.execSync('docker rm ' + namedir);
   }
+  var outputs = [];
   for (var filename of fs.readdirSync(directory)) {
-    if (filename.startsWith(file + '.')) {
+    if (filename.startsWith(file + '.') && !filename.endsWith('.o')) {
+      outputs.push(filename);
       if (use_wasm || filename !== (file + '.js')) fs.copyFileSync(path.join(directory, filename), path.join(process.cwd(), filename));
       else fs.writeFileSync(path.join(process.cwd(), filename), fs.readFileSync(path.join(directory, filename)).toString().replace('bufferView = HEAPU8;', 'bufferView = HEAPU8;\nModule.rpythonShrinkToInitial = ' + rpythonShrinkToInitial.toString()));
     }
   }
   try {
-    fs.appendFileSync(path.join(process.cwd(), file + '.js' ), '\n' + deserialize_rpython_json.toString() + '\nModule.wasmMemory = wasmMemory;\nvar rpyGlobalArg = {"Module": Module, "deserialize_rpython_json": deserialize_rpython_json, "get_dirname": function () {return __dirname;}};\nrpyGlobalArg.global = rpyGlobalArg;\n if (typeof window !== "undefined") rpyGlobalArg.window = window;\n if (typeof require !== "undefined") rpyGlobalArg.require = require;\n if (typeof self !== "undefined") rpyGlobalArg.self = self;\n if (typeof global !== "undefined") rpyGlobalArg.node = global;\nif (!WebAssembly.Module.customSections) WebAssembly.Module.customSections = () => [];');
+    fs.appendFileSync(path.join(process.cwd(), file + '.js' ), '\n' + deserialize_rpython_json.toString() + '\n' + deserialize_rpython_arguments.toString() + '\n' + write_rpython_result.toString() + '\n' + bind_rpython_method.toString() + '\nModule.wasmMemory = wasmMemory;\nvar rpyGlobalArg = {"Module": Module, "deserialize_rpython_json": deserialize_rpython_json, "deserialize_rpython_arguments": deserialize_rpython_arguments, "write_rpython_result": write_rpython_result, "bind_rpython_method": bind_rpython_method, "get_dirname": function () {return __dirname;}};\nrpyGlobalArg.global = rpyGlobalArg;\n if (typeof window !== "undefined") rpyGlobalArg.window = window;\n if (typeof require !== "undefined") rpyGlobalArg.require = require;\n if (typeof self !== "undefined") rpyGlobalArg.self = self;\n if (typeof global !== "undefined") rpyGlobalArg.node = global;\nif (!WebAssembly.Module.customSections) WebAssembly.Module.customSections = () => [];');
     if (source_flag) {
       var source_map = JSON.parse(require('fs').readFileSync(path.join(directory, file + '.wasm.map')));
       source_map.sources.forEach(function (filename, index) {
         var basename = path.basename(filename);
         fs.copyFileSync(path.join(directory, filename), path.join(process.cwd(), basename));
+        outputs.push(basename);
         if (basename !== filename) source_map.sources[index] = basename;
       });
       fs.writeFileSync(path.join(process.cwd(), file + '.wasm.map'), JSON.stringify(source_map));
     }
+    if (cache_directory) save_outputs(cache_directory, outputs, read_dependencies(process.env.RPYTHON_DEPS_FILE));
     if (process.argv.indexOf('--keep-temp') !== -1) process.exit();
     try {
       if (!process.env.KEEP_TMP) {
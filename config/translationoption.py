@@ -152,6 +152,17 @@ translation_optiondescription = OptionDescription(
                  ["annotate", "rtype", "backendopt", "database", "source",
                   "pyjitpl"],
                  default=None, cmdline="--fork-before"),
+    BoolOption("fork_tasks",
+               "(UNIX) Run the steps that do not change the translation "
+               "state, like llinterpret and jittest, in forked processes "
+               "next to the other steps", default=False, cmdline="--fork-tasks"),
+    StrOption("checkpoint_dir",
+              "Save the state of the translation after every step into "
+              "this directory", default=None, cmdline="--checkpoint-dir"),
+    ChoiceOption("resume_from",
+                 "Resume from the state saved by --checkpoint-dir after step",
+                 ["annotate", "rtype", "backendopt", "database", "source"],
+                 default=None, cmdline="--resume-from"),
     BoolOption("dont_write_c_files",
                "Make the C backend write everyting to /dev/null. " +
                "Useful for benchmarking, so you don't actually involve the disk",
@@ -200,6 +211,20 @@ translation_optiondescription = OptionDescription(
     BoolOption("lldebug0",
                "If true, makes an lldebug0 build", default=False,
                cmdline="--lldebug0"),
+    IntOption("parallel_flowgraphs",
+              "Number of worker processes building flow graphs ahead of "
+              "the annotator (experimental, 0 to disable)",
+              default=0, cmdline="--parallel-flowgraphs"),
+    BoolOption("stable_sources",
+               "Split the generated C files by originating module with "
+               "deterministic names and only rewrite the files whose "
+               "content changed, for incremental rebuilds",
+               default=False, cmdline="--stable-sources"),
+    IntOption("object_cache_size",
+              "Reuse the object files compiled by Platform.compile() "
+              "across translations, in a cache of this many MB under "
+              "_cache (0 to disable)",
+              default=0, cmdline="--object-cache-size"),
     BoolOption("lto", "enable link time optimization",
                default=False, cmdline="--lto",
                requires=[("translation.gcrootfinder", "shadowstack")]),
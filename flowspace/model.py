@@ -308,6 +308,29 @@ class Variable(object):
     def __repr__(self):
         return self.name
 
+    def __getstate__(self):
+        state = {}
+        for key in self.__slots__:
+            if hasattr(self, key):
+                state[key] = getattr(self, key)
+        return state
+
+    def __setstate__(self, state):
+        # the prefixes are compared by identity, and the numbers already
+        # given must not be given again
+        name = state.pop('_name')
+        if name == self.dummyname:
+            name = self.dummyname
+        else:
+            name = self.namesdict.setdefault(name, (name, 0))[0]
+        nr = state.pop('_nr')
+        if nr >= self.namesdict[name][1]:
+            self.namesdict[name] = (name, nr + 1)
+        self._name = name
+        self._nr = nr
+        for key, value in state.items():
+            setattr(self, key, value)
+
     def rename(self, name):
         if self._name is not self.dummyname:   # don't rename several times
             return
@@ -0,0 +1,180 @@
+from rpython.rtyper.lltypesystem import lltype, rffi
+from rpython.rlib.longlong2float import float2longlong
+from rpython.rlib.rarithmetic import intmask
+
+#Binary encoding of call arguments, decoded on the JS side by deserialize_rpython_arguments (see bin/compile.js)
+#Layout: int32 count, then for every argument a one byte tag followed by its payload (all little-endian)
+
+TAG_NULL = 0
+TAG_TRUE = 1
+TAG_FALSE = 2
+TAG_INTEGER = 3 #int32
+TAG_FLOAT = 4 #float64
+TAG_STRING = 5 #int32 length + UTF-8 bytes
+TAG_HANDLE = 6 #int32 handle of a javascript.Object
+TAG_JSON = 7 #int32 length + JSON text, for lists, dicts and escaped strings
+
+class ScratchBuffer:
+
+    def __init__(self, size=256):
+        self.initial_size = size
+        self.size = 0
+        self.length = 0
+        self.buffer = lltype.nullptr(rffi.CCHARP.TO)
+
+    def reserve(self, extra):
+        needed = self.length + extra
+        if needed <= self.size: return
+        size = max(self.size * 2, self.initial_size)
+        while size < needed: size *= 2
+        buffer = lltype.malloc(rffi.CCHARP.TO, size, flavor='raw')
+        if self.buffer:
+           rffi.c_memcpy(rffi.cast(rffi.VOIDP, buffer), rffi.cast(rffi.VOIDP, self.buffer), self.length)
+           lltype.free(self.buffer, flavor='raw')
+        self.buffer = buffer
+        self.size = size
+
+    def reset(self):
+        self.length = 0
+
+    def mark(self):
+        return self.length
+
+    def release(self, mark):
+        self.length = mark
+
+    def pointer(self, offset):
+        return rffi.ptradd(self.buffer, offset)
+
+    def write_charp(self, value):
+        #Writes value as a NUL terminated C string and returns its offset
+        offset = self.length
+        self.reserve(len(value) + 1)
+        for index in range(len(value)):
+            self.buffer[offset + index] = value[index]
+        self.buffer[offset + len(value)] = '\x00'
+        self.length += len(value) + 1
+        return offset
+
+    def write_byte(self, value):
+        self.reserve(1)
+        self.buffer[self.length] = chr(value & 0xff)
+        self.length += 1
+
+    def write_int32(self, value):
+        self.reserve(4)
+        for index in range(4):
+            self.buffer[self.length + index] = chr((value >> (index * 8)) & 0xff)
+        self.length += 4
+
+    def write_float64(self, value):
+        self.reserve(8)
+        bits = float2longlong(value)
+        for index in range(8):
+            self.buffer[self.length + index] = chr(intmask((bits >> (index * 8)) & 0xff))
+        self.length += 8
+
+    def write_string(self, value):
+        self.write_int32(len(value))
+        self.reserve(len(value))
+        for index in range(len(value)):
+            self.buffer[self.length + index] = value[index]
+        self.length += len(value)
+
+def read_int32(buffer, offset):
+    return rffi.cast(lltype.Signed, rffi.cast(rffi.INTP, rffi.ptradd(buffer, offset))[0])
+
+def read_float64(buffer, offset):
+    return rffi.cast(rffi.DOUBLEP, rffi.ptradd(buffer, offset))[0]
+
+def is_integer(text):
+    #Only what comfortably fits in an int32, anything longer goes through JSON
+    start = 1 if text.startswith('-') else 0
+    if len(text) <= start or len(text) - start > 9: return False
+    for index in range(start, len(text)):
+        if not text[index].isdigit(): return False
+    return True
+
+def skip_digits(text, index):
+    while index < len(text) and text[index].isdigit(): index += 1
+    return index
+
+def is_float(text):
+    #A JSON number with a fraction and/or an exponent, anything float() would choke on goes through JSON
+    index = 1 if text.startswith('-') else 0
+    end = skip_digits(text, index)
+    if end == index: return False
+    index = end
+    fraction = index < len(text) and text[index] == '.'
+    if fraction:
+       end = skip_digits(text, index + 1)
+       if end == index + 1: return False
+       index = end
+    exponent = index < len(text) and text[index] in 'eE'
+    if exponent:
+       index += 1
+       if index < len(text) and text[index] in '+-': index += 1
+       end = skip_digits(text, index)
+       if end == index: return False
+       index = end
+    return (fraction or exponent) and index == len(text)
+
+def reference_handle(value):
+    #The handle of an Object.toRef() string, -1 for anything else
+    if not value.startswith('RPYJSOBJECT:') or not value.endswith(':RPYJSOBJECT'): return -1
+    end = len(value) - 12
+    if end < 12: return -1
+    assert end >= 0
+    text = value[12:end]
+    if not is_integer(text) or text.startswith('-'): return -1
+    return int(text)
+
+def write_argument(buffer, value):
+    if value is None:
+       buffer.write_byte(TAG_NULL)
+    elif value.startswith('RPYJSON:') and value.endswith(':RPYJSON'):
+       end = len(value) - 8
+       assert end >= 0
+       text = value[8:end]
+       if text == 'null': buffer.write_byte(TAG_NULL)
+       elif text == 'true': buffer.write_byte(TAG_TRUE)
+       elif text == 'false': buffer.write_byte(TAG_FALSE)
+       elif is_integer(text):
+          buffer.write_byte(TAG_INTEGER)
+          buffer.write_int32(int(text))
+       elif is_float(text):
+          buffer.write_byte(TAG_FLOAT)
+          buffer.write_float64(float(text))
+       else:
+          buffer.write_byte(TAG_JSON)
+          buffer.write_string(text)
+    elif reference_handle(value) >= 0:
+       buffer.write_byte(TAG_HANDLE)
+       buffer.write_int32(reference_handle(value))
+    else:
+       buffer.write_byte(TAG_STRING)
+       buffer.write_string(value)
+
+def encode_arguments(buffer, args):
+    buffer.reset()
+    buffer.write_int32(len(args))
+    for value in args: write_argument(buffer, value)
+    return buffer.buffer
+
+arguments = ScratchBuffer()
+
+#C strings passed to the EM_JS functions, every call releases what it wrote once JS returns
+arena = ScratchBuffer(1024)
+
+#Results are written by JS into this buffer when they fit, and into a _malloc'd one otherwise
+RESULT_SIZE = 256
+results = ScratchBuffer(RESULT_SIZE)
+
+def result_buffer():
+    results.reserve(RESULT_SIZE)
+    return results.buffer
+
+def read_result(pointer):
+    result = rffi.charp2str(pointer)
+    if pointer != results.buffer: lltype.free(pointer, flavor='raw')
+    return result
@@ -1,11 +1,13 @@
 import inspect
 import ast
 import os
-from rpython.javascript import json
+from rpython.javascript import json, bridge
 from rpython.rtyper.lltypesystem import lltype, rffi
 from rpython.translator.tool.cbuild import ExternalCompilationInfo
 from rpython.rlib.entrypoint import entrypoint_highlevel
 from rpython.rlib.rstring import replace
+from rpython.rlib.objectmodel import specialize
+from rpython.rlib import rgc
 
 JSON = json
 
@@ -43,99 +45,87 @@ em_js = """
   var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
 });*/
 
-EM_JS(const char*, run_safe_json, (const char* json, const char* variable), {
+EM_JS(const char*, run_safe_json, (const char* json, int handle, char* output, int output_size), {
   var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
-  variable = UTF8ToString(variable);
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
   var object = JSON.parse(UTF8ToString(json));
   object = global.deserialize_rpython_json(object);
-  try {
-    global[variable] = object;
-  }
-  catch (error) {
-    console.error('Trying to set variable ' + variable);
-    console.error(error);
-    throw error;
-  }
+  handles[handle] = object;
   var type;
   if (object === null) type = 'null';
   else if (Array.isArray(object)) type = 'array';
   else type = typeof object;
-  var lengthBytes = lengthBytesUTF8(type) + 1;
-  var stringOnWasmHeap = _malloc(lengthBytes);
-  stringToUTF8(type, stringOnWasmHeap, lengthBytes);
-  return stringOnWasmHeap;
+  return global.write_rpython_result(type, output, output_size);
 });
 
-EM_JS(const char*, run_safe_get, (const char* variable, const char* key, const char* new_variable), {
+EM_JS(const char*, run_safe_get, (int handle, const char* key, int new_handle, char* output, int output_size), {
   var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
   key = UTF8ToString(key);
-  variable = UTF8ToString(variable);
-  new_variable = UTF8ToString(new_variable);
   var object;
   try {
-    object = global[variable][key];
+    object = handles[handle][key];
   }
   catch (error) {
-    console.error('Trying to get variable ' + variable + ' and ' + key);
+    console.error('Trying to get handle ' + handle + ' and ' + key);
     console.error(error);
     throw error;
   }
-  if (typeof object === 'function' && (!object.prototype || Object.getOwnPropertyNames(object.prototype).length === 1)) object = object.bind(global[variable]);
-  global[new_variable] = object;
+  object = global.bind_rpython_method(handles[handle], key, object);
+  handles[new_handle] = object;
   var type;
   if (object === null) type = 'null';
   else if (Array.isArray(object)) type = 'array';
   else type = typeof object;
-  var lengthBytes = lengthBytesUTF8(type) + 1;
-  var stringOnWasmHeap = _malloc(lengthBytes);
-  stringToUTF8(type, stringOnWasmHeap, lengthBytes);
-  return stringOnWasmHeap;
+  return global.write_rpython_result(type, output, output_size);
 });
 
-EM_JS(void, run_safe_set, (const char* variable, const char* key, const char* value), {
+EM_JS(void, run_safe_set, (int handle, const char* key, const char* value), {
   var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
   key = UTF8ToString(key);
-  variable = UTF8ToString(variable);
   value = global.deserialize_rpython_json(JSON.parse(UTF8ToString(value)));
   try {
-    global[variable][key] = value;
+    handles[handle][key] = value;
   }
   catch (error) {
-    console.error('Trying to set variable ' + variable + ' and ' + key);
+    console.error('Trying to set handle ' + handle + ' and ' + key);
     console.error(error);
     throw error;
   }
 });
 
-EM_JS(void, run_safe_del, (const char* variable, const char* key), {
+EM_JS(void, run_safe_del, (int handle, const char* key), {
   var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
   key = UTF8ToString(key);
-  variable = UTF8ToString(variable);
   try {
-    delete global[variable][key];
+    delete handles[handle][key];
   }
   catch (error) {
-    console.error('Trying to delete variable ' + variable + ' and ' + key);
+    console.error('Trying to delete handle ' + handle + ' and ' + key);
     console.error(error);
     throw error;
   }
 });
 
-EM_JS(const char*, run_safe_call, (const char* variable, const char* args, const char* new_variable), {
+EM_JS(void, release_handle, (int handle), {
   var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
-  variable = UTF8ToString(variable);
-  args = JSON.parse(UTF8ToString(args));
-  new_variable = UTF8ToString(new_variable);
-  deserialize_rpython_json(args);
-  var js_function;
-  try {
-    js_function = global[variable];
-  }
-  catch (error) {
-    console.error('Trying to get variable ' + variable);
-    console.error(error);
-    throw error;
-  }
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
+  handles[handle] = undefined;
+});
+
+EM_JS(void, release_handles, (int* buffer, int count), {
+  var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
+  for (var index = 0; index < count; index++) handles[HEAP32[(buffer >> 2) + index]] = undefined;
+});
+
+EM_JS(const char*, run_safe_call, (int handle, const char* args, int new_handle, char* output, int output_size), {
+  var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
+  args = global.deserialize_rpython_arguments(args);
+  var js_function = handles[handle];
   var object;
   try {
     object = js_function(...args);
@@ -145,105 +135,105 @@ EM_JS(const char*, run_safe_call, (const char* variable, const char* args, const
      console.error(global.activeRPYTypingError);
      delete global.activeRPYTypingError;
    }
-   console.error('Trying to call variable ' + variable);
+   console.error('Trying to call handle ' + handle);
    console.error(error);
    throw error;
   }
-  global[new_variable] = object;
+  handles[new_handle] = object;
   var type;
   if (object === null) type = 'null';
   else if (Array.isArray(object)) type = 'array';
   else type = typeof object;
-  var lengthBytes = lengthBytesUTF8(type) + 1;
-  var stringOnWasmHeap = _malloc(lengthBytes);
-  stringToUTF8(type, stringOnWasmHeap, lengthBytes);
-  return stringOnWasmHeap;
+  return global.write_rpython_result(type, output, output_size);
 });
 
-EM_JS(const char*, run_safe_new, (const char* variable, const char* args, const char* new_variable), {
+EM_JS(const char*, run_safe_new, (int handle, const char* args, int new_handle, char* output, int output_size), {
   var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
-  variable = UTF8ToString(variable);
-  args = JSON.parse(UTF8ToString(args));
-  new_variable = UTF8ToString(new_variable);
-  deserialize_rpython_json(args);
-  var constructor;
-  try {
-    constructor = global[variable];
-  }
-  catch (error) {
-    console.error('Trying to get variable ' + variable);
-    console.error(error);
-    throw error;
-  }
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
+  args = global.deserialize_rpython_arguments(args);
+  var constructor = handles[handle];
   var object;
   try {
     object = new constructor(...args);
   }
   catch (error) {
-   console.error('Trying to instantiate variable ' + variable);
+   console.error('Trying to instantiate handle ' + handle);
    console.error(error);
    throw error;
   }
-  global[new_variable] = object;
+  handles[new_handle] = object;
   var type;
   if (object === null) type = 'null';
   else if (Array.isArray(object)) type = 'array';
   else type = typeof object;
-  var lengthBytes = lengthBytesUTF8(type) + 1;
-  var stringOnWasmHeap = _malloc(lengthBytes);
-  stringToUTF8(type, stringOnWasmHeap, lengthBytes);
-  return stringOnWasmHeap;
+  return global.write_rpython_result(type, output, output_size);
 });
 
-EM_JS(void, run_safe_promise, (const char* parent_promise_id, const char* promise_id, const char* variables), {
+EM_JS(void, run_safe_promise, (int parent_promise_id, int promise_id, const char* variables), {
   var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
-  var args = [UTF8ToString(parent_promise_id), UTF8ToString(promise_id)]; //.map(function (string) {return allocate.length === 2 ? allocate(intArrayFromString(string), ALLOC_NORMAL) : allocate(intArrayFromString(string), 'i8', ALLOC_NORMAL)});
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
+  var args = [parent_promise_id, promise_id];
   variables = JSON.parse(UTF8ToString(variables));
-  Promise.all(variables.map(async function (variable) {
-    var promise;
-    try {
-      promise = global[variable];
-    }
-    catch (error) {
-      console.error('Trying to get variable ' + variable);
-      console.error(error);
-      throw error;
-    }
-    var object = await promise;
+  Promise.all(variables.map(async function (handle) {
+    var object = await handles[handle];
     if (object && object.then) object.rpython_resolved = true;
-    global[variable] = object;
+    handles[handle] = object;
   })).then(function () {
     //Module.asm.onresolve(...args);
-    Module.ccall('onresolve', 'null', ['string', 'string'], args);
+    Module.ccall('onresolve', 'null', ['number', 'number'], args);
   }) //.catch(function (error) {console.error(error) /*|| throw error*/});
 });
 
-EM_JS(const char*, run_safe_type_update, (const char* variable), {
+EM_JS(void, gather_promise, (int* objects, int* results, int count, int new_handle), {
   var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
-  variable = UTF8ToString(variable);
-  var object;
-  try {
-    object = global[variable];
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
+  var awaits = [];
+  var targets = [];
+  for (var index = 0; index < count; index++) {
+    awaits.push(handles[HEAP32[(objects >> 2) + index]]);
+    targets.push(HEAP32[(results >> 2) + index]);
   }
-  catch (error) {
-    console.error('Trying to get variable ' + variable);
-    console.error(error);
-    throw error;
+  handles[new_handle] = Promise.all(awaits).then(function (values) {
+    values.forEach(function (value, index) {
+      handles[targets[index]] = value;
+    });
+    handles[new_handle] = values;
+    return values;
+  });
+});
+
+EM_JS(int, gather_types, (int handle, char* types, int count), {
+  var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
+  var values = handles[handle];
+  if (!Array.isArray(values)) return 0;
+  var names = ['undefined', 'null', 'array', 'object', 'function', 'string', 'number', 'boolean', 'symbol', 'bigint'];
+  for (var index = 0; index < count; index++) {
+    var value = values[index];
+    var type;
+    if (value === null) type = 'null';
+    else if (Array.isArray(value)) type = 'array';
+    else type = typeof value;
+    HEAPU8[types + index] = names.indexOf(type);
   }
+  return 1;
+});
+
+EM_JS(const char*, run_safe_type_update, (int handle, char* output, int output_size), {
+  var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
+  var object = handles[handle];
   var type;
   if (object === null) type = 'null';
   else if (Array.isArray(object)) type = 'array';
   else type = typeof object;
-  var lengthBytes = lengthBytesUTF8(type) + 1;
-  var stringOnWasmHeap = _malloc(lengthBytes);
-  stringToUTF8(type, stringOnWasmHeap, lengthBytes);
-  return stringOnWasmHeap;
+  return global.write_rpython_result(type, output, output_size);
 });
 
-EM_JS(const char*, create_function, (const char* id, const char* new_variable, const char* function_info), {
+EM_JS(const char*, create_function, (const char* id, int new_handle, const char* function_info, char* output, int output_size), {
   var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
   var index = parseInt(UTF8ToString(id));
-  new_variable = UTF8ToString(new_variable);
   function_info = UTF8ToString(function_info);
   var new_object = {};
   new_object[function_info] = (function (...args) {
@@ -254,7 +244,8 @@ EM_JS(const char*, create_function, (const char* id, const char* new_variable, c
     //Module.asm.onfunctioncall(...args);
     Module.ccall('onfunctioncall', 'null', ['string', 'string'], args);
     delete global.rpyfunction_call_args[index];
-    var result = global[global['rpyfunction_call_' + index]];
+    var handle = global['rpyfunction_call_' + index];
+    var result = handle === null ? undefined : handles[handle];
     delete global['rpyfunction_call_' + index];
     return result;
   });
@@ -268,21 +259,18 @@ EM_JS(const char*, create_function, (const char* id, const char* new_variable, c
       throw error;
     }
   });
-  global[new_variable] = object;
+  handles[new_handle] = object;
   var type;
   if (object === null) type = 'null';
   else if (Array.isArray(object)) type = 'array';
   else type = typeof object;
-  var lengthBytes = lengthBytesUTF8(type) + 1;
-  var stringOnWasmHeap = _malloc(lengthBytes);
-  stringToUTF8(type, stringOnWasmHeap, lengthBytes);
-  return stringOnWasmHeap;
+  return global.write_rpython_result(type, output, output_size);
 });
 
-EM_JS(const char*, create_method, (const char* id, const char* method_id, const char* new_variable), {
+EM_JS(const char*, create_method, (const char* id, const char* method_id, int new_handle, char* output, int output_size), {
   var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
   var index = parseInt(UTF8ToString(id));
-  new_variable = UTF8ToString(new_variable);
   method_id = UTF8ToString(method_id);
   var object = (function (...args) {
     if (!global.rpymethod_call_args) global.rpymethod_call_args = {};
@@ -292,95 +280,188 @@ EM_JS(const char*, create_method, (const char* id, const char* method_id, const
     //Module.asm['onmethodcall' + method_id](...args);
     Module.ccall('onmethodcall' + method_id, 'null', ['string', 'string'], args);
     delete global.rpymethod_call_args[index];
-    var result = global[global['rpymethod_call_' + index]];
+    var handle = global['rpymethod_call_' + index];
+    var result = handle === null ? undefined : handles[handle];
     delete global['rpymethod_call_' + index];
     return result;
   });
-  global[new_variable] = object;
+  handles[new_handle] = object;
   var type;
   if (object === null) type = 'null';
   else if (Array.isArray(object)) type = 'array';
   else type = typeof object;
-  var lengthBytes = lengthBytesUTF8(type) + 1;
-  var stringOnWasmHeap = _malloc(lengthBytes);
-  stringToUTF8(type, stringOnWasmHeap, lengthBytes);
-  return stringOnWasmHeap;
+  return global.write_rpython_result(type, output, output_size);
 });
 
-EM_JS(const char*, create_js_closure, (const char* func, const char* args, const char* new_variable), {
+EM_JS(const char*, create_js_closure, (const char* func, const char* args, int new_handle, char* output, int output_size), {
   var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
-  new_variable = UTF8ToString(new_variable);
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
   args = JSON.parse(UTF8ToString(args));
   global.deserialize_rpython_json(args);
   func = global.deserialize_rpython_json(UTF8ToString(func));
   var object = (function (...new_args) {
     return func(...args, ...new_args);
   });
-  global[new_variable] = object;
+  handles[new_handle] = object;
   var type;
   if (object === null) type = 'null';
   else if (Array.isArray(object)) type = 'array';
   else type = typeof object;
-  var lengthBytes = lengthBytesUTF8(type) + 1;
-  var stringOnWasmHeap = _malloc(lengthBytes);
-  stringToUTF8(type, stringOnWasmHeap, lengthBytes);
-  return stringOnWasmHeap;
+  return global.write_rpython_result(type, output, output_size);
 });
 
-EM_JS(const char*, get_string, (const char* variable), {
+EM_JS(const char*, get_string, (int handle, char* output, int output_size), {
   var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
-  variable = UTF8ToString(variable);
-  var string = global[variable];
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
+  var string = handles[handle];
   var result;
   if (typeof string === 'string') result = string;
   else if (string && string.toString) result = string.toString();
   else result = String(string);
-  var lengthBytes = lengthBytesUTF8(result) + 1;
-  var stringOnWasmHeap = _malloc(lengthBytes);
-  stringToUTF8(result, stringOnWasmHeap, lengthBytes);
-  return stringOnWasmHeap;
+  return global.write_rpython_result(result, output, output_size);
 });
 
-EM_JS(const char*, get_integer, (const char* variable), {
+EM_JS(int, get_integer, (int handle), {
   var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
-  variable = UTF8ToString(variable);
-  var integer = parseInt(global[variable]);
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
+  var integer = parseInt(handles[handle]);
   if (isNaN(integer)) {
-    throw new Error(global[variable] + ' is not a number');
+    throw new Error(handles[handle] + ' is not a number');
   }
-  var result = integer.toString();
-  var lengthBytes = lengthBytesUTF8(result) + 1;
-  var stringOnWasmHeap = _malloc(lengthBytes);
-  stringToUTF8(result, stringOnWasmHeap, lengthBytes);
-  return stringOnWasmHeap;
+  return integer;
 });
 
-EM_JS(const char*, get_float, (const char* variable), {
+EM_JS(double, get_float, (int handle), {
   var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
-  variable = UTF8ToString(variable);
-  var float = parseFloat(global[variable]);
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
+  var float = parseFloat(handles[handle]);
   if (isNaN(float)) {
-    throw new Error(global[variable] + ' is not a number');
+    throw new Error(handles[handle] + ' is not a number');
   }
-  var result = float.toString();
-  var lengthBytes = lengthBytesUTF8(result) + 1;
-  var stringOnWasmHeap = _malloc(lengthBytes);
-  stringToUTF8(result, stringOnWasmHeap, lengthBytes);
-  return stringOnWasmHeap;
+  return float;
+});
+
+EM_JS(int, get_boolean, (int handle), {
+  var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
+  var result = handles[handle];
+  if (typeof result === 'number') return parseInt(result) !== 0;
+  return !!result;
+});
+
+EM_JS(int, get_length, (int handle), {
+  var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
+  var object = handles[handle];
+  if (object instanceof ArrayBuffer) return object.byteLength;
+  var length = object !== null && object !== undefined ? object.length : undefined;
+  return typeof length === 'number' ? length : 0;
 });
 
-EM_JS(const char*, get_boolean, (const char* variable), {
+EM_JS(void, copy_integers, (int handle, int* buffer, int length), {
   var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
-  var result = global[variable];
-  if (typeof result !== 'boolean') result = !!result;
-  result = JSON.stringify(result);
-  var lengthBytes = lengthBytesUTF8(result) + 1;
-  var stringOnWasmHeap = _malloc(lengthBytes);
-  stringToUTF8(result, stringOnWasmHeap, lengthBytes);
-  return stringOnWasmHeap;
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
+  var object = handles[handle];
+  HEAP32.set(object.length === length ? object : Array.prototype.slice.call(object, 0, length), buffer >> 2);
 });
 
-EM_JS(const char*, run_unsafe_code, (const char* code), {
+EM_JS(void, copy_floats, (int handle, double* buffer, int length), {
+  var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
+  var object = handles[handle];
+  HEAPF64.set(object.length === length ? object : Array.prototype.slice.call(object, 0, length), buffer >> 3);
+});
+
+EM_JS(void, copy_bytes, (int handle, char* buffer, int length), {
+  var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
+  var object = handles[handle];
+  if (object instanceof ArrayBuffer) object = new Uint8Array(object);
+  else if (ArrayBuffer.isView(object)) object = new Uint8Array(object.buffer, object.byteOffset, object.byteLength);
+  HEAPU8.set(object.length === length ? object : Array.prototype.slice.call(object, 0, length), buffer);
+});
+
+EM_JS(const char*, create_typed_array, (const char* kind, const char* buffer, int length, int new_handle, char* output, int output_size), {
+  var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
+  kind = UTF8ToString(kind);
+  var object;
+  if (kind === 'int32') object = HEAP32.slice(buffer >> 2, (buffer >> 2) + length);
+  else if (kind === 'float64') object = HEAPF64.slice(buffer >> 3, (buffer >> 3) + length);
+  else object = HEAPU8.slice(buffer, buffer + length);
+  handles[new_handle] = object;
+  var type;
+  if (object === null) type = 'null';
+  else if (Array.isArray(object)) type = 'array';
+  else type = typeof object;
+  return global.write_rpython_result(type, output, output_size);
+});
+
+EM_JS(char*, get_many, (int handle, const char* keys, const char* kinds, int* new_handles), {
+  var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
+  var handles = global.rpython_handles || (global.rpython_handles = [global]);
+  var object = handles[handle];
+  keys = global.deserialize_rpython_arguments(keys);
+  kinds = UTF8ToString(kinds);
+  var values = [];
+  var size = 1;
+  for (var index = 0; index < keys.length; index++) {
+    var value = object[keys[index]];
+    var kind = kinds[index];
+    if (kind === 'o') {
+      value = global.bind_rpython_method(object, keys[index], value);
+      handles[HEAP32[(new_handles >> 2) + index]] = value;
+      if (value === null) value = 'null';
+      else if (Array.isArray(value)) value = 'array';
+      else value = typeof value;
+    }
+    else if (value === undefined) {
+      values.push(value);
+      size += 1;
+      continue;
+    }
+    else if (kind === 'i' || kind === 'f') {
+      var number = kind === 'i' ? parseInt(value) : parseFloat(value);
+      if (isNaN(number)) throw new Error(value + ' is not a number');
+      value = number;
+    }
+    else if (kind === 'b') value = typeof value === 'number' ? parseInt(value) !== 0 : !!value;
+    else if (typeof value !== 'string') value = value && value.toString ? value.toString() : String(value);
+    values.push(value);
+    if (kind === 'o' || kind === 's') size += 5 + lengthBytesUTF8(value);
+    else size += kind === 'f' ? 9 : kind === 'b' ? 2 : 5;
+  }
+  var buffer = _malloc(size);
+  var view = new DataView(HEAPU8.buffer);
+  var offset = buffer;
+  for (var index = 0; index < values.length; index++) {
+    var value = values[index];
+    var kind = kinds[index];
+    if (value === undefined) {
+      view.setUint8(offset++, 0);
+      continue;
+    }
+    view.setUint8(offset++, 1);
+    if (kind === 'o' || kind === 's') {
+      var length = lengthBytesUTF8(value);
+      view.setInt32(offset, length, true);
+      stringToUTF8(value, offset + 4, length + 1);
+      offset += 4 + length;
+    }
+    else if (kind === 'i') {
+      view.setInt32(offset, value, true);
+      offset += 4;
+    }
+    else if (kind === 'f') {
+      view.setFloat64(offset, value, true);
+      offset += 8;
+    }
+    else view.setUint8(offset++, value ? 1 : 0);
+  }
+  return buffer;
+});
+
+EM_JS(const char*, run_unsafe_code, (const char* code, char* output, int output_size), {
   code = UTF8ToString(code);
   var global = typeof rpyGlobalArg !== "undefined" ? rpyGlobalArg : this;
   if (!Module.wasmMemory) Module.wasmMemory = wasmMemory;
@@ -400,64 +481,122 @@ EM_JS(const char*, run_unsafe_code, (const char* code), {
     console.error('Trying to execute eval code: ' + code);
     throw error;
   }
-  var lengthBytes = lengthBytesUTF8(result) + 1;
-  var stringOnWasmHeap = _malloc(lengthBytes);
-  stringToUTF8(result, stringOnWasmHeap, lengthBytes);
-  return stringOnWasmHeap;
+  return global.write_rpython_result(result, output, output_size);
 });
 
 """
+
+#String arguments are copied into bridge.arena and released after the call, results are written by JS into bridge.result_buffer()
+#Offsets are only turned into pointers once every argument is written, since the arena may move while it grows
+
+@specialize.argtype(0)
+def bridge_arg(arg):
+    #Handles cross the bridge as plain integers, everything else as a C string
+    if isinstance(arg, str): return bridge.arena.write_charp(arg)
+    return 0
+
+@specialize.argtype(0)
+def bridge_pointer(arg, offset):
+    if isinstance(arg, str): return bridge.arena.pointer(offset)
+    return arg
+
 def rffi_1(function, void=False):
     def wrapper(arg1, skip_gc=False):
         if not skip_gc and globals.collector_id is None: run_garbage_collector()
-        pointer = function(rffi.str2charp(arg1))
-        if void: return
-        result = rffi.charp2str(pointer)
-        lltype.free(pointer, flavor='raw')
-        return result
+        mark = bridge.arena.mark()
+        offset1 = bridge_arg(arg1)
+        pointer1 = bridge_pointer(arg1, offset1)
+        globals.bridge_depth += 1
+        if void:
+           function(pointer1)
+           globals.bridge_depth -= 1
+           bridge.arena.release(mark)
+           return
+        pointer = function(pointer1, bridge.result_buffer(), bridge.RESULT_SIZE)
+        globals.bridge_depth -= 1
+        bridge.arena.release(mark)
+        return bridge.read_result(pointer)
     return wrapper
 
 def rffi_2(function, void=False):
     def wrapper(arg1, arg2, skip_gc=False):
         if not skip_gc and globals.collector_id is None: run_garbage_collector()
-        pointer = function(rffi.str2charp(arg1), rffi.str2charp(arg2))
-        if void: return
-        result = rffi.charp2str(pointer)
-        lltype.free(pointer, flavor='raw')
-        return result
+        mark = bridge.arena.mark()
+        offset1, offset2 = bridge_arg(arg1), bridge_arg(arg2)
+        pointer1, pointer2 = bridge_pointer(arg1, offset1), bridge_pointer(arg2, offset2)
+        globals.bridge_depth += 1
+        if void:
+           function(pointer1, pointer2)
+           globals.bridge_depth -= 1
+           bridge.arena.release(mark)
+           return
+        pointer = function(pointer1, pointer2, bridge.result_buffer(), bridge.RESULT_SIZE)
+        globals.bridge_depth -= 1
+        bridge.arena.release(mark)
+        return bridge.read_result(pointer)
     return wrapper
 
 def rffi_3(function, void=False):
     def wrapper(arg1, arg2, arg3, skip_gc=False):
         if not skip_gc and globals.collector_id is None: run_garbage_collector()
-        pointer = function(rffi.str2charp(arg1), rffi.str2charp(arg2), rffi.str2charp(arg3))
-        if void: return
-        result = rffi.charp2str(pointer)
-        lltype.free(pointer, flavor='raw')
-        return result
+        mark = bridge.arena.mark()
+        offset1, offset2, offset3 = bridge_arg(arg1), bridge_arg(arg2), bridge_arg(arg3)
+        pointer1, pointer2, pointer3 = bridge_pointer(arg1, offset1), bridge_pointer(arg2, offset2), bridge_pointer(arg3, offset3)
+        globals.bridge_depth += 1
+        if void:
+           function(pointer1, pointer2, pointer3)
+           globals.bridge_depth -= 1
+           bridge.arena.release(mark)
+           return
+        pointer = function(pointer1, pointer2, pointer3, bridge.result_buffer(), bridge.RESULT_SIZE)
+        globals.bridge_depth -= 1
+        bridge.arena.release(mark)
+        return bridge.read_result(pointer)
     return wrapper
 
 info = ExternalCompilationInfo(separate_module_sources=[em_js], includes=['src/em_js_api.h'])
 #run_safe_string = rffi.llexternal('run_safe_string', [rffi.CCHARP], rffi.CCHARP, compilation_info=info)
-run_safe_json = rffi_2(rffi.llexternal('run_safe_json', [rffi.CCHARP, rffi.CCHARP], rffi.CCHARP, compilation_info=info))
-run_safe_get = rffi_3(rffi.llexternal('run_safe_get', [rffi.CCHARP, rffi.CCHARP, rffi.CCHARP], rffi.CCHARP, compilation_info=info))
-run_safe_set = rffi_3(rffi.llexternal('run_safe_set', [rffi.CCHARP, rffi.CCHARP, rffi.CCHARP], lltype.Void, compilation_info=info), void=True)
-run_safe_del = rffi_2(rffi.llexternal('run_safe_del', [rffi.CCHARP, rffi.CCHARP], lltype.Void, compilation_info=info), void=True)
-run_safe_call = rffi_3(rffi.llexternal('run_safe_call', [rffi.CCHARP, rffi.CCHARP, rffi.CCHARP], rffi.CCHARP, compilation_info=info))
-run_safe_new = rffi_3(rffi.llexternal('run_safe_new', [rffi.CCHARP, rffi.CCHARP, rffi.CCHARP], rffi.CCHARP, compilation_info=info))
-run_safe_promise = rffi_3(rffi.llexternal('run_safe_promise', [rffi.CCHARP, rffi.CCHARP, rffi.CCHARP], lltype.Void, compilation_info=info), void=True)
-run_safe_type_update = rffi_1(rffi.llexternal('run_safe_type_update', [rffi.CCHARP], rffi.CCHARP, compilation_info=info))
-
-run_unsafe_code = rffi_1(rffi.llexternal('run_unsafe_code', [rffi.CCHARP], rffi.CCHARP, compilation_info=info))
-
-create_function = rffi_3(rffi.llexternal('create_function', [rffi.CCHARP, rffi.CCHARP, rffi.CCHARP], rffi.CCHARP, compilation_info=info))
-create_method = rffi_3(rffi.llexternal('create_method', [rffi.CCHARP, rffi.CCHARP, rffi.CCHARP], rffi.CCHARP, compilation_info=info))
-create_js_closure = rffi_3(rffi.llexternal('create_js_closure', [rffi.CCHARP, rffi.CCHARP, rffi.CCHARP], rffi.CCHARP, compilation_info=info))
-
-get_string = rffi_1(rffi.llexternal('get_string', [rffi.CCHARP], rffi.CCHARP, compilation_info=info))
-get_integer = rffi_1(rffi.llexternal('get_integer', [rffi.CCHARP], rffi.CCHARP, compilation_info=info))
-get_float = rffi_1(rffi.llexternal('get_float', [rffi.CCHARP], rffi.CCHARP, compilation_info=info))
-get_boolean = rffi_1(rffi.llexternal('get_boolean', [rffi.CCHARP], rffi.CCHARP, compilation_info=info))
+run_safe_json = rffi_2(rffi.llexternal('run_safe_json', [rffi.CCHARP, rffi.INT, rffi.CCHARP, rffi.INT], rffi.CCHARP, compilation_info=info))
+run_safe_get = rffi_3(rffi.llexternal('run_safe_get', [rffi.INT, rffi.CCHARP, rffi.INT, rffi.CCHARP, rffi.INT], rffi.CCHARP, compilation_info=info))
+run_safe_set = rffi_3(rffi.llexternal('run_safe_set', [rffi.INT, rffi.CCHARP, rffi.CCHARP], lltype.Void, compilation_info=info), void=True)
+run_safe_del = rffi_2(rffi.llexternal('run_safe_del', [rffi.INT, rffi.CCHARP], lltype.Void, compilation_info=info), void=True)
+run_safe_call = rffi_3(rffi.llexternal('run_safe_call', [rffi.INT, rffi.CCHARP, rffi.INT, rffi.CCHARP, rffi.INT], rffi.CCHARP, compilation_info=info))
+run_safe_new = rffi_3(rffi.llexternal('run_safe_new', [rffi.INT, rffi.CCHARP, rffi.INT, rffi.CCHARP, rffi.INT], rffi.CCHARP, compilation_info=info))
+run_safe_promise = rffi_3(rffi.llexternal('run_safe_promise', [rffi.INT, rffi.INT, rffi.CCHARP], lltype.Void, compilation_info=info), void=True)
+run_safe_type_update = rffi_1(rffi.llexternal('run_safe_type_update', [rffi.INT, rffi.CCHARP, rffi.INT], rffi.CCHARP, compilation_info=info))
+release_handle = rffi_1(rffi.llexternal('release_handle', [rffi.INT], lltype.Void, compilation_info=info), void=True)
+release_handles = rffi.llexternal('release_handles', [rffi.INTP, rffi.INT], lltype.Void, compilation_info=info)
+gather_promise = rffi.llexternal('gather_promise', [rffi.INTP, rffi.INTP, rffi.INT, rffi.INT], lltype.Void, compilation_info=info)
+gather_types = rffi.llexternal('gather_types', [rffi.INT, rffi.CCHARP, rffi.INT], rffi.INT, compilation_info=info)
+
+run_unsafe_code = rffi_1(rffi.llexternal('run_unsafe_code', [rffi.CCHARP, rffi.CCHARP, rffi.INT], rffi.CCHARP, compilation_info=info))
+
+create_function = rffi_3(rffi.llexternal('create_function', [rffi.CCHARP, rffi.INT, rffi.CCHARP, rffi.CCHARP, rffi.INT], rffi.CCHARP, compilation_info=info))
+create_method = rffi_3(rffi.llexternal('create_method', [rffi.CCHARP, rffi.CCHARP, rffi.INT, rffi.CCHARP, rffi.INT], rffi.CCHARP, compilation_info=info))
+create_js_closure = rffi_3(rffi.llexternal('create_js_closure', [rffi.CCHARP, rffi.CCHARP, rffi.INT, rffi.CCHARP, rffi.INT], rffi.CCHARP, compilation_info=info))
+
+get_string = rffi_1(rffi.llexternal('get_string', [rffi.INT, rffi.CCHARP, rffi.INT], rffi.CCHARP, compilation_info=info))
+#Primitive getters, the value crosses the wasm boundary as is without a heap string in between
+get_integer = rffi.llexternal('get_integer', [rffi.INT], rffi.INT, compilation_info=info)
+get_float = rffi.llexternal('get_float', [rffi.INT], rffi.DOUBLE, compilation_info=info)
+get_boolean = rffi.llexternal('get_boolean', [rffi.INT], rffi.INT, compilation_info=info)
+
+#Bulk transfer of a whole JS array, TypedArray or ArrayBuffer through a raw wasm buffer in one crossing
+get_length = rffi.llexternal('get_length', [rffi.INT], rffi.INT, compilation_info=info)
+copy_integers = rffi.llexternal('copy_integers', [rffi.INT, rffi.INTP, rffi.INT], lltype.Void, compilation_info=info)
+copy_floats = rffi.llexternal('copy_floats', [rffi.INT, rffi.DOUBLEP, rffi.INT], lltype.Void, compilation_info=info)
+copy_bytes = rffi.llexternal('copy_bytes', [rffi.INT, rffi.CCHARP, rffi.INT], lltype.Void, compilation_info=info)
+create_typed_array = rffi.llexternal('create_typed_array', [rffi.CCHARP, rffi.CCHARP, rffi.INT, rffi.INT, rffi.CCHARP, rffi.INT], rffi.CCHARP, compilation_info=info)
+
+#Batched property reads, see Object.get_many
+get_many = rffi.llexternal('get_many', [rffi.INT, rffi.CCHARP, rffi.CCHARP, rffi.INTP], rffi.CCHARP, compilation_info=info)
+
+def typed_array(kind, buffer, length, handle):
+    mark = bridge.arena.mark()
+    offset = bridge.arena.write_charp(kind)
+    pointer = create_typed_array(bridge.arena.pointer(offset), buffer, length, handle, bridge.result_buffer(), bridge.RESULT_SIZE)
+    bridge.arena.release(mark)
+    return bridge.read_result(pointer)
 
 def run_javascript(code, returns=False, skip_gc=False):
     if not skip_gc and globals.collector_id is None: run_garbage_collector()
@@ -520,6 +659,20 @@ def toList(value):
 def toDict(value):
     return json.fromDict(value)
 
+#These build a TypedArray straight from the wasm heap instead of going through JSON.fromList
+
+@staticmethod
+def toListInteger(values):
+    return Object('', safe_list_integer=values)
+
+@staticmethod
+def toListFloat(values):
+    return Object('', safe_list_float=values)
+
+@staticmethod
+def toBytes(value):
+    return Object('', safe_bytes=value)
+
 functions = {}
 
 function_template = '''
@@ -559,15 +712,20 @@ def fromFunction(function=None, keep=False):
 
 @entrypoint_highlevel(key='main', c_name='onfunctioncall', argtypes=[rffi.CCHARP, rffi.CCHARP])
 def onfunctioncall(*arguments):
-    pointers = list(arguments)
-    variable, function_id = [rffi.charp2str(pointer) for pointer in pointers]
-    for pointer in pointers: lltype.free(pointer, flavor='raw')
-    args = unsafe_object_get(variable, function_id).toArray()
-    #id = int(function_id)
-    #return
-    function = functions[int(function_id)]
-    result = function.function[0](args=[arg for arg in args]) #if function in decorated_functions else function([arg for arg in args])
-    run_safe_set('global', 'rpyfunction_call_' + function_id, ('"%s"' % result.variable) if result is not None else 'null', skip_gc=True)
+    start_event()
+    result = None
+    try:
+        pointers = list(arguments)
+        variable, function_id = [rffi.charp2str(pointer) for pointer in pointers]
+        for pointer in pointers: lltype.free(pointer, flavor='raw')
+        args = unsafe_object_get(variable, function_id).toArray()
+        #id = int(function_id)
+        #return
+        function = functions[int(function_id)]
+        result = function.function[0](args=[arg for arg in args]) #if function in decorated_functions else function([arg for arg in args])
+        run_safe_set(GLOBAL_HANDLE, 'rpyfunction_call_' + function_id, str(result.handle()) if result is not None else 'null', skip_gc=True)
+    finally:
+        end_event(result)
     #run_javascript('global.rpyfunction_call_' + function_id + ((' = "%s"' % result.variable) if result is not None else ' = null'), skip_gc=True)
     #globals.collector_id = None
 
@@ -627,8 +785,7 @@ snapshot = open(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'utils
 #@Function
 def garbage_collector(args):
     if globals.collector_id is None: return
-    garbage = globals.garbage
-    for variable in garbage: garbage[variable].free()
+    collect_handles()
     if globals.pendingAsync is None or not len(globals.pendingAsync):
        if globals.snapshot is None:
           globals.snapshot = Object(snapshot).keep()
@@ -638,8 +795,6 @@ def garbage_collector(args):
 
 def old_run_garbage_collector():
     globals.collector_id = ''
-    if globals.garbage is None:
-       globals.garbage = {}
     #if globals.collector_function is None:
     globals.collector_function = json.fromFunction(garbage_collector)
     if globals.setTimeout is None:
@@ -658,8 +813,6 @@ def empty_collector(args):
     globals.collector_id = None
 
 def run_garbage_collector():
-    if globals.garbage is None:
-       globals.garbage = {}
     if globals.collector_id is not None: return
     globals.collector_id = ''
     return
@@ -693,13 +846,18 @@ def fromMethod():
     method_callers = globals.method_callers
     @entrypoint_highlevel(key='main', c_name='onmethodcall' + str(globals.method_callers), argtypes=[rffi.CCHARP, rffi.CCHARP])
     def onmethodcall(*arguments):
-        pointers = list(arguments)
-        variable, method_id = [rffi.charp2str(pointer) for pointer in pointers]
-        for pointer in pointers: lltype.free(pointer, flavor='raw')
-        args = unsafe_object_get(variable, method_id).toArray()
-        method = methods[int(method_id)]
-        result = method(args=[arg for arg in args])
-        run_safe_set('global', 'rpymethod_call_' + method_id, ('"%s"' % result.variable) if result is not None else 'null')
+        start_event()
+        result = None
+        try:
+            pointers = list(arguments)
+            variable, method_id = [rffi.charp2str(pointer) for pointer in pointers]
+            for pointer in pointers: lltype.free(pointer, flavor='raw')
+            args = unsafe_object_get(variable, method_id).toArray()
+            method = methods[int(method_id)]
+            result = method(args=[arg for arg in args])
+            run_safe_set(GLOBAL_HANDLE, 'rpymethod_call_' + method_id, str(result.handle()) if result is not None else 'null')
+        finally:
+            end_event(result)
         #run_javascript('global.rpymethod_call_' + method_id + ((' = "%s"' % result.variable) if result is not None else ' = null'))
     onmethodcall.__name__ = 'onmethodcall' + str(globals.method_callers)
 
@@ -763,16 +921,24 @@ class String:
             index += 1
         return self
 
+#Handle 0 is reserved for the global object, every Object gets its own slot in global.rpython_handles
+GLOBAL_HANDLE = 0
+
 class Globals:
 
     promises = 0
-    objects = 0
+    objects = GLOBAL_HANDLE + 1
+    free_handles = None
     functions = 0
     functions_cache = None
     methods = 0
     methods_cache = None
     method_callers = 0
-    garbage = None
+    kept = None
+    dying_handles = None
+    bridge_depth = 0
+    event_depth = 0
+    scope = None
     collector_id = None
     collector_function = None
     setTimeout = None
@@ -784,6 +950,13 @@ class Globals:
 
 globals = Globals()
 
+def allocate_handle():
+    if globals.free_handles:
+       return globals.free_handles.pop()
+    handle = globals.objects
+    globals.objects += 1
+    return handle
+
 class Array:
 
     def __init__(self, object):
@@ -811,6 +984,35 @@ class Array:
         assert isinstance(index, int)
         self.object[str(index)] = value
 
+class Properties:
+    #Values read by Object.get_many, indexed like the keys that were asked for
+
+    def __init__(self, length):
+        self.present = [False] * length
+        self.strings = [''] * length
+        self.integers = [0] * length
+        self.floats = [0.0] * length
+        self.booleans = [False] * length
+        self.objects = [None] * length
+
+    def defined(self, index):
+        return self.present[index]
+
+    def toString(self, index):
+        return self.strings[index]
+
+    def toInteger(self, index):
+        return self.integers[index]
+
+    def toFloat(self, index):
+        return self.floats[index]
+
+    def toBoolean(self, index):
+        return self.booleans[index]
+
+    def toObject(self, index):
+        return self.objects[index]
+
 class Error:
 
     def __init__(self, message):
@@ -821,11 +1023,20 @@ def create_closure(function, *objects):
     object = Object(JSON.fromFunction(function), safe_closure_args=[object.toRef() for object in list(objects)])
     return object
 
+class ReleasedObjectError(Exception):
+    #A released Object was used, its slot in rpython_handles may already belong to another Object
+    pass
+
+#What the variable of a released Object is set to, global.rpython_released_object is never defined
+RELEASED_VARIABLE = 'rpython_released_object'
+
 class Object:
 
     id = -1
+    variable = RELEASED_VARIABLE
     resolved = True
     keep_from_gc = False
+    methods = None
 
     fromString = (toString)
     fromStr = (toStr)
@@ -836,30 +1047,53 @@ class Object:
     fromBool = (toBool)
     fromList = (toList)
     fromDict = (toDict)
+    fromListInteger = (toListInteger)
+    fromListFloat = (toListFloat)
+    fromBytes = (toBytes)
     fromFunction = (toFunction)
     createClosure = (create_closure)
 
-    def __init__(self, code, bind='', prestart='', safe_json=False, safe_get="", safe_call="", safe_new=str(), safe_function=False, safe_function_info=str(), safe_method=0, safe_closure_args=None):
-        self.id = globals.objects
-        globals.objects += 1
+    def __init__(self, code, bind='', prestart='', safe_json=False, safe_get="", safe_call=False, safe_new=False, safe_function=False, safe_function_info=str(), safe_method=0, safe_closure_args=None, safe_list_integer=None, safe_list_float=None, safe_bytes=None, safe_empty=False, arguments=None, handle=GLOBAL_HANDLE):
+        #handle is the source object of safe_get/safe_call/safe_new, the global object by default
+        #arguments of safe_call/safe_new are sent through the binary encoding in javascript/bridge.py
+        self.id = allocate_handle()
         self.code = code
-        self.variable = 'rpython_object_' + str(self.id)
+        self.variable = 'rpython_handles[' + str(self.id) + ']'
         if safe_json:
-           self.type = run_safe_json(json.parse_rpy_json(code), self.variable)
+           self.type = run_safe_json(json.parse_rpy_json(code), self.id)
         elif safe_get:
-           self.type = run_safe_get(code, safe_get, self.variable)
+           self.type = run_safe_get(handle, safe_get, self.id)
         elif safe_call:
-           self.type = run_safe_call(safe_call, code, self.variable)
+           self.type = run_safe_call(handle, bridge.encode_arguments(bridge.arguments, arguments), self.id)
         elif safe_new:
-           self.type = run_safe_new(safe_new, code, self.variable)
+           self.type = run_safe_new(handle, bridge.encode_arguments(bridge.arguments, arguments), self.id)
         elif safe_function:
-           self.type = create_function(code, self.variable, safe_function_info)
+           self.type = create_function(code, self.id, safe_function_info)
         elif safe_method:
-           self.type = create_method(code, str(safe_method), self.variable)
+           self.type = create_method(code, str(safe_method), self.id)
         elif safe_closure_args is not None:
-           self.type = create_js_closure(code, json.parse_rpy_json(json.fromList(safe_closure_args)), self.variable)
+           self.type = create_js_closure(code, json.parse_rpy_json(json.fromList(safe_closure_args)), self.id)
+        elif safe_list_integer is not None:
+           length = len(safe_list_integer)
+           buffer = lltype.malloc(rffi.INTP.TO, length, flavor='raw')
+           for index in range(length): buffer[index] = rffi.cast(rffi.INT, safe_list_integer[index])
+           self.type = typed_array('int32', rffi.cast(rffi.CCHARP, buffer), length, self.id)
+           lltype.free(buffer, flavor='raw')
+        elif safe_list_float is not None:
+           length = len(safe_list_float)
+           buffer = lltype.malloc(rffi.DOUBLEP.TO, length, flavor='raw')
+           for index in range(length): buffer[index] = safe_list_float[index]
+           self.type = typed_array('float64', rffi.cast(rffi.CCHARP, buffer), length, self.id)
+           lltype.free(buffer, flavor='raw')
+        elif safe_bytes is not None:
+           buffer = rffi.str2charp(safe_bytes)
+           self.type = typed_array('uint8', buffer, len(safe_bytes), self.id)
+           lltype.free(buffer, flavor='raw')
+        elif safe_empty:
+           self.type = 'undefined' #The handle is filled later by the caller, see get_many
         else:
            self.type = run_javascript(String("""
+           if (!global.rpython_handles) global.rpython_handles = [global];
            {3}
            global.{0} = {1}
            var object = global.{0};
@@ -869,36 +1103,59 @@ class Object:
            if (Array.isArray(global.{0})) return 'array';
            return typeof global.{0};
            """).format(self.variable, code, bind, prestart).value, returns=True)
-        globals.garbage[self.variable] = self
+        handle_queue.register_finalizer(self)
+        scope_object(self)
 
     def new(self, *args):
-        json_args = '[' + ', '.join([json.parse_rpy_json(arg) for arg in list(args)]) + ']'
-        return Object(json_args, safe_new=self.variable)
+        return Object('', safe_new=True, arguments=list(args), handle=self.handle())
 
     def call(self, *args):
         return self.call_list(list(args))
 
     def call_list(self, args):
         #if not args: return Object(String('call()').replace('{0}', self.variable).value, prestart='var call = global.' + self.variable)
-        json_args = '[' + ', '.join([json.parse_rpy_json(arg) for arg in args]) + ']'
-        return Object(json_args, safe_call=self.variable)
+        return Object('', safe_call=True, arguments=args, handle=self.handle())
         #return Object(String('call(...[{1}])').replace('{0}', self.variable).replace('{1}', json_args).value, prestart='var call = global.' + self.variable)
 
+    def handle(self):
+        #Every use of the slot goes through here: once released it may hold another Object, so fail instead of aliasing
+        if self.id < 0: raise ReleasedObjectError
+        return self.id
+
+    def forget_handle(self):
+        self.id = -1
+        self.variable = RELEASED_VARIABLE
+
     def free(self):
-        if self.keep_from_gc: return
+        if self.keep_from_gc or self.id < 0: return
         #run_javascript('delete global.' + self.variable)
-        run_safe_del('global', self.variable)
-        del globals.garbage[self.variable]
+        handle = self.id
+        self.forget_handle()
+        release_handle(handle)
+        if globals.free_handles is None:
+           globals.free_handles = []
+        globals.free_handles.append(handle)
 
     def keep(self):
+        #Kept objects are pinned so their handle outlives every RPython reference (e.g. a toRef() stored on the JS side)
+        #An Object stored in RPython state to be used by a later event still needs keep(): without it the handle is
+        #released when the event that made it returns, and any later use raises ReleasedObjectError
         self.keep_from_gc = True
+        if globals.kept is None:
+           globals.kept = {}
+        globals.kept[self.handle()] = self
         return self
 
     def release(self):
+        if not self.keep_from_gc: return self
         self.keep_from_gc = False
+        if globals.kept is not None and self.id in globals.kept:
+           del globals.kept[self.id]
+        scope_object(self)
         return self
 
     def __iter__(self):
+        self.handle()
         keys = Object('Object.keys(global.%s)' % (self.variable))
         length = keys.unsafe_get_item('length').toInteger()
         objects = []
@@ -907,12 +1164,73 @@ class Object:
         return iter(objects)
 
     def __setitem__(self, key, value):
-        run_safe_set(self.variable, key, json.parse_rpy_json(value))
+        run_safe_set(self.handle(), key, json.parse_rpy_json(value))
         #run_javascript(('global.%s["%s"] = ' % (self.variable, key)) + json.parse_rpy_json(value))
         return
 
     def unsafe_get_item(self, key):
-        return Object(self.variable, safe_get=key) #, bind="object = typeof object != 'function' || object.prototype ? object : object.bind(global." + self.variable + ')')
+        return Object('', safe_get=key, handle=self.handle()) #, bind="object = typeof object != 'function' || object.prototype ? object : object.bind(global." + self.variable + ')')
+
+    def unsafe_get_method(self, key):
+        #Like unsafe_get_item but the handle is cached on this object, so repeated calls of the same method skip the crossing
+        #Only meant for methods that are not reassigned, the JS side already reuses one bound function per (receiver, key)
+        if self.methods is None:
+           self.methods = {}
+        method = self.methods.get(key, None)
+        if method is None or method.id < 0:
+           method = self.unsafe_get_item(key)
+           self.methods[key] = method
+        return method
+
+    def get_many(self, keys, kinds):
+        #Reads every key in one crossing, kinds has a letter per key: s(tring), i(nteger), f(loat), b(oolean) or o(bject)
+        #Primitives come back coerced in a packed buffer, objects get a handle each like unsafe_get_item
+        assert len(keys) == len(kinds)
+        if globals.collector_id is None: run_garbage_collector()
+        length = len(keys)
+        properties = Properties(length)
+        handles = lltype.malloc(rffi.INTP.TO, max(length, 1), flavor='raw')
+        for index in range(length):
+            if kinds[index] == 'o':
+               object = Object('', safe_empty=True)
+               properties.objects[index] = object
+               handles[index] = rffi.cast(rffi.INT, object.id)
+            else: handles[index] = rffi.cast(rffi.INT, -1)
+        mark = bridge.arena.mark()
+        offset = bridge.arena.write_charp(kinds)
+        globals.bridge_depth += 1
+        buffer = get_many(self.handle(), bridge.encode_arguments(bridge.arguments, keys), bridge.arena.pointer(offset), handles)
+        globals.bridge_depth -= 1
+        bridge.arena.release(mark)
+        lltype.free(handles, flavor='raw')
+        position = 0
+        for index in range(length):
+            kind = kinds[index]
+            present = buffer[position] != '\x00'
+            position += 1
+            if not present: continue
+            properties.present[index] = True
+            if kind == 'o' or kind == 's':
+               size = bridge.read_int32(buffer, position)
+               value = rffi.charpsize2str(rffi.ptradd(buffer, position + 4), size)
+               position += 4 + size
+               if kind == 's': properties.strings[index] = value
+               else:
+                  object = properties.objects[index]
+                  assert object is not None
+                  object.type = value
+                  properties.present[index] = value != 'undefined'
+            elif kind == 'i':
+               properties.integers[index] = bridge.read_int32(buffer, position)
+               position += 4
+            elif kind == 'f':
+               properties.floats[index] = bridge.read_float64(buffer, position)
+               position += 8
+            else:
+               properties.booleans[index] = buffer[position] != '\x00'
+               position += 1
+        lltype.free(buffer, flavor='raw')
+        return properties
 
     #def unsafe_get_item_multiple(self, keys):
     #    object = Object(self.variable, safe_get=keys.pop(0))
@@ -921,14 +1239,14 @@ class Object:
     #    return object
 
     def toString(self):
-        return get_string(self.variable)
+        return get_string(self.handle())
         #if self.type == 'string': return run_javascript('return global.%s' % self.variable, returns=True)
         #return run_javascript(String('return global.{0} && global.{0}.toString ? global.{0}.toString() : String(global.{0})').format(self.variable).value, returns=True)
 
     def toStr(self): return self.toString()
 
     def toInteger(self):
-        return int(get_integer(self.variable))
+        return rffi.cast(lltype.Signed, get_integer(self.handle()))
         #integer = 0
         #if self.type == 'number': integer = int(run_javascript('return JSON.stringify(global.%s)' % self.variable, returns=True))
         #else: integer = int(run_javascript(String('var integer = parseInt(global.{0}); if (!isNaN(integer)) return integer; console.log(global.{0}); throw new Error("Not a number")').format(self.variable).value, returns=True))
@@ -937,22 +1255,14 @@ class Object:
     def toInt(self): return self.toInteger()
 
     def toFloat(self):
-        return float(get_float(self.variable))
+        return get_float(self.handle())
         #number = 0
         #if self.type == 'number': number = float(run_javascript('return JSON.stringify(global.%s)' % self.variable, returns=True))
         #else: number = float(run_javascript(String('var float = parseFloat(global.{0}); if (!isNaN(float)) return float; console.log(global.{0}); throw new Error("Not a number")').format(self.variable).value, returns=True))
         #return number
 
     def toBoolean(self):
-        self._update()
-        if self.type == 'boolean':
-           return True if 'true' == self.toString() else False
-        #return True if 'true' == get_boolean(self.variable) else False
-        elif self.type in ['array', 'object']: return True
-        elif self.type == 'string': return self.unsafe_get_item('length').toBoolean()
-        elif self.type == 'number': return self.toInteger() != 0
-        elif self.type in ['null', 'undefined']: return False
-        return True
+        return rffi.cast(lltype.Signed, get_boolean(self.handle())) != 0
 
     def toBool(self): return self.toBoolean()
 
@@ -969,11 +1279,12 @@ class Object:
         return closure.call
 
     def toReference(self):
-        return 'RPYJSOBJECT:' + self.variable + ':RPYJSOBJECT'
+        return 'RPYJSOBJECT:' + str(self.handle()) + ':RPYJSOBJECT'
 
     def toRef(self): return self.toReference()
 
     def toDict(self):
+        self.handle()
         keys = Object('Object.keys(global.%s)' % (self.variable))
         length = keys.unsafe_get_item('length').toInteger()
         object = {}
@@ -1011,15 +1322,34 @@ class Object:
         return [item.toString() for item in self.toList()]
 
     def toListInteger(self):
-        return [item.toInteger() for item in self.toList()]
+        length = rffi.cast(lltype.Signed, get_length(self.handle()))
+        buffer = lltype.malloc(rffi.INTP.TO, length, flavor='raw')
+        copy_integers(self.handle(), buffer, length)
+        values = [rffi.cast(lltype.Signed, buffer[index]) for index in range(length)]
+        lltype.free(buffer, flavor='raw')
+        return values
 
     def toListFloat(self):
-        return [item.toFloat() for item in self.toList()]
+        length = rffi.cast(lltype.Signed, get_length(self.handle()))
+        buffer = lltype.malloc(rffi.DOUBLEP.TO, length, flavor='raw')
+        copy_floats(self.handle(), buffer, length)
+        values = [buffer[index] for index in range(length)]
+        lltype.free(buffer, flavor='raw')
+        return values
+
+    def toBytes(self):
+        length = rffi.cast(lltype.Signed, get_length(self.handle()))
+        buffer = lltype.malloc(rffi.CCHARP.TO, length, flavor='raw')
+        copy_bytes(self.handle(), buffer, length)
+        value = rffi.charpsize2str(buffer, length)
+        lltype.free(buffer, flavor='raw')
+        return value
 
     def toListBoolean(self):
         return [item.toBoolean() for item in self.toList()]
 
     def log(self):
+        self.handle()
         run_javascript('console.warn(global.%s)' % (self.variable))
         return self
 
@@ -1029,20 +1359,127 @@ class Object:
         return self
 
     def _update(self):
-        self.type = run_safe_type_update(self.variable)
+        self.type = run_safe_type_update(self.handle())
         #self.type = run_javascript(String("if (global.{0} === null) {return 'null'} else if (Array.isArray(global.{0})) {return 'array'} else return typeof global.{0}").replace('{0}', self.variable).value, returns=True)
         self.resolved = True if self.type in ['null', 'undefined'] or self.unsafe_get_item('then').type != 'function' else False if self.unsafe_get_item('rpython_resolved').type != 'boolean' else True
 
+#Indexed by the type codes written by gather_types
+GATHER_TYPES = ['undefined', 'null', 'array', 'object', 'function', 'string', 'number', 'boolean', 'symbol', 'bigint']
+
+class Gather(Object):
+    #Awaits several JS objects through a single Promise.all, the @asynchronous function is resumed once when all of them
+    #are settled and every result gets its own handle, types included, without probing each object on the way
+
+    def __init__(self, objects):
+        Object.__init__(self, '', safe_empty=True)
+        self.resolved = False
+        self.results = [Object('', safe_empty=True) for object in objects]
+        count = len(objects)
+        buffer = lltype.malloc(rffi.INTP.TO, max(count * 2, 1), flavor='raw')
+        for index in range(count):
+            buffer[index] = rffi.cast(rffi.INT, objects[index].handle())
+            buffer[count + index] = rffi.cast(rffi.INT, self.results[index].id)
+        gather_promise(buffer, rffi.ptradd(buffer, count), count, self.id)
+        lltype.free(buffer, flavor='raw')
+        self.type = 'object'
+
+    def wait(self, awaits, native_awaits, promise_id, parent_id):
+        awaits.append(self)
+        return self
+
+    def _update(self):
+        if self.resolved: return
+        count = len(self.results)
+        buffer = lltype.malloc(rffi.CCHARP.TO, max(count, 1), flavor='raw')
+        if rffi.cast(lltype.Signed, gather_types(self.handle(), buffer, count)) != 0:
+           for index in range(count): self.results[index].type = GATHER_TYPES[ord(buffer[index])]
+           self.type = 'array'
+           self.resolved = True
+        lltype.free(buffer, flavor='raw')
+
+    def toList(self):
+        return self.results
+
+def gather(*objects):
+    #results = gather(first, second).wait() inside an @asynchronous function, then results.toList()
+    return Gather(list(objects))
+
+class HandleQueue(rgc.FinalizerQueue):
+    #Handles of collected Objects are not released right away: a toRef() string of a dead Object may still be
+    #used during the current event turn, so they are released together by collect_handles() on the next one
+    #Only a collecting GC runs this, with --gc=none (what bin/compile.js uses) end_event() does all the releasing
+    Class = Object
+
+    def finalizer_trigger(self):
+        while True:
+            object = self.next_dead()
+            if object is None: break
+            if object.id < 0: continue
+            if globals.dying_handles is None:
+               globals.dying_handles = []
+            globals.dying_handles.append(object.id)
+
+handle_queue = HandleQueue()
+
+def collect_handles():
+    #Releases every handle that died before this turn in one crossing and makes the slots reusable
+    dying = globals.dying_handles
+    if not dying: return
+    globals.dying_handles = None
+    count = len(dying)
+    buffer = lltype.malloc(rffi.INTP.TO, count, flavor='raw')
+    for index in range(count): buffer[index] = rffi.cast(rffi.INT, dying[index])
+    release_handles(buffer, count)
+    lltype.free(buffer, flavor='raw')
+    if globals.free_handles is None:
+       globals.free_handles = []
+    globals.free_handles.extend(dying)
+
+def start_event():
+    #Called when JS enters RPython, only a new event turn (not a callback nested in a bridge call) collects
+    if globals.bridge_depth == 0: collect_handles()
+    globals.event_depth += 1
+
+def scope_object(object):
+    #Objects made while handling an event belong to it, keep() is needed for one to outlive the event
+    if globals.event_depth == 0: return
+    if globals.scope is None:
+       globals.scope = []
+    globals.scope.append(object)
+
+def end_event(result):
+    #Releases the handles of the Objects made during the event when the outermost event returns, so that they do
+    #not depend on the GC: with --gc=none (what bin/compile.js uses) the HandleQueue never sees a dead Object.
+    #While an @asynchronous function is pending its state may hold some of them, so they wait for a later event.
+    #The result is read by the JS caller right after the return, it is released at the end of the next event
+    #The lifetime of an Object is not tracked beyond its event, a released one fails loudly (see Object.handle)
+    globals.event_depth -= 1
+    if globals.event_depth > 0: return
+    scope = globals.scope
+    if not scope: return
+    if globals.pendingAsync is not None and len(globals.pendingAsync): return
+    globals.scope = None
+    for object in scope:
+        if object is result:
+           globals.scope = [result]
+           continue
+        if object.keep_from_gc or object.id < 0: continue
+        if globals.dying_handles is None:
+           globals.dying_handles = []
+        globals.dying_handles.append(object.id)
+        object.forget_handle()
+    collect_handles()
+
 @staticmethod
 def unsafe_global_get(key):
-    object = Object('global', safe_get=key)
+    object = Object('', safe_get=key)
     return object
 
 Object.get = unsafe_global_get
 
 def unsafe_object_get(*args):
     keys = list(args)
-    object = Object('global', safe_get=keys.pop(0))
+    object = Object('', safe_get=keys.pop(0))
     for key in keys:
         object = object.unsafe_get_item(key)
     return object
@@ -1056,10 +1493,12 @@ class Wait:
     def __init__(self):
         self.object = {'resolved': False}
 
-handler_template = """
-def resolve_next_event(parent_id, child_id):
-    if False: return
-"""
+#One resume function per @asynchronous function, indexed by the id it gets at import time, see dispatch_promise
+promise_dispatch = []
+
+def dispatch_promise(parent_id, child_id):
+    if parent_id < 0 or parent_id >= len(promise_dispatch): return
+    promise_dispatch[parent_id](child_id)
 
 def get_variables_name(variables):
     return ', '.join(variables)
@@ -1176,7 +1615,7 @@ def asynchronous(function):
                if len(self.waitable.native_map) == self.waitable.native_values_count:
                   for index in range(self.waitable.native_values_count):
                       self.waitable.native_values[index] = self.waitable.native_map[index]
-            globals.resolve_next_event(str(self.waitable.parent_id), str(self.waitable.promise_id))
+            globals.resolve_next_event(self.waitable.parent_id, self.waitable.promise_id)
 
     source = inspect.getsource(function)
     name = function.__name__
@@ -1306,10 +1745,10 @@ else:
                   resolved_all = False
                   break
            if resolved_all:
-              globals.resolve_next_event(str(promise.parent.id), str(promise.id))
+              globals.resolve_next_event(promise.parent.id, promise.id)
               return
         if promise.native_awaits and not promise.awaits: return
-        run_safe_promise(str(promise.parent.id), str(promise.id), '[' + ', '.join(['"%s"' % object.variable for object in promise.awaits]) + ']')
+        run_safe_promise(promise.parent.id, promise.id, '[' + ', '.join([str(object.handle()) for object in promise.awaits]) + ']')
         '''run_javascript("""
         var args = ['%s', '%s'].map(function (string) {return allocate.length === 2 ? allocate(intArrayFromString(string), ALLOC_NORMAL) : allocate(intArrayFromString(string), 'i8', ALLOC_NORMAL)});
         Promise.all(%s.map(async function (variable) {
@@ -1334,22 +1773,11 @@ else:
     promise.id = id
     globals.promises += 1
     setattr(globals, 'promise_' + str(id), promise)
-    template = handler_template
-    indent = ' ' * 4
-    for index in range(globals.promises):
-        template += indent + "elif parent_id == '%s': int(child_id) in rpython_globals.promise_%s.promises and rpython_globals.promise_%s.promises[int(child_id)].next()\n" % (index, index, index)
-    if decompile is None:
-       exec(template, namespace)
-    else:
-       fd, path = tempfile.mkstemp(dir=os.getenv('PYPY_USESSION_DIR'))
-       file = open(path, 'w')
-       file.write(template)
-       file.seek(0)
-       file.close()
-       module = imp.load_source(path, path)
-       module.__dict__.update(namespace)
-       namespace['resolve_next_event'] = module.resolve_next_event
-    globals.resolve_next_event = namespace['resolve_next_event']
+    def dispatch(child_id):
+        if child_id in Promise.promises: Promise.promises[child_id].next()
+    promise_dispatch.append(dispatch)
+    assert len(promise_dispatch) == globals.promises
+    globals.resolve_next_event = dispatch_promise
     entry = promise.entry
     def async_wrapper(*args):
         return entry(*args)
@@ -1358,9 +1786,10 @@ else:
 
 asynchronous_function = asynchronous
 
-@entrypoint_highlevel(key='main', c_name='onresolve', argtypes=[rffi.CCHARP, rffi.CCHARP])
-def onresolve(*args):
-    pointers = list(args)
-    parent, child = [rffi.charp2str(pointer) for pointer in pointers]
-    for pointer in pointers: lltype.free(pointer, flavor='raw')
-    globals.resolve_next_event(parent, child)
+@entrypoint_highlevel(key='main', c_name='onresolve', argtypes=[rffi.INT, rffi.INT])
+def onresolve(parent, child):
+    start_event()
+    try:
+        globals.resolve_next_event(rffi.cast(lltype.Signed, parent), rffi.cast(lltype.Signed, child))
+    finally:
+        end_event(None)
@@ -1,12 +1,11 @@
 from . import stringify
-from json.encoder import ESCAPE_DCT as escapes
-from rpython.rlib.rstring import replace
+from .writer import Writer, escape
+from rpython.rlib.rstring import StringBuilder
 
 def encode(value):
-    for escape in reversed(escapes.keys()):
-    #    #value = escapes[escape].join(value.split(escape))
-        value = replace(value, escape, escapes[escape])
-    return '"' + value + '"'
+    builder = StringBuilder(len(value) + 2)
+    escape(builder, value)
+    return builder.build()
 
 def rpyjson(function):
     def wrapper(value, parse=False):
@@ -54,19 +53,22 @@ fromBool = fromBoolean
 @rpyjson
 def fromDict(value): #string only
     if value is None: return 'null'
-    json = '{'
-    index = 0
+    writer = Writer()
+    writer.start_dict()
     for key in value:
-        if index > 0: json += ','
-        json += ('"%s":' % key) + parse_rpy_json(value[key])
-        index += 1
-    json += '}'
-    return json
+        writer.key(key)
+        writer.value(value[key])
+    writer.end_dict()
+    return writer.build()
 
 @rpyjson
 def fromList(values):
     if values is None: return 'null'
-    return '[' + ','.join([parse_rpy_json(value) for value in values]) + ']'
+    writer = Writer()
+    writer.start_list()
+    for value in values: writer.value(value)
+    writer.end_list()
+    return writer.build()
 
 @rpyjson
 def fromTuple(values):
@@ -1,24 +1,29 @@
 from rpython.rlib.objectmodel import enforceargs
+from rpython.rlib.rstring import StringBuilder
 from .. import types
+from .writer import escape
 
 #enforceargs(dict, types.function)
 def main(object, stringify_value):
-    json = '{'
+    json = StringBuilder()
+    json.append('{')
     index = 0
     for key in object:
-        if index > 0: json += ','
-        json += '"%s":' % (key)
-        value = stringify_value(object[key])
-        json += value
+        if index > 0: json.append(',')
+        escape(json, key)
+        json.append(':')
+        json.append(stringify_value(object[key]))
         index += 1
-    json += '}'
-    return json
+    json.append('}')
+    return json.build()
 
 #enforceargs(types.str)
 def stringify_str(value):
     if value is None: return 'null'
     assert isinstance(value, types.str), 'value must be string in stringify_str'
-    return '"%s"' % (value)
+    json = StringBuilder(len(value) + 2)
+    escape(json, value)
+    return json.build()
 
 #enforceargs(dict)
 def str(object):
@@ -0,0 +1,85 @@
+from json.encoder import ESCAPE_DCT as escapes
+from rpython.rlib.rstring import StringBuilder
+
+#Incremental JSON writer, every piece is appended to one StringBuilder so a whole document is built in linear time
+
+def escape(builder, value):
+    #Single pass over value, the unescaped runs in between are copied as slices
+    builder.append('"')
+    start = 0
+    for index in range(len(value)):
+        char = value[index]
+        if char == '"' or char == '\\' or ord(char) < 0x20:
+           if index > start: builder.append_slice(value, start, index)
+           builder.append(escapes[char])
+           start = index + 1
+    builder.append_slice(value, start, len(value))
+    builder.append('"')
+
+class Writer:
+
+    def __init__(self, size=64):
+        self.builder = StringBuilder(size)
+        self.counts = [] #Values written so far in every open list or dict
+        self.after_key = False
+
+    def separate(self):
+        if self.after_key:
+           self.after_key = False
+           return
+        depth = len(self.counts)
+        if depth == 0: return
+        if self.counts[depth - 1] > 0: self.builder.append(',')
+        self.counts[depth - 1] += 1
+
+    def start_dict(self):
+        self.separate()
+        self.builder.append('{')
+        self.counts.append(0)
+
+    def end_dict(self):
+        self.counts.pop()
+        self.builder.append('}')
+
+    def start_list(self):
+        self.separate()
+        self.builder.append('[')
+        self.counts.append(0)
+
+    def end_list(self):
+        self.counts.pop()
+        self.builder.append(']')
+
+    def key(self, name):
+        self.separate()
+        escape(self.builder, name)
+        self.builder.append(':')
+        self.after_key = True
+
+    def raw(self, json):
+        #Already serialized JSON
+        self.separate()
+        self.builder.append(json)
+
+    def raw_slice(self, json, start, end):
+        self.separate()
+        self.builder.append_slice(json, start, end)
+
+    def null(self):
+        self.raw('null')
+
+    def string(self, value):
+        if value is None: return self.null()
+        self.separate()
+        escape(self.builder, value)
+
+    def value(self, value):
+        #A string as javascript.json passes them around, RPYJSON:...:RPYJSON is written as is and anything else as a JSON string
+        if value is None: return self.null()
+        if value.startswith('RPYJSON:') and value.endswith(':RPYJSON'):
+           end = max(len(value) - 8, 8)
+           return self.raw_slice(value, 8, end)
+        self.string(value)
+
+    def build(self):
+        return self.builder.build()
@@ -0,0 +1,80 @@
+import struct
+from rpython.javascript import bridge
+from rpython.javascript.bridge import ScratchBuffer, encode_arguments, is_integer, is_float, reference_handle
+from rpython.rtyper.lltypesystem import lltype
+
+
+def decode_arguments(buffer):
+    #Reads the encoding back the way deserialize_rpython_arguments does on the JS side
+    data = ''.join([buffer.buffer[index] for index in range(buffer.length)])
+    count, = struct.unpack('<i', data[:4])
+    offset = 4
+    args = []
+    for _ in range(count):
+        tag = ord(data[offset])
+        offset += 1
+        if tag == bridge.TAG_NULL: args.append(None)
+        elif tag == bridge.TAG_TRUE: args.append(True)
+        elif tag == bridge.TAG_FALSE: args.append(False)
+        elif tag in (bridge.TAG_INTEGER, bridge.TAG_HANDLE):
+            value, = struct.unpack('<i', data[offset:offset + 4])
+            offset += 4
+            args.append((tag, value))
+        elif tag == bridge.TAG_FLOAT:
+            value, = struct.unpack('<d', data[offset:offset + 8])
+            offset += 8
+            args.append((tag, value))
+        else:
+            assert tag in (bridge.TAG_STRING, bridge.TAG_JSON)
+            length, = struct.unpack('<i', data[offset:offset + 4])
+            offset += 4
+            args.append((tag, data[offset:offset + length]))
+            offset += length
+    assert offset == buffer.length
+    return args
+
+def encode(args):
+    buffer = ScratchBuffer(size=8)
+    try:
+        encode_arguments(buffer, args)
+        return decode_arguments(buffer)
+    finally:
+        lltype.free(buffer.buffer, flavor='raw')
+
+def test_round_trip():
+    args = [None, 'RPYJSON:null:RPYJSON', 'RPYJSON:true:RPYJSON', 'RPYJSON:false:RPYJSON',
+            'RPYJSON:42:RPYJSON', 'RPYJSON:-7:RPYJSON', 'RPYJSON:1.5:RPYJSON', 'RPYJSON:-2e3:RPYJSON',
+            'hello', '', 'RPYJSOBJECT:12:RPYJSOBJECT', 'RPYJSON:[1,{"a":2}]:RPYJSON', 'RPYJSON:"q\\"":RPYJSON']
+    assert encode(args) == [None, None, True, False,
+                            (bridge.TAG_INTEGER, 42), (bridge.TAG_INTEGER, -7),
+                            (bridge.TAG_FLOAT, 1.5), (bridge.TAG_FLOAT, -2000.0),
+                            (bridge.TAG_STRING, 'hello'), (bridge.TAG_STRING, ''),
+                            (bridge.TAG_HANDLE, 12),
+                            (bridge.TAG_JSON, '[1,{"a":2}]'), (bridge.TAG_JSON, '"q\\""')]
+
+def test_round_trip_grows_buffer():
+    text = 'x' * 1000
+    assert encode([text, 'RPYJSON:3:RPYJSON']) == [(bridge.TAG_STRING, text), (bridge.TAG_INTEGER, 3)]
+
+def test_odd_numbers_go_through_json():
+    for text in ['e5', '1e5e5', '1.2.3', '1.', '.5', '1e', '1e+', '--1', '1-2', '1234567890']:
+        assert encode(['RPYJSON:' + text + ':RPYJSON']) == [(bridge.TAG_JSON, text)]
+
+def test_is_integer():
+    for text in ['0', '-1', '123456789', '-123456789']:
+        assert is_integer(text)
+    for text in ['', '-', '1234567890', '1.0', '1e3', '+1', 'a']:
+        assert not is_integer(text)
+
+def test_is_float():
+    for text in ['1.5', '-0.25', '1e5', '1E-5', '2.5e+10', '-3.0E2']:
+        assert is_float(text)
+    for text in ['', '1', '-', 'e5', '1e5e5', '1.2.3', '1.', '.5', '1e', '1e+', '-.5', '1.5x', 'nan', 'inf']:
+        assert not is_float(text)
+
+def test_reference_handle():
+    assert reference_handle('RPYJSOBJECT:0:RPYJSOBJECT') == 0
+    assert reference_handle('RPYJSOBJECT:345:RPYJSOBJECT') == 345
+    for value in ['RPYJSOBJECT:-1:RPYJSOBJECT', 'RPYJSOBJECT::RPYJSOBJECT', 'RPYJSOBJECT:RPYJSOBJECT',
+                  'RPYJSOBJECT:x:RPYJSOBJECT', 'RPYJSOBJECT:1', '1:RPYJSOBJECT', 'plain']:
+        assert reference_handle(value) == -1
@@ -0,0 +1,95 @@
+import py
+from rpython.javascript import emscripten
+from rpython.javascript.emscripten import Object, ReleasedObjectError
+from rpython.rtyper.lltypesystem import lltype, rffi
+
+
+class FakeObject(Object):
+    #Takes a handle and joins the current event like Object.__init__, without crossing into JS
+
+    def __init__(self):
+        self.id = emscripten.allocate_handle()
+        self.variable = 'rpython_handles[' + str(self.id) + ']'
+        self.type = 'object'
+        emscripten.scope_object(self)
+
+def fresh_globals(monkeypatch):
+    #Returns the list of the handles given to release_handles
+    released = []
+    def release_handles(buffer, count):
+        for index in range(count):
+            released.append(rffi.cast(lltype.Signed, buffer[index]))
+    monkeypatch.setattr(emscripten, 'globals', emscripten.Globals())
+    monkeypatch.setattr(emscripten, 'release_handles', release_handles)
+    return released
+
+def test_release_at_end_of_event(monkeypatch):
+    released = fresh_globals(monkeypatch)
+    emscripten.start_event()
+    made = FakeObject()
+    kept = FakeObject().keep()
+    handle = made.id
+    emscripten.end_event(None)
+    assert released == [handle]
+    assert made.id == -1
+    assert made.variable == emscripten.RELEASED_VARIABLE
+    assert kept.handle() == kept.id > 0
+    # the slot is reused, the released Object must not alias the new one
+    emscripten.start_event()
+    other = FakeObject()
+    assert other.id == handle
+    py.test.raises(ReleasedObjectError, made.handle)
+    py.test.raises(ReleasedObjectError, made.toString)
+    py.test.raises(ReleasedObjectError, made.toReference)
+    py.test.raises(ReleasedObjectError, made.unsafe_get_item, 'key')
+    py.test.raises(ReleasedObjectError, made.call)
+    py.test.raises(ReleasedObjectError, made.keep)
+    made.free()     # already released, nothing to do
+    assert released == [handle]
+
+def test_release_nested_event(monkeypatch):
+    released = fresh_globals(monkeypatch)
+    emscripten.start_event()
+    outer = FakeObject()
+    emscripten.start_event()
+    inner = FakeObject()
+    handles = [outer.id, inner.id]
+    emscripten.end_event(None)
+    assert released == []
+    assert inner.handle() == handles[1]
+    emscripten.end_event(None)
+    assert released == handles
+    assert outer.id == inner.id == -1
+
+def test_release_result_after_next_event(monkeypatch):
+    released = fresh_globals(monkeypatch)
+    emscripten.start_event()
+    result = FakeObject()
+    handle = result.id
+    emscripten.end_event(result)
+    assert released == []
+    assert result.handle() == handle
+    emscripten.start_event()
+    emscripten.end_event(None)
+    assert released == [handle]
+
+def test_release_waits_for_pending_async(monkeypatch):
+    released = fresh_globals(monkeypatch)
+    emscripten.globals.pendingAsync = {'1:1': True}
+    emscripten.start_event()
+    made = FakeObject()
+    emscripten.end_event(None)
+    assert released == []
+    assert made.handle() > 0
+    emscripten.globals.pendingAsync = {}
+    emscripten.start_event()
+    emscripten.end_event(None)
+    assert made.id == -1
+
+def test_no_release_outside_event(monkeypatch):
+    released = fresh_globals(monkeypatch)
+    made = FakeObject()
+    emscripten.start_event()
+    emscripten.end_event(None)
+    assert released == []
+    assert made.handle() > 0
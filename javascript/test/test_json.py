@@ -0,0 +1,76 @@
+import json as pyjson
+from rpython.javascript.json import stringify
+from rpython.javascript.json.writer import Writer, escape
+from rpython.rlib.rstring import StringBuilder
+
+
+def escaped(value):
+    builder = StringBuilder()
+    escape(builder, value)
+    return builder.build()
+
+def test_escape_plain():
+    assert escaped('') == '""'
+    assert escaped('hello') == '"hello"'
+
+def test_escape_quotes_and_backslashes():
+    assert escaped('a"b') == '"a\\"b"'
+    assert escaped('a\\b') == '"a\\\\b"'
+    assert escaped('"\\"') == '"\\"\\\\\\""'
+
+def test_escape_control_characters():
+    assert escaped('\n\r\t\b\f') == '"\\n\\r\\t\\b\\f"'
+    assert escaped('\x00x\x1f') == '"\\u0000x\\u001f"'
+    for code in range(0x20):
+        assert pyjson.loads(escaped(chr(code))) == chr(code)
+
+def test_escape_non_ascii():
+    text = u'caf\xe9 \u2603'.encode('utf-8')
+    assert escaped(text) == '"' + text + '"'
+    assert pyjson.loads(escaped(text)) == text.decode('utf-8')
+
+def test_writer_nested():
+    writer = Writer()
+    writer.start_dict()
+    writer.key('a')
+    writer.start_list()
+    writer.raw('1')
+    writer.start_dict()
+    writer.end_dict()
+    writer.start_list()
+    writer.null()
+    writer.string('x')
+    writer.end_list()
+    writer.end_list()
+    writer.key('b"')
+    writer.start_dict()
+    writer.key('c')
+    writer.value('RPYJSON:true:RPYJSON')
+    writer.key('d')
+    writer.value('y\n')
+    writer.end_dict()
+    writer.key('e')
+    writer.value(None)
+    writer.end_dict()
+    result = writer.build()
+    assert result == '{"a":[1,{},[null,"x"]],"b\\"":{"c":true,"d":"y\\n"},"e":null}'
+    assert pyjson.loads(result) == {'a': [1, {}, [None, 'x']], 'b"': {'c': True, 'd': 'y\n'}, 'e': None}
+
+def test_writer_empty_containers():
+    writer = Writer()
+    writer.start_list()
+    writer.start_list()
+    writer.end_list()
+    writer.start_dict()
+    writer.end_dict()
+    writer.end_list()
+    assert writer.build() == '[[],{}]'
+
+def test_stringify_escapes_keys_and_values():
+    result = stringify.str({'k"\\': 'v"\n', 'n': None})
+    assert pyjson.loads(result) == {'k"\\': 'v"\n', 'n': None}
+    assert stringify.stringify_str('a"b') == '"a\\"b"'
+
+def test_stringify_escapes_keys_of_other_types():
+    assert pyjson.loads(stringify.int({'a"': 1, 'b': None})) == {'a"': 1, 'b': None}
+    assert pyjson.loads(stringify.bool({'\t': True})) == {'\t': True}
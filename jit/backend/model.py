@@ -161,6 +161,12 @@ class AbstractCPU(object):
         """
         pass
 
+    def get_code_memory_used(self):
+        """Return the number of bytes of machine code and raw data
+        currently allocated for compiled loops and bridges, or 0 if
+        the backend does not know it."""
+        return 0
+
     def sizeof(self, S):
         raise NotImplementedError
 
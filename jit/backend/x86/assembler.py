@@ -89,6 +89,7 @@ class Assembler386(BaseAssembler, VectorAssemblerMixin):
                                                         allblocks)
         self.target_tokens_currently_compiling = {}
         self.frame_depth_to_patch = []
+        self.wide_vectors = False
 
 
     def teardown(self):
@@ -970,6 +971,7 @@ class Assembler386(BaseAssembler, VectorAssemblerMixin):
     def _assemble(self, regalloc, inputargs, operations):
         self._regalloc = regalloc
         self.guard_success_cc = rx86.cond_none
+        self.wide_vectors = self.uses_wide_vectors(operations)
         regalloc.compute_hint_frame_locations(operations)
         regalloc.walk_operations(inputargs, operations)
         assert self.guard_success_cc == rx86.cond_none
@@ -1143,8 +1145,13 @@ class Assembler386(BaseAssembler, VectorAssemblerMixin):
         to_xmm = isinstance(to_loc, RegLoc) and to_loc.is_xmm
         if from_xmm or to_xmm:
             if from_xmm and to_xmm:
-                # copy 128-bit from -> to
-                self.mc.MOVAPD(to_loc, from_loc)
+                if (self.wide_vectors or from_loc.location_code() == 'y' or
+                                         to_loc.location_code() == 'y'):
+                    # copy 256-bit from -> to
+                    self.mc.VMOVAPD_yy(to_loc.value, from_loc.value)
+                else:
+                    # copy 128-bit from -> to
+                    self.mc.MOVAPD(to_loc, from_loc)
             else:
                 self.mc.MOVSD(to_loc, from_loc)
         else:
@@ -1328,14 +1335,23 @@ class Assembler386(BaseAssembler, VectorAssemblerMixin):
         cb = callbuilder.CallBuilder(self, fnloc, arglocs,
                                      result_loc, result_type,
                                      result_size)
+        self._leave_wide_vectors()
         cb.emit()
         self.num_moves_calls += cb.num_moves
 
     def simple_call_no_collect(self, fnloc, arglocs):
         cb = callbuilder.CallBuilder(self, fnloc, arglocs)
+        self._leave_wide_vectors()
         cb.emit_no_collect()
         self.num_moves_calls += cb.num_moves
 
+    def _leave_wide_vectors(self):
+        # leaving AVX code, avoid the penalty in the SSE code after us.
+        # The upper halves of the ymm registers are lost, which is fine
+        # because no vector survives a call or an exit of the trace
+        if self.wide_vectors:
+            self.mc.VZEROUPPER()
+
     def _reload_frame_if_necessary(self, mc, shadowstack_reg=None):
         gcrootmap = self.cpu.gc_ll_descr.gcrootmap
         if gcrootmap:
@@ -1973,6 +1989,7 @@ class Assembler386(BaseAssembler, VectorAssemblerMixin):
         #
         self._update_at_exit(guardtok.fail_locs, guardtok.failargs,
                              guardtok.faildescr, regalloc)
+        self._leave_wide_vectors()
         #
         faildescrindex, target = self.store_info_on_descr(startpos, guardtok)
         if IS_X86_64:
@@ -2122,6 +2139,7 @@ class Assembler386(BaseAssembler, VectorAssemblerMixin):
             ofs = self.cpu.get_ofs_of_frame_field('jf_gcmap')
             self.mc.MOV_bi(ofs, 0)
         # exit function
+        self._leave_wide_vectors()
         self._call_footer()
 
     def implement_guard(self, guard_token):
@@ -2162,6 +2180,7 @@ class Assembler386(BaseAssembler, VectorAssemblerMixin):
         assert isinstance(signloc, ImmedLoc)
         cb.ressign = signloc.value
 
+        self._leave_wide_vectors()
         if is_call_release_gil:
             saveerrloc = arglocs[2]
             assert isinstance(saveerrloc, ImmedLoc)
@@ -2442,12 +2461,14 @@ class Assembler386(BaseAssembler, VectorAssemblerMixin):
         not_implemented("not implemented operation (guard): %s" %
                         guard_op.getopname())
 
-    def closing_jump(self, target_token):
+    def closing_jump(self, target_token, passes_vectors=False):
         target = target_token._ll_loop_code
         if target_token in self.target_tokens_currently_compiling:
             curpos = self.mc.get_relative_pos() + 5
             self.mc.JMP_l(target - curpos)
         else:
+            if not passes_vectors:
+                self._leave_wide_vectors()
             self.mc.JMP(imm(target))
 
     def label(self):
@@ -20,16 +20,19 @@ def detect_sse2():
     code = cpu_id(eax=1)
     return bool(code & (1<<25)) and bool(code & (1<<26))
 
-def cpu_id(eax = 1, ret_edx = True, ret_ecx = False):
+def cpu_id(eax = 1, ret_edx = True, ret_ecx = False, ret_ebx = False):
     asm = ["\xB8",                     # MOV EAX, $eax
                 chr(eax & 0xff),
                 chr((eax >> 8) & 0xff),
                 chr((eax >> 16) & 0xff),
                 chr((eax >> 24) & 0xff),
+           "\x31\xC9",                 # XOR ECX, ECX (sub-leaf 0)
            "\x53",                     # PUSH EBX
            "\x0F\xA2",                 # CPUID
-           "\x5B",                     # POP EBX
           ]
+    if ret_ebx:
+        asm.append("\x89\xD8")         # MOV EAX, EBX
+    asm.append("\x5B")                 # POP EBX
     if ret_edx:
         asm.append("\x92")             # XCHG EAX, EDX
     elif ret_ecx:
@@ -52,6 +55,37 @@ def detect_sse4a(code=-1):
         code = cpu_id(eax=0x80000001, ret_edx=False, ret_ecx=True)
     return bool(code & (1<<20))
 
+# the register states that the OS must save for AVX and AVX-512
+XSTATE_AVX = 0x06           # SSE and AVX
+XSTATE_AVX512 = 0xE6        # and the opmask and ZMM states
+
+def xgetbv():
+    # XCR0, only valid if the OSXSAVE bit is set
+    return cpu_info("\x31\xC9"          # XOR ECX, ECX
+                    "\x0F\x01\xD0"      # XGETBV
+                    "\xC3")              # RET
+
+def os_saves_state(state):
+    code = cpu_id(eax=1, ret_edx=False, ret_ecx=True)
+    if not code & (1<<27):              # OSXSAVE
+        return False
+    return (xgetbv() & state) == state
+
+def _extended_features():
+    if cpu_id(eax=0, ret_edx=False) < 7:
+        return 0
+    return cpu_id(eax=7, ret_edx=False, ret_ebx=True)
+
+def detect_avx2(code=-1):
+    if code == -1:
+        code = _extended_features()
+    return bool(code & (1<<5)) and os_saves_state(XSTATE_AVX)
+
+def detect_avx512f(code=-1):
+    if code == -1:
+        code = _extended_features()
+    return bool(code & (1<<16)) and os_saves_state(XSTATE_AVX512)
+
 def detect_x32_mode():
     # 32-bit         64-bit / x32
     code = cpu_info("\x48"                # DEC EAX
@@ -71,6 +105,10 @@ if __name__ == '__main__':
         print 'Processor supports sse4.2'
     if detect_sse4a():
         print 'Processor supports sse4a'
+    if detect_avx2():
+        print 'Processor supports avx2'
+    if detect_avx512f():
+        print 'Processor supports avx512f'
 
     if detect_x32_mode():
         print 'Process is running in "x32" mode.'
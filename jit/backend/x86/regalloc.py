@@ -17,8 +17,8 @@ from rpython.jit.backend.x86.regloc import (FrameLoc, RegLoc, ConstFloatLoc,
     FloatImmedLoc, ImmedLoc, imm, imm0, imm1, ecx, eax, edx, ebx, esi, edi,
     ebp, r8, r9, r10, r11, r12, r13, r14, r15, xmm0, xmm1, xmm2, xmm3, xmm4,
     xmm5, xmm6, xmm7, xmm8, xmm9, xmm10, xmm11, xmm12, xmm13, xmm14,
-    X86_64_SCRATCH_REG, X86_64_XMM_SCRATCH_REG)
-from rpython.jit.backend.x86.vector_ext import VectorRegallocMixin
+    X86_64_SCRATCH_REG, X86_64_XMM_SCRATCH_REG, ymm)
+from rpython.jit.backend.x86.vector_ext import VectorRegallocMixin, is_wide
 from rpython.jit.codewriter import longlong
 from rpython.jit.codewriter.effectinfo import EffectInfo
 from rpython.jit.metainterp.history import (Const, ConstInt, ConstPtr,
@@ -334,7 +334,11 @@ class RegAlloc(BaseRegalloc, VectorRegallocMixin):
         if descr.rd_vector_info:
             accuminfo = descr.rd_vector_info
             while accuminfo:
-                accuminfo.location = faillocs[accuminfo.getpos_in_failargs()]
+                pos = accuminfo.getpos_in_failargs()
+                accuminfo.location = faillocs[pos]
+                if is_wide(guard_op.getfailargs()[pos]):
+                    # the upper 128 bits must be reduced too
+                    accuminfo.location = ymm(accuminfo.location)
                 loc = self.loc(accuminfo.getoriginal())
                 faillocs[accuminfo.getpos_in_failargs()] = loc
                 accuminfo = accuminfo.next()
@@ -1374,6 +1378,7 @@ class RegAlloc(BaseRegalloc, VectorRegallocMixin):
         # Part about floats
         src_locations2 = []
         dst_locations2 = []
+        passes_vectors = False
         # Build the four lists
         for i in range(op.numargs()):
             box = op.getarg(i)
@@ -1385,6 +1390,8 @@ class RegAlloc(BaseRegalloc, VectorRegallocMixin):
             else:
                 src_locations2.append(src_loc)
                 dst_locations2.append(dst_loc)
+                if box.is_vector():
+                    passes_vectors = True
         # Do we have a temp var?
         if IS_X86_64:
             tmpreg = X86_64_SCRATCH_REG
@@ -1397,7 +1404,7 @@ class RegAlloc(BaseRegalloc, VectorRegallocMixin):
                                  src_locations1, dst_locations1, tmpreg,
                                  src_locations2, dst_locations2, xmmtmp)
         self.possibly_free_vars_for_op(op)
-        assembler.closing_jump(self.jump_target_descr)
+        assembler.closing_jump(self.jump_target_descr, passes_vectors)
         assembler.num_moves_jump += num_moves
 
     def consider_enter_portal_frame(self, op):
@@ -37,6 +37,7 @@ class AssemblerLocation(object):
     def value_j(self): return self.value
     def value_i(self): return self.value
     def value_x(self): return self.value
+    def value_y(self): return self.value
     def value_a(self): raise AssertionError("value_a undefined")
     def value_m(self): raise AssertionError("value_m undefined")
 
@@ -174,6 +175,17 @@ class RegLoc(AssemblerLocation):
     def is_core_reg(self):
         return True
 
+class YmmRegLoc(RegLoc):
+    """ The whole 256 bits of an xmm register, for the AVX instructions.
+    """
+    _immutable_ = True
+    def __init__(self, regnum):
+        RegLoc.__init__(self, regnum, is_xmm=True)
+        self._location_code = 'y'
+
+    def __repr__(self):
+        return rx86.R.ymmnames[self.value]
+
 class ImmediateAssemblerLocation(AssemblerLocation):
     _immutable_ = True
 
@@ -337,6 +349,16 @@ REGLOCS = [RegLoc(i, is_xmm=False) for i in range(16)]
 XMMREGLOCS = [RegLoc(i, is_xmm=True) for i in range(16)]
 eax, ecx, edx, ebx, esp, ebp, esi, edi, r8, r9, r10, r11, r12, r13, r14, r15 = REGLOCS
 xmm0, xmm1, xmm2, xmm3, xmm4, xmm5, xmm6, xmm7, xmm8, xmm9, xmm10, xmm11, xmm12, xmm13, xmm14, xmm15 = XMMREGLOCS
+YMMREGLOCS = [YmmRegLoc(i) for i in range(16)]
+
+def ymm(loc):
+    # the same register as 'loc', seen as a 256-bit ymm register
+    assert isinstance(loc, RegLoc) and loc.is_xmm
+    return YMMREGLOCS[loc.value]
+
+def xmm(loc):
+    assert isinstance(loc, RegLoc) and loc.is_xmm
+    return XMMREGLOCS[loc.value]
 
 # We use a scratch register to simulate having 64-bit immediates. When we
 # want to do something like:
@@ -356,7 +378,7 @@ X86_64_SCRATCH_REG = r11
 X86_64_XMM_SCRATCH_REG = xmm15
 
 # note: 'r' is after 'i' in this list, for _binaryop()
-unrolling_location_codes = unrolling_iterable(list("irbsmajx"))
+unrolling_location_codes = unrolling_iterable(list("irbsmajxy"))
 
 @specialize.arg(1)
 def _rx86_getattr(obj, methname):
@@ -782,6 +804,19 @@ class LocationCodeBuilder(object):
     HADDPD = _binaryop('HADDPD')
     HADDPS = _binaryop('HADDPS')
 
+    # AVX2, on ymm registers
+    VMOVAPD = _binaryop('VMOVAPD')
+    VMOVUPD = _binaryop('VMOVUPD')
+    VMOVUPS = _binaryop('VMOVUPS')
+    VMOVDQU = _binaryop('VMOVDQU')
+    VPTEST = _binaryop('VPTEST')
+    VBROADCASTSS = _binaryop('VBROADCASTSS')
+    VBROADCASTSD = _binaryop('VBROADCASTSD')
+    VPBROADCASTB = _binaryop('VPBROADCASTB')
+    VPBROADCASTW = _binaryop('VPBROADCASTW')
+    VPBROADCASTD = _binaryop('VPBROADCASTD')
+    VPBROADCASTQ = _binaryop('VPBROADCASTQ')
+
     CALL = _relative_unaryop('CALL')
     JMP = _relative_unaryop('JMP')
 
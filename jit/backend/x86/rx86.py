@@ -32,6 +32,7 @@ class R(object):
     names = ['eax', 'ecx', 'edx', 'ebx', 'esp', 'ebp', 'esi', 'edi',
              'r8', 'r9', 'r10', 'r11', 'r12', 'r13', 'r14', 'r15']
     xmmnames = ['xmm%d' % i for i in range(16)]
+    ymmnames = ['ymm%d' % i for i in range(16)]
 
 def low_byte(reg):
     # On 32-bit, this only works for 0 <= reg < 4.  The caller checks that.
@@ -348,6 +349,55 @@ rex_w  = encode_rex, 0, REX_W, None       # a REX.W prefix
 rex_nw = encode_rex_opt, 0, 0, None       # an optional REX prefix
 rex_fw = encode_rex, 0, 0, None           # a forced REX prefix
 
+# ____________________________________________________________
+# For AVX: the VEX prefix replaces the REX prefix, the 0x66/0xF3/0xF2
+# prefix and the 0x0F escape bytes.  Its R, X and B bits are computed
+# like the REX bits, and 'vvvv' encodes an extra source register.
+
+VEX_0F, VEX_0F38, VEX_0F3A = 1, 2, 3            # opcode map (m-mmmm)
+VEX_NP, VEX_66, VEX_F3, VEX_F2 = 0, 1, 2, 3     # implied prefix (pp)
+
+@specialize.arg(2)
+def encode_vex(mc, rexbyte, (opmap, w), orbyte):
+    assert 0 <= rexbyte < 8
+    if opmap == VEX_0F and w == 0 and rexbyte & (REX_X | REX_B) == 0:
+        # two-byte form: the inverted R bit goes with the next byte
+        mc.writechar('\xC5')
+        return (~rexbyte & REX_R) << 5
+    mc.writechar('\xC4')
+    mc.writechar(chr(((~rexbyte & 7) << 5) | opmap))
+    return 0
+
+@specialize.arg(2)
+def encode_vex_vvvv(mc, reg, (w, l, pp), orbyte):
+    mc.writechar(chr(orbyte | (w << 7) | ((~reg & 15) << 3) | (l << 2) | pp))
+    return 0
+
+@specialize.arg(2)
+def encode_vex_no_vvvv(mc, _, (w, l, pp), orbyte):
+    mc.writechar(chr(orbyte | (w << 7) | (15 << 3) | (l << 2) | pp))
+    return 0
+
+def vex(opmap, w, l, pp, vvvv=None):
+    # 'vvvv' is the number of the extra register argument, if any
+    if vvvv is None:
+        vvvv_step = (encode_vex_no_vvvv, None, (w, l, pp), None)
+    else:
+        vvvv_step = (encode_vex_vvvv, vvvv, (w, l, pp), None)
+    return (encode_vex, 0, (opmap, w), None), vvvv_step
+
+# ____________________________________________________________
+# Emit a register number in the high 4 bits of an immediate byte
+# (the fourth register operand of some AVX instructions)
+
+def encode_is4_register(mc, reg, _, orbyte):
+    assert orbyte == 0
+    mc.writechar(chr(reg << 4))
+    return 0
+
+def is4_register(argnum):
+    return encode_is4_register, argnum, None, None
+
 # ____________________________________________________________
 
 def insn(*encoding):
@@ -372,7 +422,9 @@ def insn(*encoding):
     #
     encoding_steps = []
     for step in encoding:
-        if isinstance(step, str):
+        if isinstance(step, tuple) and isinstance(step[0], tuple):
+            encoding_steps.extend(step)      # from vex()
+        elif isinstance(step, str):
             for c in step:
                 encoding_steps.append((encode_char, None, ord(c), None))
         else:
@@ -464,6 +516,7 @@ def shifts(mod_field):
 #     j - address
 #     i - immediate
 #     x - XMM register
+#     y - YMM register (the 256 bits of the XMM register, for AVX)
 #     a - 4-tuple: (base_register, scale_register, scale, offset)
 #     m - 2-tuple: (base_register, offset)
 class AbstractX86CodeBuilder(object):
@@ -797,6 +850,28 @@ class AbstractX86CodeBuilder(object):
     CMPPD_xxi = xmminsn('\x66', rex_nw, '\x0F\xC2', register(1,8), register(2), '\xC0', immediate(3, 'b'))
     CMPPS_xxi = xmminsn(        rex_nw, '\x0F\xC2', register(1,8), register(2), '\xC0', immediate(3, 'b'))
 
+    # ------------------------------ AVX2 ------------------------------
+    # 256-bit forms; the operands are 'dest, src1, src2' as in the Intel
+    # syntax.  See also define_avx_insn() below.
+
+    VCMPPD_yyyi = xmminsn(vex(VEX_0F, 0, 1, VEX_66, vvvv=2), '\xC2', register(1,8), register(3), '\xC0', immediate(4, 'b'))
+    VCMPPS_yyyi = xmminsn(vex(VEX_0F, 0, 1, VEX_NP, vvvv=2), '\xC2', register(1,8), register(3), '\xC0', immediate(4, 'b'))
+    VPBLENDVB_yyyy = xmminsn(vex(VEX_0F3A, 0, 1, VEX_66, vvvv=2), '\x4C', register(1,8), register(3), '\xC0', is4_register(4))
+    VINSERTI128_yyxi = xmminsn(vex(VEX_0F3A, 0, 1, VEX_66, vvvv=2), '\x38', register(1,8), register(3), '\xC0', immediate(4, 'b'))
+    VEXTRACTI128_xyi = xmminsn(vex(VEX_0F3A, 0, 1, VEX_66), '\x39', register(2,8), register(1), '\xC0', immediate(3, 'b'))
+    VPERMQ_yyi = xmminsn(vex(VEX_0F3A, 1, 1, VEX_66), '\x00', register(1,8), register(2), '\xC0', immediate(3, 'b'))
+    VPSHUFD_yyi = xmminsn(vex(VEX_0F, 0, 1, VEX_66), '\x70', register(1,8), register(2), '\xC0', immediate(3, 'b'))
+    VPMOVSXDQ_yx = xmminsn(vex(VEX_0F38, 0, 1, VEX_66), '\x25', register(1,8), register(2), '\xC0')
+
+    VCVTPD2PS_xy = xmminsn(vex(VEX_0F, 0, 1, VEX_66), '\x5A', register(1,8), register(2), '\xC0')
+    VCVTPS2PD_yx = xmminsn(vex(VEX_0F, 0, 1, VEX_NP), '\x5A', register(1,8), register(2), '\xC0')
+    VCVTPD2DQ_xy = xmminsn(vex(VEX_0F, 0, 1, VEX_F2), '\xE6', register(1,8), register(2), '\xC0')
+    VCVTDQ2PD_yx = xmminsn(vex(VEX_0F, 0, 1, VEX_F3), '\xE6', register(1,8), register(2), '\xC0')
+
+    # clears the upper halves, to avoid the penalty of mixing
+    # AVX and legacy SSE instructions
+    VZEROUPPER = xmminsn(vex(VEX_0F, 0, 0, VEX_NP), '\x77')
+
     # ------------------------------------------------------------
 
 Conditions = {
@@ -907,12 +982,11 @@ def define_modrm_modes(insnname_template, before_modrm, after_modrm=[], regtype=
     def add_insn(code, *modrm):
         args = before_modrm + list(modrm)
         methname = insnname_template.replace('*', code)
-        if (methname.endswith('_rr') or methname.endswith('_xx')
-                or methname.endswith('_ri')):
+        if code in ('r', 'x', 'y'):
             args.append('\xC0')
         args += after_modrm
 
-        if regtype == 'XMM':
+        if regtype in ('XMM', 'YMM'):
             insn_func = xmminsn(*args)
         else:
             insn_func = insn(*args)
@@ -928,6 +1002,8 @@ def define_modrm_modes(insnname_template, before_modrm, after_modrm=[], regtype=
         add_insn('r', byte_register(modrm_argnum))
     elif regtype == 'XMM':
         add_insn('x', register(modrm_argnum))
+    elif regtype == 'YMM':
+        add_insn('y', register(modrm_argnum))
     else:
         raise AssertionError("Invalid type")
 
@@ -1040,6 +1116,46 @@ define_pxmm_insn('PCMPEQD_x*',   '\x76')
 define_pxmm_insn('PCMPEQW_x*',   '\x75')
 define_pxmm_insn('PCMPEQB_x*',   '\x74')
 
+# AVX2: 256-bit moves and broadcasts
+for insnname, pp in [('VMOVUPD', VEX_66), ('VMOVUPS', VEX_NP)]:
+    define_modrm_modes(insnname + '_y*', [vex(VEX_0F, 0, 1, pp), '\x10', register(1, 8)], regtype='YMM')
+    define_modrm_modes(insnname + '_*y', [vex(VEX_0F, 0, 1, pp), '\x11', register(2, 8)], regtype='YMM')
+define_modrm_modes('VMOVDQU_y*', [vex(VEX_0F, 0, 1, VEX_F3), '\x6F', register(1, 8)], regtype='YMM')
+define_modrm_modes('VMOVDQU_*y', [vex(VEX_0F, 0, 1, VEX_F3), '\x7F', register(2, 8)], regtype='YMM')
+define_modrm_modes('VMOVAPD_y*', [vex(VEX_0F, 0, 1, VEX_66), '\x28', register(1, 8)], regtype='YMM')
+define_modrm_modes('VPTEST_y*', [vex(VEX_0F38, 0, 1, VEX_66), '\x17', register(1, 8)], regtype='YMM')
+
+for insnname, opcode in [('VBROADCASTSS', '\x18'), ('VBROADCASTSD', '\x19'),
+                         ('VPBROADCASTB', '\x78'), ('VPBROADCASTW', '\x79'),
+                         ('VPBROADCASTD', '\x58'), ('VPBROADCASTQ', '\x59')]:
+    define_modrm_modes(insnname + '_y*', [vex(VEX_0F38, 0, 1, VEX_66), opcode, register(1, 8)], regtype='XMM')
+
+def define_avx_insn(insnname, pp, opmap, opcode):
+    methname = insnname + '_yyy'
+    insn_func = xmminsn(vex(opmap, 0, 1, pp, vvvv=2), opcode,
+                        register(1, 8), register(3), '\xC0')
+    assert not hasattr(AbstractX86CodeBuilder, methname)
+    setattr(AbstractX86CodeBuilder, methname, insn_func)
+
+for _name, _pp, _opmap, _opcode in [
+        ('VADDPD', VEX_66, VEX_0F, '\x58'), ('VADDPS', VEX_NP, VEX_0F, '\x58'),
+        ('VSUBPD', VEX_66, VEX_0F, '\x5C'), ('VSUBPS', VEX_NP, VEX_0F, '\x5C'),
+        ('VMULPD', VEX_66, VEX_0F, '\x59'), ('VMULPS', VEX_NP, VEX_0F, '\x59'),
+        ('VDIVPD', VEX_66, VEX_0F, '\x5E'), ('VDIVPS', VEX_NP, VEX_0F, '\x5E'),
+        ('VANDPD', VEX_66, VEX_0F, '\x54'), ('VANDPS', VEX_NP, VEX_0F, '\x54'),
+        ('VXORPD', VEX_66, VEX_0F, '\x57'), ('VXORPS', VEX_NP, VEX_0F, '\x57'),
+        ('VPADDB', VEX_66, VEX_0F, '\xFC'), ('VPADDW', VEX_66, VEX_0F, '\xFD'),
+        ('VPADDD', VEX_66, VEX_0F, '\xFE'), ('VPADDQ', VEX_66, VEX_0F, '\xD4'),
+        ('VPSUBB', VEX_66, VEX_0F, '\xF8'), ('VPSUBW', VEX_66, VEX_0F, '\xF9'),
+        ('VPSUBD', VEX_66, VEX_0F, '\xFA'), ('VPSUBQ', VEX_66, VEX_0F, '\xFB'),
+        ('VPMULLW', VEX_66, VEX_0F, '\xD5'), ('VPMULLD', VEX_66, VEX_0F38, '\x40'),
+        ('VPAND', VEX_66, VEX_0F, '\xDB'), ('VPOR', VEX_66, VEX_0F, '\xEB'),
+        ('VPXOR', VEX_66, VEX_0F, '\xEF'),
+        ('VPCMPEQB', VEX_66, VEX_0F, '\x74'), ('VPCMPEQW', VEX_66, VEX_0F, '\x75'),
+        ('VPCMPEQD', VEX_66, VEX_0F, '\x76'), ('VPCMPEQQ', VEX_66, VEX_0F38, '\x29'),
+        ]:
+    define_avx_insn(_name, _pp, _opmap, _opcode)
+
 # ____________________________________________________________
 
 _classes = (AbstractX86CodeBuilder, X86_64_CodeBuilder, X86_32_CodeBuilder)
@@ -56,9 +56,10 @@ class LoggingAssembler(Assembler386):
         self._log("label", self._regalloc.final_jump_op.getdescr()._x86_arglocs)
         return Assembler386.label(self)
 
-    def closing_jump(self, jump_target_descr):
+    def closing_jump(self, jump_target_descr, passes_vectors=False):
         self._log("jump", self._regalloc.final_jump_op.getdescr()._x86_arglocs)
-        return Assembler386.closing_jump(self, jump_target_descr)
+        return Assembler386.closing_jump(self, jump_target_descr,
+                                         passes_vectors)
 
 class BaseTestCheckRegistersExplicitly(test_regalloc_integration.BaseTestRegalloc):
     def setup_class(cls):
@@ -70,6 +70,18 @@ def test_cmp_16():
                       (AddressLoc(r13, ImmedLoc(0), 0, 0), ImmedLoc(12345)),
                       '\x66\x41\x81\x7D\x00\x39\x30')
 
+def test_ymm():
+    assert_encodes_as(cb64, "VMOVUPD",
+                      (ymm(xmm3), AddressLoc(r9, ImmedLoc(16), 0, 0)),
+                      '\xC4\xC1\x7D\x10\x59\x10')
+    assert_encodes_as(cb64, "VMOVUPD",
+                      (AddressLoc(eax, ImmedLoc(0), 0, 0), ymm(xmm13)),
+                      '\xC5\x7D\x11\x28')
+    assert_encodes_as(cb64, "VPTEST", (ymm(xmm12), ymm(xmm1)),
+                      '\xC4\x62\x7D\x17\xE1')
+    assert_encodes_as(cb64, "VMOVAPD", (ymm(xmm9), ymm(xmm1)),
+                      '\xC5\x7D\x28\xC9')
+
 def test_relocation():
     from rpython.rtyper.lltypesystem import lltype, rffi
     for target in [0x01020304, -0x05060708, 0x0102030405060708]:
@@ -63,6 +63,7 @@ class TestRx86_32(object):
     REGNAMES = ['%eax', '%ecx', '%edx', '%ebx', '%esp', '%ebp', '%esi', '%edi']
     REGNAMES8 = ['%al', '%cl', '%dl', '%bl', '%ah', '%ch', '%dh', '%bh']
     XMMREGNAMES = ['%%xmm%d' % i for i in range(16)]
+    YMMREGNAMES = ['%%ymm%d' % i for i in range(16)]
     REGS = range(8)
     REGS8 = [i|rx86.BYTE_REG_FLAG for i in range(8)]
     NONSPECREGS = [rx86.R.eax, rx86.R.ecx, rx86.R.edx, rx86.R.ebx,
@@ -123,6 +124,7 @@ class TestRx86_32(object):
             'r': self.reg_tests,
             'r8': self.reg8_tests,
             'x': self.xmm_reg_tests,
+            'y': self.xmm_reg_tests,
             'b': self.stack_bp_tests,
             's': self.stack_sp_tests,
             'm': self.memory_tests,
@@ -143,6 +145,9 @@ class TestRx86_32(object):
     def assembler_operand_xmm_reg(self, regnum):
         return self.XMMREGNAMES[regnum]
 
+    def assembler_operand_ymm_reg(self, regnum):
+        return self.YMMREGNAMES[regnum]
+
     def assembler_operand_stack_bp(self, position):
         return '%d(%s)' % (position, self.REGNAMES[5])
 
@@ -169,6 +174,7 @@ class TestRx86_32(object):
             'r': self.assembler_operand_reg,
             'r8': self.assembler_operand_reg8,
             'x': self.assembler_operand_xmm_reg,
+            'y': self.assembler_operand_ymm_reg,
             'b': self.assembler_operand_stack_bp,
             's': self.assembler_operand_stack_sp,
             'm': self.assembler_operand_memory,
@@ -198,6 +204,9 @@ class TestRx86_32(object):
                 py.test.skip('"as" uses an undocumented alternate encoding??')
             if argmodes == 'xx' and self.WORD != 8:
                 instrname = 'MOVQ'
+        if argmodes == 'yy' and instrname.startswith('VMOV'):
+            # rx86 always encodes the register moves in the load direction
+            instrname = '{load} ' + instrname
         #
         for args in args_lists:
             suffix = ""
@@ -366,7 +375,7 @@ class TestRx86_32(object):
         if methname == 'WORD':
             return
 
-        if instrname.endswith('8'):
+        if instrname.endswith('8') and not instrname.endswith('128'):
             instrname = instrname[:-1]
             if instrname == 'MOVSX' or instrname == 'MOVZX':
                 instr_suffix = 'b' + suffixes[self.WORD]
@@ -395,6 +404,7 @@ class TestRx86_32(object):
            instrname.find('SRLDQ') != -1 or \
            instrname.find('SHUF') != -1 or \
            instrname.find('PBLEND') != -1 or \
+           instrname.find('PERM') != -1 or \
            instrname.find('CMPP') != -1:
             realargmodes = []
             for mode in argmodes:
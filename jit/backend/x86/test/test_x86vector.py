@@ -5,6 +5,7 @@ from rpython.jit.backend.x86.regalloc import (RegAlloc,
         X86FrameManager, X86XMMRegisterManager, X86RegisterManager)
 from rpython.jit.backend.x86.vector_ext import TempVector
 from rpython.jit.backend.x86.test import test_basic
+from rpython.jit.backend.x86 import detect_feature
 from rpython.jit.backend.x86.test.test_assembler import \
         (TestRegallocPushPop as BaseTestAssembler)
 from rpython.jit.metainterp.test import test_zvector
@@ -31,6 +32,13 @@ class TestBasic(test_basic.Jit386Mixin, test_zvector.VectorizeTests):
 
     enable_opts = 'intbounds:rewrite:virtualize:string:earlyforce:pure:heap:unroll'
 
+class TestWideVectors(test_basic.Jit386Mixin, test_zvector.WideVectorizeTests):
+    # the same loops on 256-bit registers, see
+    # ====> ../../../metainterp/test/test_zvector.py
+    def supports_wide_vectors(self):
+        return (self.CPUClass.vector_ext is not None and
+                detect_feature.detect_avx2())
+
 @py.test.fixture
 def regalloc(request):
     from rpython.jit.backend.x86.regalloc import X86FrameManager
@@ -8,7 +8,7 @@ from rpython.jit.backend.x86.regloc import (FrameLoc, RegLoc, ConstFloatLoc,
     FloatImmedLoc, ImmedLoc, imm, imm0, imm1, ecx, eax, edx, ebx, esi, edi,
     ebp, r8, r9, r10, r11, r12, r13, r14, r15, xmm0, xmm1, xmm2, xmm3, xmm4,
     xmm5, xmm6, xmm7, xmm8, xmm9, xmm10, xmm11, xmm12, xmm13, xmm14,
-    X86_64_SCRATCH_REG, X86_64_XMM_SCRATCH_REG, AddressLoc)
+    X86_64_SCRATCH_REG, X86_64_XMM_SCRATCH_REG, AddressLoc, ymm, xmm)
 from rpython.jit.backend.llsupport.vector_ext import VectorExt
 from rpython.jit.backend.llsupport.regalloc import (get_scale, TempVar,
     NoVariableToSpill)
@@ -16,7 +16,8 @@ from rpython.jit.metainterp.resoperation import (rop, ResOperation,
         VectorOp, VectorGuardOp)
 from rpython.rlib.objectmodel import we_are_translated, always_inline
 from rpython.rtyper.lltypesystem.lloperation import llop
-from rpython.rtyper.lltypesystem import lltype
+from rpython.rtyper.lltypesystem import lltype, rffi
+from rpython.jit.backend.llsupport.asmmemmgr import MachineDataBlockWrapper
 from rpython.jit.backend.x86 import rx86, detect_feature
 
 # duplicated for easy migration, def in assembler.py as well
@@ -34,6 +35,19 @@ def not_implemented(msg):
     raise NotImplementedError(msg)
 # DUP END
 
+def is_wide(op):
+    """ True if the vector operation 'op', or one of its vector arguments,
+        does not fit into 128 bits.  It is then kept in the whole ymm
+        register and the AVX2 instructions are used.
+    """
+    if isinstance(op, VectorOp) and op.bytesize * op.count > 16:
+        return True
+    for i in range(op.numargs()):
+        arg = op.getarg(i)
+        if isinstance(arg, VectorOp) and arg.bytesize * arg.count > 16:
+            return True
+    return False
+
 class TempVector(TempVar):
     def __init__(self, type):
         self.type = type
@@ -53,7 +67,10 @@ class X86VectorExt(VectorExt):
     should_align_unroll = True
 
     def setup_once(self, asm):
-        if detect_feature.detect_sse4_1():
+        if detect_feature.detect_avx2():
+            self.enable(32, accum=True)
+            asm.setup_once_vector()
+        elif detect_feature.detect_sse4_1():
             self.enable(16, accum=True)
             asm.setup_once_vector()
         self._setup = True
@@ -61,9 +78,30 @@ class X86VectorExt(VectorExt):
 class VectorAssemblerMixin(object):
     _mixin_ = True
     element_ones = []    # overridden in assembler.py
+    vector_mask_addr = 0
+    wide_vectors = False
 
     def setup_once_vector(self):
-        pass
+        # 32 bytes of ones followed by 32 bytes of zeros: the 32 bytes
+        # at 'vector_mask_addr + 32 - n' select the first n bytes of a
+        # ymm register
+        data = '\xFF' * 32 + '\x00' * 32
+        datablockwrapper = MachineDataBlockWrapper(self.cpu.asmmemmgr, [])
+        mask = datablockwrapper.malloc_aligned(len(data), alignment=32)
+        datablockwrapper.done()
+        addr = rffi.cast(rffi.CArrayPtr(lltype.Char), mask)
+        for i in range(len(data)):
+            addr[i] = data[i]
+        self.vector_mask_addr = mask
+
+    def uses_wide_vectors(self, operations):
+        """ Register moves must copy the whole ymm registers if any vector
+            of the trace is wider than 128 bits.
+        """
+        for op in operations:
+            if isinstance(op, VectorOp) and op.bytesize * op.count > 16:
+                return True
+        return False
 
     def genop_guard_vec_guard_true(self, guard_op, guard_token, locs, resloc):
         self.implement_guard(guard_token)
@@ -82,6 +120,9 @@ class VectorAssemblerMixin(object):
         assert ve is not None # MUST hold, optimize_vector is never entered if vector_ext is entered
         load = arg.bytesize * arg.count - ve.register_size
         assert load <= 0
+        if is_wide(guard_op):
+            self._guard_vector_wide(arg, loc, true)
+            return
         if true:
             self.mc.PXOR(temp, temp)
             # if the vector is not fully packed blend 1s
@@ -107,6 +148,33 @@ class VectorAssemblerMixin(object):
             self.mc.PTEST(loc, loc)
             self.guard_success_cc = rx86.Conditions['NZ']
 
+    def _guard_vector_wide(self, arg, loc, true):
+        temp = X86_64_XMM_SCRATCH_REG
+        # instead of blending the unused slots, only the used
+        # bytes are tested
+        mask = heap(self.vector_mask_addr + 32 - arg.bytesize * arg.count)
+        if true:
+            # creates ones at each slot where it is zero
+            self.mc.VPXOR_yyy(temp.value, temp.value, temp.value)
+            self._vpcmpeq(temp, loc, temp, arg.bytesize)
+            # test if all slots are zero
+            self.mc.VPTEST(ymm(temp), mask)
+            self.guard_success_cc = rx86.Conditions['Z']
+        else:
+            self.mc.VPTEST(ymm(loc), mask)
+            self.guard_success_cc = rx86.Conditions['NZ']
+
+    def _vpcmpeq(self, resloc, loc0, loc1, size):
+        if size == 1:
+            self.mc.VPCMPEQB_yyy(resloc.value, loc0.value, loc1.value)
+        elif size == 2:
+            self.mc.VPCMPEQW_yyy(resloc.value, loc0.value, loc1.value)
+        elif size == 4:
+            self.mc.VPCMPEQD_yyy(resloc.value, loc0.value, loc1.value)
+        else:
+            assert size == 8
+            self.mc.VPCMPEQQ_yyy(resloc.value, loc0.value, loc1.value)
+
     def _blend_unused_slots(self, loc, arg, temp):
         select = 0
         bits_used = (arg.count * arg.bytesize * 8)
@@ -132,6 +200,9 @@ class VectorAssemblerMixin(object):
             scalar_arg = accum_info.getoriginal()
             assert isinstance(vector_loc, RegLoc)
             assert scalar_arg is not None
+            if vector_loc.location_code() == 'y':
+                vector_loc = self._accum_fold_upper_lane(scalar_arg,
+                                  vector_loc, accum_info.accum_operation)
             orig_scalar_loc = scalar_loc
             tmpvar = None
             if not isinstance(scalar_loc, RegLoc):
@@ -155,6 +226,25 @@ class VectorAssemblerMixin(object):
                 self.mov(scalar_loc, orig_scalar_loc)
             accum_info = accum_info.next()
 
+    def _accum_fold_upper_lane(self, arg, accumloc, operation):
+        """ Combine the upper 128 bits of a ymm accumulator with its
+            lower 128 bits, which are reduced as usual afterwards.
+        """
+        temp = X86_64_XMM_SCRATCH_REG
+        loc = xmm(accumloc)
+        self.mc.VEXTRACTI128_xyi(temp.value, loc.value, 1)
+        if operation == '+':
+            if arg.type == FLOAT:
+                self.mc.ADDPD(loc, temp)
+            else:
+                self.mc.PADDQ(loc, temp)
+        elif operation == '*':
+            self.mc.MULPD(loc, temp)
+        else:
+            not_implemented("accum operator %s not implemented" %
+                                        (operation,))
+        return loc
+
     def _accum_reduce_mul(self, arg, accumloc, targetloc):
         self.mov(accumloc, targetloc)
         # swap the two elements
@@ -184,6 +274,10 @@ class VectorAssemblerMixin(object):
     def _genop_vec_load(self, op, arglocs, resloc):
         base_loc, ofs_loc, size_loc, scale, ofs, integer_loc = arglocs
         src_addr = addr_add(base_loc, ofs_loc, ofs.value, scale.value)
+        if is_wide(op):
+            self._vec_load_wide(resloc, src_addr, integer_loc.value,
+                                size_loc.value)
+            return
         self._vec_load(resloc, src_addr, integer_loc.value,
                        size_loc.value, False)
 
@@ -203,10 +297,23 @@ class VectorAssemblerMixin(object):
             elif itemsize == 8:
                 self.mc.MOVUPD(resloc, src_addr)
 
+    @always_inline
+    def _vec_load_wide(self, resloc, src_addr, integer, itemsize):
+        if integer:
+            self.mc.VMOVDQU(ymm(resloc), src_addr)
+        elif itemsize == 4:
+            self.mc.VMOVUPS(ymm(resloc), src_addr)
+        elif itemsize == 8:
+            self.mc.VMOVUPD(ymm(resloc), src_addr)
+
     def genop_discard_vec_store(self, op, arglocs):
         base_loc, ofs_loc, value_loc, size_loc, scale,\
                 baseofs, integer_loc = arglocs
         dest_loc = addr_add(base_loc, ofs_loc, baseofs.value, scale.value)
+        if is_wide(op):
+            self._vec_store_wide(dest_loc, value_loc, integer_loc.value,
+                                 size_loc.value)
+            return
         self._vec_store(dest_loc, value_loc, integer_loc.value,
                         size_loc.value, False)
 
@@ -223,9 +330,23 @@ class VectorAssemblerMixin(object):
             elif itemsize == 8:
                 self.mc.MOVUPD(dest_loc, value_loc)
 
+    @always_inline
+    def _vec_store_wide(self, dest_loc, value_loc, integer, itemsize):
+        if integer:
+            self.mc.VMOVDQU(dest_loc, ymm(value_loc))
+        elif itemsize == 4:
+            self.mc.VMOVUPS(dest_loc, ymm(value_loc))
+        elif itemsize == 8:
+            self.mc.VMOVUPD(dest_loc, ymm(value_loc))
+
     def genop_vec_int_is_true(self, op, arglocs, resloc):
         loc, sizeloc = arglocs
         temp = X86_64_XMM_SCRATCH_REG
+        if is_wide(op):
+            self.mc.VPXOR_yyy(temp.value, temp.value, temp.value)
+            self._vpcmpeq(loc, loc, temp, sizeloc.value)
+            self._vpcmpeq(loc, loc, temp, sizeloc.value)
+            return
         self.mc.PXOR(temp, temp)
         # every entry that is non zero -> becomes zero
         # zero entries become ones
@@ -237,7 +358,11 @@ class VectorAssemblerMixin(object):
     def genop_vec_int_mul(self, op, arglocs, resloc):
         loc0, loc1, itemsize_loc = arglocs
         itemsize = itemsize_loc.value
-        if itemsize == 2:
+        if is_wide(op) and itemsize == 2:
+            self.mc.VPMULLW_yyy(loc0.value, loc0.value, loc1.value)
+        elif is_wide(op) and itemsize == 4:
+            self.mc.VPMULLD_yyy(loc0.value, loc0.value, loc1.value)
+        elif itemsize == 2:
             self.mc.PMULLW(loc0, loc1)
         elif itemsize == 4:
             self.mc.PMULLD(loc0, loc1)
@@ -249,7 +374,9 @@ class VectorAssemblerMixin(object):
     def genop_vec_int_add(self, op, arglocs, resloc):
         loc0, loc1, size_loc = arglocs
         size = size_loc.value
-        if size == 1:
+        if is_wide(op):
+            self._vec_int_add_wide(loc0, loc1, size)
+        elif size == 1:
             self.mc.PADDB(loc0, loc1)
         elif size == 2:
             self.mc.PADDW(loc0, loc1)
@@ -261,7 +388,9 @@ class VectorAssemblerMixin(object):
     def genop_vec_int_sub(self, op, arglocs, resloc):
         loc0, loc1, size_loc = arglocs
         size = size_loc.value
-        if size == 1:
+        if is_wide(op):
+            self._vec_int_sub_wide(loc0, loc1, size)
+        elif size == 1:
             self.mc.PSUBB(loc0, loc1)
         elif size == 2:
             self.mc.PSUBW(loc0, loc1)
@@ -270,13 +399,42 @@ class VectorAssemblerMixin(object):
         elif size == 8:
             self.mc.PSUBQ(loc0, loc1)
 
+    def _vec_int_add_wide(self, loc0, loc1, size):
+        if size == 1:
+            self.mc.VPADDB_yyy(loc0.value, loc0.value, loc1.value)
+        elif size == 2:
+            self.mc.VPADDW_yyy(loc0.value, loc0.value, loc1.value)
+        elif size == 4:
+            self.mc.VPADDD_yyy(loc0.value, loc0.value, loc1.value)
+        elif size == 8:
+            self.mc.VPADDQ_yyy(loc0.value, loc0.value, loc1.value)
+
+    def _vec_int_sub_wide(self, loc0, loc1, size):
+        if size == 1:
+            self.mc.VPSUBB_yyy(loc0.value, loc0.value, loc1.value)
+        elif size == 2:
+            self.mc.VPSUBW_yyy(loc0.value, loc0.value, loc1.value)
+        elif size == 4:
+            self.mc.VPSUBD_yyy(loc0.value, loc0.value, loc1.value)
+        elif size == 8:
+            self.mc.VPSUBQ_yyy(loc0.value, loc0.value, loc1.value)
+
     def genop_vec_int_and(self, op, arglocs, resloc):
+        if is_wide(op):
+            self.mc.VPAND_yyy(resloc.value, resloc.value, arglocs[0].value)
+            return
         self.mc.PAND(resloc, arglocs[0])
 
     def genop_vec_int_or(self, op, arglocs, resloc):
+        if is_wide(op):
+            self.mc.VPOR_yyy(resloc.value, resloc.value, arglocs[0].value)
+            return
         self.mc.POR(resloc, arglocs[0])
 
     def genop_vec_int_xor(self, op, arglocs, resloc):
+        if is_wide(op):
+            self.mc.VPXOR_yyy(resloc.value, resloc.value, arglocs[0].value)
+            return
         self.mc.PXOR(resloc, arglocs[0])
 
     genop_vec_float_xor = genop_vec_int_xor
@@ -285,7 +443,11 @@ class VectorAssemblerMixin(object):
     def genop_vec_float_{type}(self, op, arglocs, resloc):
         loc0, loc1, itemsize_loc = arglocs
         itemsize = itemsize_loc.value
-        if itemsize == 4:
+        if is_wide(op) and itemsize == 4:
+            self.mc.V{p_op_s}_yyy(loc0.value, loc0.value, loc1.value)
+        elif is_wide(op) and itemsize == 8:
+            self.mc.V{p_op_d}_yyy(loc0.value, loc0.value, loc1.value)
+        elif itemsize == 4:
             self.mc.{p_op_s}(loc0, loc1)
         elif itemsize == 8:
             self.mc.{p_op_d}(loc0, loc1)
@@ -301,7 +463,11 @@ class VectorAssemblerMixin(object):
     def genop_vec_float_truediv(self, op, arglocs, resloc):
         loc0, loc1, sizeloc = arglocs
         size = sizeloc.value
-        if size == 4:
+        if is_wide(op) and size == 4:
+            self.mc.VDIVPS_yyy(loc0.value, loc0.value, loc1.value)
+        elif is_wide(op) and size == 8:
+            self.mc.VDIVPD_yyy(loc0.value, loc0.value, loc1.value)
+        elif size == 4:
             self.mc.DIVPS(loc0, loc1)
         elif size == 8:
             self.mc.DIVPD(loc0, loc1)
@@ -309,7 +475,14 @@ class VectorAssemblerMixin(object):
     def genop_vec_float_abs(self, op, arglocs, resloc):
         src, sizeloc = arglocs
         size = sizeloc.value
-        if size == 4:
+        temp = X86_64_XMM_SCRATCH_REG
+        if is_wide(op) and size == 4:
+            self.mc.VBROADCASTSS(ymm(temp), heap(self.single_float_const_abs_addr))
+            self.mc.VANDPS_yyy(src.value, src.value, temp.value)
+        elif is_wide(op) and size == 8:
+            self.mc.VBROADCASTSD(ymm(temp), heap(self.float_const_abs_addr))
+            self.mc.VANDPD_yyy(src.value, src.value, temp.value)
+        elif size == 4:
             self.mc.ANDPS(src, heap(self.single_float_const_abs_addr))
         elif size == 8:
             self.mc.ANDPD(src, heap(self.float_const_abs_addr))
@@ -317,7 +490,14 @@ class VectorAssemblerMixin(object):
     def genop_vec_float_neg(self, op, arglocs, resloc):
         src, sizeloc = arglocs
         size = sizeloc.value
-        if size == 4:
+        temp = X86_64_XMM_SCRATCH_REG
+        if is_wide(op) and size == 4:
+            self.mc.VBROADCASTSS(ymm(temp), heap(self.single_float_const_neg_addr))
+            self.mc.VXORPS_yyy(src.value, src.value, temp.value)
+        elif is_wide(op) and size == 8:
+            self.mc.VBROADCASTSD(ymm(temp), heap(self.float_const_neg_addr))
+            self.mc.VXORPD_yyy(src.value, src.value, temp.value)
+        elif size == 4:
             self.mc.XORPS(src, heap(self.single_float_const_neg_addr))
         elif size == 8:
             self.mc.XORPD(src, heap(self.float_const_neg_addr))
@@ -325,13 +505,19 @@ class VectorAssemblerMixin(object):
     def genop_vec_float_eq(self, op, arglocs, resloc):
         lhsloc, rhsloc, sizeloc = arglocs
         size = sizeloc.value
-        if size == 4:
+        wide = is_wide(op)
+        if wide and size == 4:
+            self.mc.VCMPPS_yyyi(lhsloc.value, lhsloc.value, rhsloc.value, 0)
+        elif wide:
+            self.mc.VCMPPD_yyyi(lhsloc.value, lhsloc.value, rhsloc.value, 0)
+        elif size == 4:
             self.mc.CMPPS_xxi(lhsloc.value, rhsloc.value, 0) # 0 means equal
         else:
             self.mc.CMPPD_xxi(lhsloc.value, rhsloc.value, 0)
-        self.flush_vec_cc(rx86.Conditions["E"], lhsloc, resloc, sizeloc.value)
+        self.flush_vec_cc(rx86.Conditions["E"], lhsloc, resloc, sizeloc.value,
+                          wide)
 
-    def flush_vec_cc(self, rev_cond, lhsloc, resloc, size):
+    def flush_vec_cc(self, rev_cond, lhsloc, resloc, size, wide=False):
         # After emitting an instruction that leaves a boolean result in
         # a condition code (cc), call this.  In the common case, result_loc
         # will be set to SPP by the regalloc, which in this case means
@@ -341,6 +527,21 @@ class VectorAssemblerMixin(object):
 
         if resloc is ebp:
             self.guard_success_cc = rev_cond
+        elif wide:
+            maskloc = X86_64_XMM_SCRATCH_REG
+            ones = heap(self.element_ones[get_scale(size)])
+            if size == 1:
+                self.mc.VPBROADCASTB(ymm(maskloc), ones)
+            elif size == 2:
+                self.mc.VPBROADCASTW(ymm(maskloc), ones)
+            elif size == 4:
+                self.mc.VPBROADCASTD(ymm(maskloc), ones)
+            else:
+                self.mc.VPBROADCASTQ(ymm(maskloc), ones)
+            self.mc.VPXOR_yyy(resloc.value, resloc.value, resloc.value)
+            # the mask is explicit, lhsloc need not be xmm0
+            self.mc.VPBLENDVB_yyyy(resloc.value, resloc.value,
+                                   maskloc.value, lhsloc.value)
         else:
             assert lhsloc is xmm0
             maskloc = X86_64_XMM_SCRATCH_REG
@@ -353,24 +554,40 @@ class VectorAssemblerMixin(object):
     def genop_vec_float_ne(self, op, arglocs, resloc):
         lhsloc, rhsloc, sizeloc = arglocs
         size = sizeloc.value
+        wide = is_wide(op)
         # b(100) == 1 << 2 means not equal
-        if size == 4:
+        if wide and size == 4:
+            self.mc.VCMPPS_yyyi(lhsloc.value, lhsloc.value, rhsloc.value, 1 << 2)
+        elif wide:
+            self.mc.VCMPPD_yyyi(lhsloc.value, lhsloc.value, rhsloc.value, 1 << 2)
+        elif size == 4:
             self.mc.CMPPS_xxi(lhsloc.value, rhsloc.value, 1 << 2)
         else:
             self.mc.CMPPD_xxi(lhsloc.value, rhsloc.value, 1 << 2)
-        self.flush_vec_cc(rx86.Conditions["NE"], lhsloc, resloc, sizeloc.value)
+        self.flush_vec_cc(rx86.Conditions["NE"], lhsloc, resloc, sizeloc.value,
+                          wide)
 
     def genop_vec_int_eq(self, op, arglocs, resloc):
         lhsloc, rhsloc, sizeloc = arglocs
         size = sizeloc.value
+        if is_wide(op):
+            self._vpcmpeq(lhsloc, lhsloc, rhsloc, size)
+            self.flush_vec_cc(rx86.Conditions["E"], lhsloc, resloc, size, True)
+            return
         self.mc.PCMPEQ(lhsloc, rhsloc, size)
         self.flush_vec_cc(rx86.Conditions["E"], lhsloc, resloc, sizeloc.value)
 
     def genop_vec_int_ne(self, op, arglocs, resloc):
         lhsloc, rhsloc, sizeloc = arglocs
         size = sizeloc.value
-        self.mc.PCMPEQ(resloc, rhsloc, size)
         temp = X86_64_XMM_SCRATCH_REG
+        if is_wide(op):
+            self._vpcmpeq(lhsloc, lhsloc, rhsloc, size)
+            self.mc.VPCMPEQQ_yyy(temp.value, temp.value, temp.value)
+            self.mc.VPXOR_yyy(lhsloc.value, lhsloc.value, temp.value)
+            self.flush_vec_cc(rx86.Conditions["NE"], lhsloc, resloc, size, True)
+            return
+        self.mc.PCMPEQ(resloc, rhsloc, size)
         self.mc.PCMPEQQ(temp, temp) # set all bits to one
         # need to invert the value in resloc
         self.mc.PXOR(resloc, temp)
@@ -386,7 +603,14 @@ class VectorAssemblerMixin(object):
         tosize = tosizeloc.value
         if size == tosize:
             return # already the right size
-        if size == 4 and tosize == 8:
+        if is_wide(op) and size == 4 and tosize == 8:
+            self.mc.VPMOVSXDQ_yx(resloc.value, srcloc.value)
+        elif is_wide(op) and size == 8 and tosize == 4:
+            # the lower 32 bits of each element to the first two
+            # of their 128-bit lane, then the two lanes together
+            self.mc.VPSHUFD_yyi(resloc.value, srcloc.value, 0x08)
+            self.mc.VPERMQ_yyi(resloc.value, resloc.value, 0x08)
+        elif size == 4 and tosize == 8:
             scratch = X86_64_SCRATCH_REG.value
             self.mc.forget_scratch_register()
             self.mc.PEXTRD_rxi(scratch, srcloc.value, 1)
@@ -413,7 +637,17 @@ class VectorAssemblerMixin(object):
     def genop_vec_expand_f(self, op, arglocs, resloc):
         srcloc, sizeloc = arglocs
         size = sizeloc.value
-        if isinstance(srcloc, ConstFloatLoc):
+        if is_wide(op) and size == 4:
+            if isinstance(srcloc, ConstFloatLoc):
+                self.mc.VBROADCASTSS(ymm(resloc), srcloc)
+            else:
+                self.mc.VBROADCASTSS_yx(resloc.value, srcloc.value)
+        elif is_wide(op) and size == 8:
+            if isinstance(srcloc, ConstFloatLoc):
+                self.mc.VBROADCASTSD(ymm(resloc), srcloc)
+            else:
+                self.mc.VBROADCASTSD_yx(resloc.value, srcloc.value)
+        elif isinstance(srcloc, ConstFloatLoc):
             # they are aligned!
             self.mc.MOVAPD(resloc, srcloc)
         elif size == 4:
@@ -450,6 +684,10 @@ class VectorAssemblerMixin(object):
             self.mc.PINSRQ_xri(resloc.value, srcloc.value, 1)
         else:
             raise AssertionError("cannot handle size %d (int expand)" % (size,))
+        if is_wide(op):
+            # copy the lower lane to the upper one
+            self.mc.VINSERTI128_yyxi(resloc.value, resloc.value,
+                                     resloc.value, 1)
 
     def genop_vec_pack_i(self, op, arglocs, resloc):
         resultloc, sourceloc, residxloc, srcidxloc, countloc, sizeloc = arglocs
@@ -459,6 +697,10 @@ class VectorAssemblerMixin(object):
         srcidx = srcidxloc.value
         residx = residxloc.value
         count = countloc.value
+        if is_wide(op):
+            self._vec_pack_wide(resultloc, sourceloc, residx, srcidx,
+                                count, size)
+            return
         # for small data type conversion this can be quite costy
         # NOTE there might be some combinations that can be handled
         # more efficiently! e.g.
@@ -509,6 +751,66 @@ class VectorAssemblerMixin(object):
 
     genop_vec_unpack_i = genop_vec_pack_i
 
+    def _vec_pack_wide(self, resultloc, sourceloc, residx, srcidx,
+                       count, size):
+        # PEXTR/PINSR only reach the lower 128-bit lane.  The elements
+        # of the upper lane go through the xmm scratch register, and
+        # the ones moved from vector to vector through the scratch
+        # register (this also works for floats).
+        lanecount = 16 // size
+        scratch = X86_64_SCRATCH_REG
+        temp = X86_64_XMM_SCRATCH_REG
+        self.mc.forget_scratch_register()
+        si = srcidx
+        ri = residx
+        k = count
+        while k > 0:
+            if sourceloc.is_xmm:
+                src = sourceloc
+                i = si
+                if i >= lanecount:
+                    self.mc.VEXTRACTI128_xyi(temp.value, sourceloc.value, 1)
+                    src = temp
+                    i -= lanecount
+                if resultloc.is_xmm:
+                    reg = scratch
+                else:
+                    reg = resultloc
+                self._pextr(size, reg, src, i)
+            else:
+                reg = sourceloc
+            if resultloc.is_xmm:
+                if ri >= lanecount:
+                    self.mc.VEXTRACTI128_xyi(temp.value, resultloc.value, 1)
+                    self._pinsr(size, temp, reg, ri - lanecount)
+                    self.mc.VINSERTI128_yyxi(resultloc.value, resultloc.value,
+                                             temp.value, 1)
+                else:
+                    self._pinsr(size, resultloc, reg, ri)
+            si += 1
+            ri += 1
+            k -= 1
+
+    def _pextr(self, size, reg, xmmloc, index):
+        if size == 8:
+            self.mc.PEXTRQ_rxi(reg.value, xmmloc.value, index)
+        elif size == 4:
+            self.mc.PEXTRD_rxi(reg.value, xmmloc.value, index)
+        elif size == 2:
+            self.mc.PEXTRW_rxi(reg.value, xmmloc.value, index)
+        elif size == 1:
+            self.mc.PEXTRB_rxi(reg.value, xmmloc.value, index)
+
+    def _pinsr(self, size, xmmloc, reg, index):
+        if size == 8:
+            self.mc.PINSRQ_xri(xmmloc.value, reg.value, index)
+        elif size == 4:
+            self.mc.PINSRD_xri(xmmloc.value, reg.value, index)
+        elif size == 2:
+            self.mc.PINSRW_xri(xmmloc.value, reg.value, index)
+        elif size == 1:
+            self.mc.PINSRB_xri(xmmloc.value, reg.value, index)
+
     def genop_vec_pack_f(self, op, arglocs, resultloc):
         resloc, srcloc, residxloc, srcidxloc, countloc, sizeloc = arglocs
         assert isinstance(resloc, RegLoc)
@@ -517,6 +819,9 @@ class VectorAssemblerMixin(object):
         residx = residxloc.value
         srcidx = srcidxloc.value
         size = sizeloc.value
+        if is_wide(op):
+            self._vec_pack_wide(resloc, srcloc, residx, srcidx, count, size)
+            return
         if size == 4:
             si = srcidx
             ri = residx
@@ -568,15 +873,27 @@ class VectorAssemblerMixin(object):
     genop_vec_unpack_f = genop_vec_pack_f
 
     def genop_vec_cast_float_to_singlefloat(self, op, arglocs, resloc):
+        if is_wide(op):
+            self.mc.VCVTPD2PS_xy(resloc.value, arglocs[0].value)
+            return
         self.mc.CVTPD2PS(resloc, arglocs[0])
 
     def genop_vec_cast_float_to_int(self, op, arglocs, resloc):
+        if is_wide(op):
+            self.mc.VCVTPD2DQ_xy(resloc.value, arglocs[0].value)
+            return
         self.mc.CVTPD2DQ(resloc, arglocs[0])
 
     def genop_vec_cast_int_to_float(self, op, arglocs, resloc):
+        if is_wide(op):
+            self.mc.VCVTDQ2PD_yx(resloc.value, arglocs[0].value)
+            return
         self.mc.CVTDQ2PD(resloc, arglocs[0])
 
     def genop_vec_cast_singlefloat_to_float(self, op, arglocs, resloc):
+        if is_wide(op):
+            self.mc.VCVTPS2PD_yx(resloc.value, arglocs[0].value)
+            return
         self.mc.CVTPS2PD(resloc, arglocs[0])
 
 class VectorRegallocMixin(object):
@@ -4,7 +4,7 @@ from rpython.rtyper.annlowlevel import (
     cast_instance_to_gcref, cast_gcref_to_instance)
 from rpython.rlib.objectmodel import we_are_translated
 from rpython.rlib.debug import debug_start, debug_stop, debug_print, have_debug_prints
-from rpython.rlib.rarithmetic import r_uint, intmask
+from rpython.rlib.rarithmetic import r_uint, intmask, LONG_BIT
 from rpython.rlib import rstack
 from rpython.rlib.jit import JitDebugInfo, Counters, dont_look_inside
 from rpython.rlib.rjitlog import rjitlog as jl
@@ -531,6 +531,34 @@ def forget_optimization_info(lst, reset_values=False):
         if reset_values:
             item.reset_value()
 
+WORD = LONG_BIT // 8
+
+def resume_data_size(operations):
+    """Estimate the number of bytes of resume data attached to the
+    guards of 'operations'.  Guards that share the resume data of a
+    previous guard are not counted."""
+    size = 0
+    for op in operations:
+        if op.is_guard():
+            descr = op.getdescr()
+            if isinstance(descr, ResumeGuardDescr):
+                if descr.rd_numb:
+                    size += len(descr.rd_numb.code)
+                if descr.rd_consts is not None:
+                    size += len(descr.rd_consts) * WORD
+                if descr.rd_virtuals is not None:
+                    size += len(descr.rd_virtuals) * WORD
+                if descr.rd_pendingfields:
+                    size += len(descr.rd_pendingfields) * 3 * WORD
+    return size
+
+def record_code_size(metainterp_sd, jitcell_token, operations, code_before):
+    if metainterp_sd.warmrunnerdesc is not None:    # for tests
+        code_size = metainterp_sd.cpu.get_code_memory_used() - code_before
+        size = max(code_size, 0) + resume_data_size(operations)
+        metainterp_sd.warmrunnerdesc.memory_manager.record_code_size(
+            jitcell_token, size)
+
 def send_loop_to_backend(greenkey, jitdriver_sd, metainterp_sd, loop, type,
                          orig_inpargs, memo):
     forget_optimization_info(loop.operations)
@@ -562,6 +590,7 @@ def send_loop_to_backend(greenkey, jitdriver_sd, metainterp_sd, loop, type,
     metainterp_sd.profiler.start_backend()
     debug_start("jit-backend")
     log = have_debug_prints() or jl.jitlog_enabled()
+    code_before = metainterp_sd.cpu.get_code_memory_used()
     try:
         loopname = jitdriver_sd.warmstate.get_location_str(greenkey)
         unique_id = jitdriver_sd.warmstate.get_unique_id(greenkey)
@@ -590,6 +619,8 @@ def send_loop_to_backend(greenkey, jitdriver_sd, metainterp_sd, loop, type,
                                       type, ops_offset,
                                       name=loopname)
     #
+    record_code_size(metainterp_sd, original_jitcell_token, operations,
+                     code_before)
     if metainterp_sd.warmrunnerdesc is not None:    # for tests
         metainterp_sd.warmrunnerdesc.memory_manager.keep_loop_alive(original_jitcell_token)
 
@@ -616,6 +647,7 @@ def send_bridge_to_backend(jitdriver_sd, metainterp_sd, faildescr, inputargs,
     metainterp_sd.profiler.start_backend()
     debug_start("jit-backend")
     log = have_debug_prints() or jl.jitlog_enabled()
+    code_before = metainterp_sd.cpu.get_code_memory_used()
     try:
         asminfo = do_compile_bridge(metainterp_sd, faildescr, inputargs,
                                     operations,
@@ -638,6 +670,8 @@ def send_bridge_to_backend(jitdriver_sd, metainterp_sd, faildescr, inputargs,
     metainterp_sd.logger_ops.log_bridge(inputargs, operations, None, faildescr,
                                         ops_offset, memo=memo)
     #
+    record_code_size(metainterp_sd, original_loop_token, operations,
+                     code_before)
     #if metainterp_sd.warmrunnerdesc is not None:    # for tests
     #    metainterp_sd.warmrunnerdesc.memory_manager.keep_loop_alive(
     #        original_loop_token)
@@ -421,6 +421,10 @@ class JitCellToken(AbstractDescr):
     # and more data specified by the backend when the loop is compiled
     number = -1
     generation = r_int64(0)
+    # bytes of machine code and resume data, and recent number of entries
+    # (see memmgr.py)
+    code_size = 0
+    recent_entries = 0
     # one purpose of LoopToken is to keep alive the CompiledLoopToken
     # returned by the backend.  When the LoopToken goes away, the
     # CompiledLoopToken has its __del__ called, which frees the assembler
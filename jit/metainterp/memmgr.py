@@ -2,6 +2,7 @@ import math
 from rpython.rlib.rarithmetic import r_int64
 from rpython.rlib.debug import debug_start, debug_print, debug_stop
 from rpython.rlib.objectmodel import we_are_translated
+from rpython.rlib.listsort import make_timsort_class
 
 #
 # Logic to decide which loops are old and not used any more.
@@ -19,6 +20,20 @@ from rpython.rlib.objectmodel import we_are_translated
 # 'generation' field is much smaller than the current generation, and
 # removed from the set.
 #
+# In addition, the total size of the machine code and resume data of
+# the loops in 'alive_loops' can be bounded by a 'code_budget'.  Each
+# LoopToken records its size in 'code_size' and the number of times it
+# was entered recently in 'recent_entries'.  When the budget is
+# exceeded, the loops with the fewest recent entries per byte are
+# removed until the total is back below 3/4 of the budget.  Loops used
+# in the current generation are never removed this way.
+#
+
+def _less_valuable(looptoken1, looptoken2):
+    return (looptoken1.recent_entries * float(looptoken2.code_size) <
+            looptoken2.recent_entries * float(looptoken1.code_size))
+
+LoopTokenSort = make_timsort_class(lt=_less_valuable)
 
 class MemoryManager(object):
 
@@ -38,6 +53,8 @@ class MemoryManager(object):
         self.current_generation = r_int64(1)
         self.next_check = r_int64(-1)
         self.alive_loops = {}
+        self.code_budget = 0        # in bytes; 0 means no limit
+        self.total_code_size = 0    # of the loops in 'alive_loops'
 
     def set_max_age(self, max_age, check_frequency=0):
         if max_age <= 0:
@@ -49,6 +66,10 @@ class MemoryManager(object):
             self.check_frequency = check_frequency
             self.next_check = self.current_generation + 1
 
+    def set_code_budget(self, code_budget):
+        self.code_budget = max(code_budget, 0)
+        self._check_code_budget()
+
     def next_generation(self):
         self.current_generation += 1
         if self.current_generation == self.next_check:
@@ -56,9 +77,26 @@ class MemoryManager(object):
             self.next_check = self.current_generation + self.check_frequency
 
     def keep_loop_alive(self, looptoken):
+        looptoken.recent_entries += 1
         if looptoken.generation != self.current_generation:
             looptoken.generation = self.current_generation
-            self.alive_loops[looptoken] = None
+            if looptoken not in self.alive_loops:
+                self.alive_loops[looptoken] = None
+                self.total_code_size += looptoken.code_size
+                self._check_code_budget()
+
+    def record_code_size(self, looptoken, size):
+        """Called after a loop or a bridge was compiled, with the number
+        of bytes of machine code and resume data it added to 'looptoken'.
+        """
+        looptoken.code_size += size
+        if looptoken in self.alive_loops:
+            self.total_code_size += size
+            self._check_code_budget()
+
+    def _check_code_budget(self):
+        if 0 < self.code_budget < self.total_code_size:
+            self._free_loops_over_budget()
 
     def _kill_old_loops_now(self):
         debug_start("jit-mem-collect")
@@ -71,13 +109,47 @@ class MemoryManager(object):
             if (0 <= looptoken.generation < max_generation or
                 looptoken.invalidated):
                 del self.alive_loops[looptoken]
+                self.total_code_size -= looptoken.code_size
+            else:
+                looptoken.recent_entries >>= 1
         newtotal = len(self.alive_loops)
         debug_print("Loop tokens freed: ", oldtotal - newtotal)
         debug_print("Loop tokens left:  ", newtotal)
         #print self.alive_loops.keys()
-        if not we_are_translated() and oldtotal != newtotal:
+        if oldtotal != newtotal:
             looptoken = None
+            self._collect_untranslated()
+        debug_stop("jit-mem-collect")
+
+    def _free_loops_over_budget(self):
+        debug_start("jit-mem-collect")
+        oldtotal = len(self.alive_loops)
+        debug_print("Code budget:      ", self.code_budget)
+        debug_print("Code size before: ", self.total_code_size)
+        candidates = [looptoken for looptoken in self.alive_loops
+                      if looptoken.generation != self.current_generation and
+                         looptoken.code_size > 0]
+        LoopTokenSort(candidates).sort()
+        goal = self.code_budget - self.code_budget // 4
+        for looptoken in candidates:
+            if self.total_code_size <= goal:
+                break
+            del self.alive_loops[looptoken]
+            self.total_code_size -= looptoken.code_size
+        for looptoken in self.alive_loops:
+            looptoken.recent_entries >>= 1
+        newtotal = len(self.alive_loops)
+        debug_print("Code size after:  ", self.total_code_size)
+        debug_print("Loop tokens freed: ", oldtotal - newtotal)
+        debug_print("Loop tokens left:  ", newtotal)
+        if oldtotal != newtotal:
+            looptoken = None
+            candidates = None
+            self._collect_untranslated()
+        debug_stop("jit-mem-collect")
+
+    def _collect_untranslated(self):
+        if not we_are_translated():
             from rpython.rlib import rgc
             # a single one is not enough for all tests :-(
             rgc.collect(); rgc.collect(); rgc.collect()
-        debug_stop("jit-mem-collect")
@@ -10,7 +10,9 @@ from rpython.jit.metainterp.optimizeopt.test.test_util import LLtypeMixin
 from rpython.jit.metainterp.optimizeopt.test.test_schedule import SchedulerBaseTest
 from rpython.jit.metainterp.optimizeopt.test.test_vecopt import (FakeMetaInterpStaticData,
         FakeJitDriverStaticData)
-from rpython.jit.metainterp.resoperation import rop, ResOperation, AbstractValue
+from rpython.jit.metainterp.resoperation import (rop, ResOperation,
+        AbstractValue, InputArgInt)
+from rpython.jit.backend.llsupport.vector_ext import VectorExt
 from rpython.jit.tool.oparser import parse as opparse
 from rpython.jit.tool.oparser_model import get_model
 
@@ -268,6 +270,18 @@ class CostModelBaseTest(SchedulerBaseTest):
         number = self.savings(trace)
         assert number >= 1
 
+    def test_unpack_upper_lane(self):
+        class cpu:
+            vector_ext = VectorExt()
+        cpu.vector_ext.enable(32, True)
+        costmodel = GenericCostModel(cpu, 0)
+        box = InputArgInt()
+        costmodel.record_vector_unpack(box, 1, 1)
+        assert costmodel.savings == -1
+        costmodel.reset_savings()
+        costmodel.record_vector_unpack(box, 2, 1)
+        assert costmodel.savings == -3
+
 
 class Test(CostModelBaseTest, LLtypeMixin):
     pass
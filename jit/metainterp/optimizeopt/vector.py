@@ -662,6 +662,10 @@ class GenericCostModel(CostModel):
                 self.savings -= 2
                 return
         self.savings -= count
+        if self.vec_reg_size > 16 and (index + count) * vecinfo.bytesize > 16:
+            # the upper 128-bit lane of the register is only reached
+            # with an additional extract and insert
+            self.savings -= 2
 
     def record_vector_unpack(self, src, index, count):
         self.record_vector_pack(src, index, count)
@@ -6,6 +6,7 @@ from rpython.jit.codewriter import longlong
 from rpython.jit.codewriter.effectinfo import EffectInfo
 from rpython.jit.codewriter.jitcode import JitCode, SwitchDictDescr
 from rpython.jit.metainterp import history, compile, resume, executor, jitexc
+from rpython.jit.metainterp import tracecache
 from rpython.jit.metainterp.heapcache import HeapCache
 from rpython.jit.metainterp.history import (Const, ConstInt, ConstPtr,
     ConstFloat, CONST_NULL, TargetToken, MissingValue, SwitchToBlackhole)
@@ -1932,6 +1933,7 @@ class MetaInterpStaticData(object):
         from rpython.jit.codewriter import effectinfo
         self.all_descrs = self.cpu.setup_descrs()
         effectinfo.compute_bitstrings(self.all_descrs)
+        self.trace_cache_fingerprint = tracecache.compute_fingerprint(self)
 
     def _setup_once(self):
         """Runtime setup needed by the various components of the JIT."""
@@ -1944,8 +1946,21 @@ class MetaInterpStaticData(object):
             if not self.profiler.initialized:
                 self.profiler.start()
                 self.profiler.initialized = True
+            self.globaldata.trace_cache.setup_once()
             self.globaldata.initialized = True
 
+    def compile_pending_loops(self):
+        """A safe point: compile all the loops traced with the
+        'defer_compile' parameter so far.  Returns how many were
+        compiled."""
+        cells = self.globaldata.pending_loop_cells
+        self.globaldata.pending_loop_cells = []
+        count = 0
+        for cell in cells:
+            if cell.compile_pending_loop():
+                count += 1
+        return count
+
     def get_name_from_address(self, addr):
         # for debugging only
         if we_are_translated():
@@ -2015,12 +2030,16 @@ class MetaInterpGlobalData(object):
         self.initialized = False
         self.indirectcall_dict = None
         self.addr2name = None
+        self.trace_cache = tracecache.TraceCache(staticdata)
+        self.pending_loop_cells = []
 
 # ____________________________________________________________
 
 class MetaInterp(object):
     portal_call_depth = 0
     cancel_count = 0
+    pending_original_boxes = None
+    pending_live_arg_boxes = None
     exported_state = None
     last_exc_box = None
     _last_op = None
@@ -2470,11 +2489,37 @@ class MetaInterp(object):
             self.create_empty_history()
             self.history.set_inputargs(original_boxes[num_green_args:],
                                        self.staticdata)
+            self.compile_from_trace_cache(original_boxes)
             self.interpret()
         except SwitchToBlackhole as stb:
             self.run_blackhole_interp_to_cancel_tracing(stb)
         assert False, "should always raise"
 
+    def compile_from_trace_cache(self, original_boxes):
+        """Compile the loop from the trace saved for its green key by a
+        previous run, if there is one, instead of tracing it again."""
+        trace_cache = self.staticdata.globaldata.trace_cache
+        num_green_args = self.jitdriver_sd.num_green_args
+        greenkey = original_boxes[:num_green_args]
+        jumpargs = trace_cache.load_loop(self.jitdriver_sd, greenkey,
+                                         self.history)
+        if jumpargs is None:
+            return
+        inputargs = original_boxes[num_green_args:]
+        target_token = compile.compile_loop(self, greenkey, (0, 0, 0),
+                                            inputargs, jumpargs)
+        if target_token is None:
+            # the optimizer gave up, trace the loop as usual
+            self.create_empty_history()
+            self.history.set_inputargs(inputargs, self.staticdata)
+            return
+        assert isinstance(target_token, TargetToken)
+        jitcell_token = target_token.targeting_jitcell_token
+        self.jitdriver_sd.warmstate.attach_procedure_to_interp(greenkey,
+                                                               jitcell_token)
+        self.staticdata.stats.add_jitcell_token(jitcell_token)
+        self.raise_continue_running_normally(original_boxes, jitcell_token)
+
     def handle_guard_failure(self, resumedescr, deadframe):
         debug_start('jit-tracing')
         self.staticdata.profiler.start_tracing()
@@ -2733,20 +2778,74 @@ class MetaInterp(object):
                                                    self.resumekey,
                                                    exported_state)
         else:
-            target_token = compile.compile_loop(self, greenkey, start,
-                                                original_boxes[num_green_args:],
-                                                live_arg_boxes[num_green_args:],
-                                     try_disabling_unroll=try_disabling_unroll)
-            if target_token is not None:
-                assert isinstance(target_token, TargetToken)
-                self.jitdriver_sd.warmstate.attach_procedure_to_interp(greenkey, target_token.targeting_jitcell_token)
-                self.staticdata.stats.add_jitcell_token(target_token.targeting_jitcell_token)
+            if (self.jitdriver_sd.warmstate.defer_compile and
+                    not try_disabling_unroll):
+                self.defer_loop_compilation(original_boxes, live_arg_boxes,
+                                            start)
+            target_token = self._compile_new_loop(original_boxes,
+                                                  live_arg_boxes, start,
+                                                  try_disabling_unroll)
 
         if target_token is not None: # raise if it *worked* correctly
             assert isinstance(target_token, TargetToken)
             jitcell_token = target_token.targeting_jitcell_token
             self.raise_continue_running_normally(live_arg_boxes, jitcell_token)
 
+    def _compile_new_loop(self, original_boxes, live_arg_boxes, start,
+                          try_disabling_unroll=False):
+        num_green_args = self.jitdriver_sd.num_green_args
+        greenkey = original_boxes[:num_green_args]
+        trace_cache = self.staticdata.globaldata.trace_cache
+        recorded = None
+        if start == (0, 0, 0):
+            recorded = trace_cache.record_loop(self.jitdriver_sd, greenkey,
+                                               self.history.trace,
+                                               live_arg_boxes[num_green_args:])
+        target_token = compile.compile_loop(self, greenkey, start,
+                                            original_boxes[num_green_args:],
+                                            live_arg_boxes[num_green_args:],
+                                 try_disabling_unroll=try_disabling_unroll)
+        if target_token is not None:
+            assert isinstance(target_token, TargetToken)
+            if recorded is not None:
+                trace_cache.add_loop(recorded)
+            self.jitdriver_sd.warmstate.attach_procedure_to_interp(greenkey, target_token.targeting_jitcell_token)
+            self.staticdata.stats.add_jitcell_token(target_token.targeting_jitcell_token)
+        return target_token
+
+    def defer_loop_compilation(self, original_boxes, live_arg_boxes, start):
+        """Keep the finished trace of the loop, to be compiled at the next
+        safe point by compile_pending_loop(), and go on running the loop
+        in the blackhole interpreter."""
+        from rpython.jit.metainterp.blackhole import convert_and_run_from_pyjitpl
+        self.pending_original_boxes = original_boxes
+        self.pending_live_arg_boxes = live_arg_boxes
+        self.pending_start = start
+        greenkey = original_boxes[:self.jitdriver_sd.num_green_args]
+        self.jitdriver_sd.warmstate.defer_loop_compilation(greenkey, self)
+        self.staticdata.log('deferred compiling the loop')
+        convert_and_run_from_pyjitpl(self, False)
+        assert False    # ^^^ must raise
+
+    def compile_pending_loop(self):
+        """Compile the loop kept by defer_loop_compilation(), unless
+        another one was attached to its greenkey in the meantime."""
+        original_boxes = self.pending_original_boxes
+        live_arg_boxes = self.pending_live_arg_boxes
+        start = self.pending_start
+        self.pending_original_boxes = None
+        self.pending_live_arg_boxes = None
+        greenkey = original_boxes[:self.jitdriver_sd.num_green_args]
+        if self.get_procedure_token(greenkey, True) is not None:
+            return False
+        debug_start('jit-compile-pending')
+        try:
+            target_token = self._compile_new_loop(original_boxes,
+                                                  live_arg_boxes, start)
+        finally:
+            debug_stop('jit-compile-pending')
+        return target_token is not None
+
     def compile_loop_or_abort(self, original_boxes, live_arg_boxes,
                               start):
         """Called after we aborted more than 'max_unroll_loops' times.
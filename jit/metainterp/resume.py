@@ -163,6 +163,10 @@ NULLREF = tag(-1, TAGCONST)
 UNINITIALIZED = tag(-2, TAGCONST)   # used for uninitialized string characters
 TAG_CONST_OFFSET = 0
 
+# how many numberings in a row can be stored as a delta against the
+# previous one; bounds the work needed to expand one of them again
+MAX_NUMBERING_CHAIN = 16
+
 class NumberingState(resumecode.Writer):
     def __init__(self, size):
         resumecode.Writer.__init__(self, size)
@@ -182,9 +186,15 @@ class ResumeDataLoopMemo(object):
         self.cached_boxes = {}
         self.cached_virtuals = {}
 
+        self.last_numb = resumecode.NULL_NUMBER
+        self.last_numb_items = None
+        self.numb_chain = 0
+
         self.nvirtuals = 0
         self.nvholes = 0
         self.nvreused = 0
+        self.nresumebytes = 0
+        self.nresumesaved = 0
 
     def getconst(self, const):
         if const.type == INT:
@@ -282,6 +292,27 @@ class ResumeDataLoopMemo(object):
 
         return numb_state
 
+    def create_numbering(self, numb_state):
+        """Create the numbering of a guard, as a delta against the
+        numbering of the previous guard if that is smaller."""
+        items = numb_state.current
+        final = resumecode.encode_items(items)
+        prev = resumecode.NULL_NUMBER
+        if self.last_numb and self.numb_chain < MAX_NUMBERING_CHAIN:
+            delta = resumecode.encode_delta(items, self.last_numb_items)
+            if len(delta) < len(final):
+                self.nresumesaved += len(final) - len(delta)
+                final = delta
+                prev = self.last_numb
+        if prev:
+            self.numb_chain += 1
+        else:
+            self.numb_chain = 0
+        self.nresumebytes += len(final)
+        numb = resumecode.make_numbering(final, prev)
+        self.last_numb = numb
+        self.last_numb_items = items
+        return numb
 
     # caching for virtuals and boxes inside them
 
@@ -318,6 +349,8 @@ class ResumeDataLoopMemo(object):
         profiler.count(jitprof.Counters.NVIRTUALS, self.nvirtuals)
         profiler.count(jitprof.Counters.NVHOLES, self.nvholes)
         profiler.count(jitprof.Counters.NVREUSED, self.nvreused)
+        profiler.count(jitprof.Counters.RESUMEDATA_BYTES, self.nresumebytes)
+        profiler.count(jitprof.Counters.RESUMEDATA_SAVED, self.nresumesaved)
 
 _frame_info_placeholder = (None, 0, 0)
 
@@ -466,7 +499,7 @@ class ResumeDataVirtualAdder(VirtualVisitor):
         numb_state.patch(1, len(liveboxes))
 
         self._add_optimizer_sections(numb_state, liveboxes, liveboxes_from_env)
-        storage.rd_numb = numb_state.create_numbering()
+        storage.rd_numb = self.memo.create_numbering(numb_state)
         storage.rd_consts = self.memo.consts
         return liveboxes[:]
 
@@ -20,6 +20,22 @@
 
   # ----- optimization section
   <more code>                                      further sections according to bridgeopt.py
+
+The numbering of a guard can also be stored as a delta against the
+numbering of the previous guard of the same trace, given in 'prev'.
+The code is then:
+
+  [total size of resume section]
+  [number of failargs]
+  [number of items after these two that are the same as in 'prev']
+  [item - corresponding item of 'prev']            for the following items
+  ...                                              (or just the item, if
+                                                    'prev' is shorter)
+
+Consecutive guards often share all frames but the innermost one, so
+most of the items are either in the shared prefix or small deltas.  A
+Reader expands such a numbering back into the full form, which only
+occurs when the guard fails.
 """
 
 from rpython.rtyper.lltypesystem import rffi, lltype
@@ -27,6 +43,7 @@ from rpython.rlib import objectmodel
 
 NUMBERINGP = lltype.Ptr(lltype.GcForwardReference())
 NUMBERING = lltype.GcStruct('Numbering',
+                            ('prev', NUMBERINGP),
                             ('code', lltype.Array(rffi.UCHAR)))
 NUMBERINGP.TO.become(NUMBERING)
 NULL_NUMBER = lltype.nullptr(NUMBERING)
@@ -44,7 +61,7 @@ def append_numbering(lst, item):
         lst.append(rffi.cast(rffi.UCHAR, item | 0x80))
         lst.append(rffi.cast(rffi.UCHAR, item >> 7))
     else:
-        assert item < 2**16
+        assert item < 2**22
         lst.append(rffi.cast(rffi.UCHAR, item | 0x80))
         lst.append(rffi.cast(rffi.UCHAR, (item >> 7) | 0x80))
         lst.append(rffi.cast(rffi.UCHAR, item >> 14))
@@ -78,8 +95,67 @@ def unpack_numbering(numb):
     while i < len(numb.code):
         next, i = numb_next_item(numb, i)
         l.append(next)
+    if numb.prev:
+        l = _apply_delta(l, unpack_numbering(numb.prev))
     return l
 
+def _apply_delta(delta, prev_items):
+    length = len(delta)
+    assert length >= 3
+    end_prefix = 2 + delta[2]
+    l = objectmodel.newlist_hint(end_prefix + length - 3)
+    l.append(delta[0])
+    l.append(delta[1])
+    for i in range(2, end_prefix):
+        l.append(prev_items[i])
+    for i in range(3, length):
+        item = delta[i]
+        j = len(l)
+        if j < len(prev_items):
+            item += prev_items[j]
+        l.append(item)
+    return l
+
+def encode_items(items):
+    final = objectmodel.newlist_hint(len(items) * 3)
+    for item in items:
+        append_numbering(final, item)
+    return final
+
+def encode_delta(items, prev_items):
+    """Encode 'items' as a delta against 'prev_items', see above."""
+    length = len(items)
+    assert length >= 2
+    prefix_stop = min(length, len(prev_items))
+    k = 2
+    while (k < prefix_stop and rffi.cast(lltype.Signed, items[k]) ==
+                               rffi.cast(lltype.Signed, prev_items[k])):
+        k += 1
+    final = objectmodel.newlist_hint(length - k + 3)
+    append_numbering(final, items[0])
+    append_numbering(final, items[1])
+    append_numbering(final, k - 2)
+    for j in range(k, length):
+        item = rffi.cast(lltype.Signed, items[j])
+        if j < len(prev_items):
+            item -= rffi.cast(lltype.Signed, prev_items[j])
+        append_numbering(final, item)
+    return final
+
+def make_numbering(final, prev=NULL_NUMBER):
+    numb = lltype.malloc(NUMBERING, len(final))
+    numb.prev = prev
+    for i, elt in enumerate(final):
+        numb.code[i] = elt
+    return numb
+
+def expand_numbering(numb):
+    """Return 'numb' in the full form, decoding it if it is stored as a
+    delta against another numbering."""
+    if not numb.prev:
+        return numb
+    return create_numbering(unpack_numbering(numb))
+
 class Writer(object):
     def __init__(self, size=0):
         self.current = objectmodel.newlist_hint(size)
@@ -93,13 +169,7 @@ class Writer(object):
         return self.append_short(short)
 
     def create_numbering(self):
-        final = objectmodel.newlist_hint(len(self.current) * 3)
-        for item in self.current:
-            append_numbering(final, item)
-        numb = lltype.malloc(NUMBERING, len(final))
-        for i, elt in enumerate(final):
-            numb.code[i] = elt
-        return numb
+        return make_numbering(encode_items(self.current))
 
     def patch_current_size(self, index):
         self.patch(index, len(self.current))
@@ -116,7 +186,7 @@ def create_numbering(l):
 
 class Reader(object):
     def __init__(self, code):
-        self.code = code
+        self.code = expand_numbering(code)
         self.cur_pos = 0 # index into the code
         self.items_read = 0 # number of items read
 
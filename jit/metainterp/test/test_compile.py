@@ -28,6 +28,9 @@ class FakeCPU(object):
         token.compiled_loop_token = self.Storage()
         self.seen.append((inputargs, operations, token))
 
+    def get_code_memory_used(self):
+        return 0
+
 class FakeLogger(object):
     def log_loop(self, inputargs, operations, number=0, type=None, ops_offset=None, name='', memo=None):
         pass
@@ -0,0 +1,73 @@
+from rpython.rlib.jit import JitDriver, set_param
+from rpython.rlib import jit_hooks
+from rpython.jit.metainterp.test.support import LLJitMixin
+
+
+class DeferCompileTests(object):
+
+    def make_loop(self):
+        driver = JitDriver(greens=[], reds=['n', 's'])
+
+        def loop(n):
+            s = 0
+            while n > 0:
+                driver.jit_merge_point(n=n, s=s)
+                s += n
+                n -= 1
+            return s
+        return driver, loop
+
+    def test_compiled_when_hot_again(self):
+        driver, loop = self.make_loop()
+
+        def main(n):
+            set_param(driver, 'defer_compile', 1)
+            return loop(n)
+
+        res = self.meta_interp(main, [50])
+        assert res == 50 * 51 // 2
+        self.check_trace_count(1)
+        self.check_jitcell_token_count(1)
+
+    def test_not_compiled_if_not_hot_again(self):
+        driver, loop = self.make_loop()
+
+        def main(n):
+            set_param(driver, 'defer_compile', 1)
+            set_param(driver, 'threshold', 20)
+            return loop(n)
+
+        res = self.meta_interp(main, [30])
+        assert res == 30 * 31 // 2
+        self.check_jitcell_token_count(0)
+
+    def test_compile_pending_loops(self):
+        driver, loop = self.make_loop()
+
+        def main(n):
+            set_param(driver, 'defer_compile', 1)
+            set_param(driver, 'threshold', 20)
+            compiled = 0
+            for i in range(3):
+                # 'requests' too short to make the loop hot again
+                loop(n)
+                compiled = compiled * 10 + jit_hooks.stats_compile_pending_loops(None)
+            return compiled
+
+        res = self.meta_interp(main, [30])
+        assert res == 100
+        self.check_jitcell_token_count(1)
+
+    def test_no_defer_by_default(self):
+        driver, loop = self.make_loop()
+
+        def main(n):
+            return loop(n) * 10 + jit_hooks.stats_compile_pending_loops(None)
+
+        res = self.meta_interp(main, [50])
+        assert res == (50 * 51 // 2) * 10
+        self.check_jitcell_token_count(1)
+
+
+class TestLLtype(DeferCompileTests, LLJitMixin):
+    pass
@@ -13,7 +13,7 @@ if len(sys.argv) >= 4 and sys.argv[1] == '--sub':
 import py
 from rpython.jit.metainterp.memmgr import MemoryManager
 from rpython.jit.metainterp.test.support import LLJitMixin
-from rpython.rlib.jit import JitDriver, dont_look_inside
+from rpython.rlib.jit import JitDriver, dont_look_inside, set_param
 from rpython.jit.metainterp.warmspot import get_stats
 from rpython.jit.metainterp.warmstate import BaseJitCell
 from rpython.rlib import rgc
@@ -21,6 +21,8 @@ from rpython.rlib import rgc
 class FakeLoopToken:
     generation = 0
     invalidated = False
+    code_size = 0
+    recent_entries = 0
 
 
 class _TestMemoryManager:
@@ -78,6 +80,80 @@ class _TestMemoryManager:
             else:
                 assert tokens[i] in memmgr.alive_loops
 
+    def test_code_budget_disabled(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        tokens = [FakeLoopToken() for i in range(10)]
+        for token in tokens:
+            memmgr.keep_loop_alive(token)
+            memmgr.record_code_size(token, 1000)
+            memmgr.next_generation()
+        assert memmgr.alive_loops == dict.fromkeys(tokens)
+        assert memmgr.total_code_size == 10000
+
+    def test_code_budget(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_code_budget(1000)
+        hot = FakeLoopToken()
+        memmgr.keep_loop_alive(hot)
+        memmgr.record_code_size(hot, 200)
+        for i in range(10):
+            memmgr.next_generation()
+            for j in range(5):
+                memmgr.keep_loop_alive(hot)
+            token = FakeLoopToken()
+            memmgr.keep_loop_alive(token)
+            memmgr.record_code_size(token, 200)
+            assert memmgr.total_code_size <= 1000
+            assert hot in memmgr.alive_loops
+            assert token in memmgr.alive_loops
+        assert memmgr.total_code_size == sum(
+            [token.code_size for token in memmgr.alive_loops])
+
+    def test_code_budget_least_valuable_first(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_code_budget(400)
+        tokens = [FakeLoopToken() for i in range(5)]
+        for token, entries in zip(tokens, [1, 5, 3, 10, 1]):
+            memmgr.next_generation()
+            for i in range(entries):
+                memmgr.keep_loop_alive(token)
+            memmgr.record_code_size(token, 100)
+        # tokens[4] is in the current generation: the least used ones
+        # among the others are freed until 3/4 of the budget is used
+        assert memmgr.alive_loops == dict.fromkeys(
+            [tokens[1], tokens[3], tokens[4]])
+        assert memmgr.total_code_size == 300
+        assert [token.recent_entries for token in tokens] == [1, 2, 3, 5, 0]
+
+    def test_code_budget_size_matters(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        small = FakeLoopToken()
+        big = FakeLoopToken()
+        for token, size in [(small, 100), (big, 1000)]:
+            memmgr.next_generation()
+            for i in range(10):
+                memmgr.keep_loop_alive(token)
+            memmgr.record_code_size(token, size)
+        memmgr.next_generation()
+        memmgr.set_code_budget(1000)
+        assert memmgr.alive_loops == {small: None}
+        assert memmgr.total_code_size == 100
+
+    def test_code_budget_and_max_age(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(4, 1)
+        tokens = [FakeLoopToken() for i in range(10)]
+        for token in tokens:
+            memmgr.keep_loop_alive(token)
+            memmgr.record_code_size(token, 100)
+            memmgr.next_generation()
+        assert memmgr.alive_loops == dict.fromkeys(tokens[7:])
+        assert memmgr.total_code_size == 300
+
 
 class _TestIntegration(LLJitMixin):
     # See comments in TestMemoryManager.  To get temporarily the normal
@@ -212,6 +288,34 @@ class _TestIntegration(LLJitMixin):
         assert res == 42
         self.check_enter_count(2 + 10*4)
 
+    def test_code_budget(self):
+        myjitdriver = JitDriver(greens=['m'], reds=['n'])
+        def g(m):
+            n = 10
+            while n > 0:
+                myjitdriver.can_enter_jit(n=n, m=m)
+                myjitdriver.jit_merge_point(n=n, m=m)
+                n = n - 1
+            return 21
+        def f(budget):
+            set_param(myjitdriver, 'code_budget', budget)
+            for i in range(20):
+                g(7)
+                g(5)
+            return 42
+
+        # case A, no budget: a loop and an exit bridge for each of
+        # g(7) and g(5)
+        res = self.meta_interp(f, [0])
+        assert res == 42
+        self.check_enter_count(4)
+
+        # case B, a budget too small for anything: the loops are freed
+        # and compiled again over and over
+        res = self.meta_interp(f, [1])
+        assert res == 42
+        self.check_enter_count(40)
+
     def test_call_assembler_keep_alive(self):
         myjitdriver1 = JitDriver(greens=['m'], reds=['n'])
         myjitdriver2 = JitDriver(greens=['m'], reds=['n', 'rec'])
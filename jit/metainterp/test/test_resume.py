@@ -10,9 +10,9 @@ from rpython.jit.metainterp.resume import (
     VArrayInfoNotClear, VStrPlainInfo, VStrConcatInfo, VStrSliceInfo,
     VUniPlainInfo, VUniConcatInfo, VUniSliceInfo, capture_resumedata,
     ResumeDataLoopMemo, UNASSIGNEDVIRTUAL, INT, annlowlevel, PENDINGFIELDSP,
-    TAG_CONST_OFFSET)
+    TAG_CONST_OFFSET, MAX_NUMBERING_CHAIN)
 from rpython.jit.metainterp.resumecode import (
-    unpack_numbering, create_numbering)
+    unpack_numbering, create_numbering, Writer)
 from rpython.jit.metainterp.opencoder import Trace
 
 from rpython.jit.metainterp.optimizeopt import info
@@ -1097,6 +1097,41 @@ def test_virtual_adder_memo_const_sharing():
     assert len(memo.consts) == 3
     assert storage2.rd_consts is memo.consts
 
+def make_writer(items):
+    w = Writer()
+    for item in items:
+        w.append_int(item)
+    return w
+
+def test_memo_create_numbering_delta():
+    memo = ResumeDataLoopMemo(FakeMetaInterpStaticData())
+    frames = [tag(i, TAGBOX) for i in range(100)]
+    numbs = []
+    for i in range(MAX_NUMBERING_CHAIN + 2):
+        w = make_writer([104, 6] + frames + [17, i * 3, tag(100, TAGBOX)])
+        numb = memo.create_numbering(w)
+        assert unpack_numbering(numb) == [rffi.cast(lltype.Signed, item)
+                                          for item in w.current]
+        numbs.append(numb)
+    full_size = len(w.create_numbering().code)
+    assert not numbs[0].prev
+    for i in range(1, MAX_NUMBERING_CHAIN + 1):
+        assert numbs[i].prev == numbs[i - 1]
+        assert len(numbs[i].code) < 10
+    # the chain of deltas is limited
+    assert not numbs[MAX_NUMBERING_CHAIN + 1].prev
+    assert memo.nresumebytes == sum([len(numb.code) for numb in numbs])
+    assert (memo.nresumebytes + memo.nresumesaved ==
+            (MAX_NUMBERING_CHAIN + 2) * full_size)
+
+def test_memo_create_numbering_no_delta_if_bigger():
+    memo = ResumeDataLoopMemo(FakeMetaInterpStaticData())
+    memo.create_numbering(make_writer([2, 0, 1000, 2000]))
+    numb2 = memo.create_numbering(make_writer([2, 0, 1]))
+    assert not numb2.prev
+    assert unpack_numbering(numb2) == [2, 0, 1]
+    assert memo.nresumesaved == 0
+
 
 class ResumeDataFakeReader(ResumeDataBoxReader):
     """Another subclass of AbstractResumeDataReader meant for tests."""
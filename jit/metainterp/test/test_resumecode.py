@@ -1,5 +1,6 @@
 from rpython.jit.metainterp.resumecode import create_numbering,\
-    unpack_numbering, Reader, Writer
+    unpack_numbering, Reader, Writer, encode_items, encode_delta,\
+    make_numbering, expand_numbering
 from rpython.rtyper.lltypesystem import lltype
 
 from hypothesis import strategies, given, example
@@ -60,3 +61,29 @@ def test_patch(l):
         n = w.create_numbering()
         assert unpack_numbering(n)[1:] == l
         assert unpack_numbering(n)[0] == middle + 1
+
+items = strategies.lists(strategies.integers(-2**15, 2**15-1), min_size=2)
+
+@given(items, items)
+@example([5, 1, 1, 2, 3, 4], [6, 0, 1, 2, 3])
+@example([5, 1, -2**15, 2**15-1], [6, 0, 2**15-1, -2**15])
+def test_delta_roundtrip(l, prev_l):
+    prev = create_numbering(prev_l)
+    n = make_numbering(encode_delta(l, prev_l), prev)
+    assert unpack_numbering(n) == l
+    assert not expand_numbering(n).prev
+    r = Reader(n)
+    assert [r.next_item() for i in range(len(l))] == l
+
+def test_delta_chain():
+    l = [100, 0] + range(1000, 1100)
+    numb = create_numbering(l)
+    numbs = [numb]
+    for i in range(10):
+        l = [100 + i, i] + l[2:60] + range(3000 + i, 3040 + i)
+        numb = make_numbering(encode_delta(l, unpack_numbering(numb)), numb)
+        assert unpack_numbering(numb) == l
+        numbs.append(numb)
+    full_size = len(encode_items(l))
+    assert len(numb.code) * 4 < full_size
+    assert numb.prev is numbs[-2]
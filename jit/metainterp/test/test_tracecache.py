@@ -0,0 +1,129 @@
+from rpython.rlib.jit import JitDriver
+from rpython.rlib import jit_hooks
+from rpython.jit.metainterp import pyjitpl, tracecache
+from rpython.jit.metainterp.history import AbstractDescr, ConstInt, IntFrontendOp
+from rpython.jit.metainterp.opencoder import Trace
+from rpython.jit.metainterp.resoperation import rop
+from rpython.jit.metainterp.test.support import LLJitMixin
+from rpython.jit.metainterp.tracecache import ENVIRON_VAR
+from rpython.tool.udir import udir
+
+
+class TraceCacheTests(object):
+
+    def setup_method(self, meth):
+        self.cachefile = udir.join('tracecache-%s' % (meth.__name__,))
+        if self.cachefile.check():
+            self.cachefile.remove()
+
+    def run(self, monkeypatch, main, args, build_id='build'):
+        # every meta_interp() is a new translation; pretend it is the
+        # same one, unless 'build_id' says otherwise
+        monkeypatch.setattr(tracecache, 'new_build_id', lambda: build_id)
+        monkeypatch.setenv(ENVIRON_VAR, str(self.cachefile))
+        res = self.meta_interp(main, args)
+        trace_cache = pyjitpl._warmrunnerdesc.metainterp_sd.globaldata.trace_cache
+        return res, trace_cache
+
+    def make_main(self):
+        driver = JitDriver(greens=['m'], reds=['n', 's'])
+
+        def loop(m, n):
+            s = 0
+            while n > 0:
+                driver.jit_merge_point(m=m, n=n, s=s)
+                s += n * m
+                if s > 1000000:
+                    s -= 1000000
+                n -= 1
+            return s
+
+        def main(m, n):
+            s = loop(m, n)
+            jit_hooks.stats_save_trace_cache(None)
+            return s
+        return main, loop
+
+    def test_warm_start(self, monkeypatch):
+        main, loop = self.make_main()
+        res, trace_cache = self.run(monkeypatch, main, [3, 200])
+        assert res == loop(3, 200)
+        assert trace_cache.hits == 0
+        assert len(trace_cache.entries) == 1
+        assert self.cachefile.check()
+        self.check_trace_count(1)
+        #
+        res, trace_cache = self.run(monkeypatch, main, [3, 300])
+        assert res == loop(3, 300)
+        assert trace_cache.hits == 1
+        self.check_trace_count(1)
+        #
+        # another green key is traced as usual
+        res, trace_cache = self.run(monkeypatch, main, [4, 300])
+        assert res == loop(4, 300)
+        assert trace_cache.hits == 0
+        assert len(trace_cache.entries) == 2
+
+    def test_stale_fingerprint(self, monkeypatch):
+        main, loop = self.make_main()
+        self.run(monkeypatch, main, [3, 200])
+        lines = self.cachefile.read().split('\n')
+        lines[0] += 'x'
+        self.cachefile.write('\n'.join(lines))
+        res, trace_cache = self.run(monkeypatch, main, [3, 300])
+        assert res == loop(3, 300)
+        assert trace_cache.hits == 0
+        assert self.cachefile.read().split('\n')[0] == trace_cache.fingerprint()
+
+    def test_other_translation(self, monkeypatch):
+        main, loop = self.make_main()
+        _, trace_cache1 = self.run(monkeypatch, main, [3, 200])
+        res, trace_cache2 = self.run(monkeypatch, main, [3, 300],
+                                     build_id='other build')
+        assert res == loop(3, 300)
+        assert trace_cache2.hits == 0
+        assert trace_cache1.fingerprint() != trace_cache2.fingerprint()
+
+    def test_bad_entry(self, monkeypatch):
+        main, loop = self.make_main()
+        self.run(monkeypatch, main, [3, 200])
+        lines = self.cachefile.read().split('\n')
+        key, line = lines[1].split(' ', 1)
+        lines[1] = key + ' ' + line[:len(line) // 2]
+        self.cachefile.write('\n'.join(lines))
+        res, trace_cache = self.run(monkeypatch, main, [3, 300])
+        assert res == loop(3, 300)
+        assert trace_cache.hits == 0
+        self.check_trace_count(1)
+
+    def test_disabled(self, monkeypatch):
+        main, loop = self.make_main()
+        monkeypatch.delenv(ENVIRON_VAR, raising=False)
+        res = self.meta_interp(main, [3, 200])
+        trace_cache = pyjitpl._warmrunnerdesc.metainterp_sd.globaldata.trace_cache
+        assert trace_cache.filename is None
+        assert not trace_cache.entries
+        assert not self.cachefile.check()
+
+
+class TestLLtype(TraceCacheTests, LLJitMixin):
+    pass
+
+
+class FakeMetaInterpSd(object):
+    all_descrs = []
+
+def test_passes_constant_ints():
+    def make_trace():
+        i0 = IntFrontendOp(0)
+        t = Trace([i0], FakeMetaInterpSd)
+        t.record_op(rop.INT_ADD, [i0, ConstInt(4096)])
+        return t, i0
+    t, i0 = make_trace()
+    assert not tracecache._passes_constant_ints(t)
+    t.record_op(rop.RAW_LOAD_I, [i0, ConstInt(8)], AbstractDescr())
+    assert tracecache._passes_constant_ints(t)
+    # e.g. the address of the function
+    t, i0 = make_trace()
+    t.record_op(rop.CALL_N, [ConstInt(4096), i0], AbstractDescr())
+    assert tracecache._passes_constant_ints(t)
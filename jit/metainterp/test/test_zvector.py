@@ -877,6 +877,125 @@ class VectorizeTests(object):
         free_raw_storage(vc)
 
 
+class WideVectorizeTests(object):
+    """ Loops whose vectors fill 256-bit registers: the backend must pack
+        and unpack the upper lane, and guards and accumulators must look
+        at all the elements.
+    """
+    enable_opts = VectorizeTests.enable_opts
+
+    def setup_method(self, method):
+        if not self.supports_wide_vectors():
+            py.test.skip("this cpu %s has no 256-bit vectors" % CPU)
+
+    def check_wide_vectors(self):
+        for loop in get_stats().get_all_loops():
+            for op in loop.operations:
+                if op.is_vector() and op.bytesize * op.count > 16:
+                    return
+        assert False, "no vector wider than 128 bits"
+
+    def test_wide_load_store(self):
+        myjitdriver = JitDriver(greens = [], reds = 'auto', vectorize=True)
+        T = lltype.Array(rffi.LONG, hints={'nolength': True})
+        def f(d):
+            va = lltype.malloc(T, d, flavor='raw', zero=True)
+            vb = lltype.malloc(T, d, flavor='raw', zero=True)
+            for j in range(d):
+                va[j] = rffi.cast(rffi.LONG, j * 3)
+            i = 0
+            while i < d:
+                myjitdriver.jit_merge_point()
+                vb[i] = va[i]
+                i += 1
+            res = 0
+            for j in range(d):
+                res += intmask(vb[j]) * (j + 1)
+            lltype.free(va, flavor='raw')
+            lltype.free(vb, flavor='raw')
+            return res
+        res = self.meta_interp(f, [61], vec=True, vec_all=True)
+        assert res == f(61)
+        self.check_wide_vectors()
+
+    def test_wide_float_arith(self):
+        myjitdriver = JitDriver(greens = [], reds = 'auto', vectorize=True)
+        T = lltype.Array(rffi.DOUBLE, hints={'nolength': True})
+        def f(d):
+            va = lltype.malloc(T, d, flavor='raw', zero=True)
+            vb = lltype.malloc(T, d, flavor='raw', zero=True)
+            vc = lltype.malloc(T, d, flavor='raw', zero=True)
+            for j in range(d):
+                va[j] = j * 0.5
+                vb[j] = 100.0 - j
+            i = 0
+            while i < d:
+                myjitdriver.jit_merge_point()
+                vc[i] = va[i] * vb[i] + va[i]
+                i += 1
+            res = 0.0
+            for j in range(d):
+                res = res * 0.5 + vc[j]
+            lltype.free(va, flavor='raw')
+            lltype.free(vb, flavor='raw')
+            lltype.free(vc, flavor='raw')
+            return res
+        res = self.meta_interp(f, [61], vec=True, vec_all=True)
+        assert isclose(res, f(61))
+        self.check_wide_vectors()
+
+    @py.test.mark.parametrize('stop', [156, 157, 158, 159])
+    def test_wide_guard(self, stop):
+        myjitdriver = JitDriver(greens = [], reds = 'auto', vectorize=True)
+        T = lltype.Array(lltype.Signed, hints={'nolength': True})
+        def f(d, stop):
+            va = lltype.malloc(T, d, flavor='raw', zero=True)
+            va[stop] = 1
+            found = -1
+            i = 0
+            while i < d:
+                myjitdriver.jit_merge_point()
+                if va[i]:
+                    found = i
+                    break
+                i += 1
+            lltype.free(va, flavor='raw')
+            return found
+        # the element that fails the guard is in each of the lanes once
+        res = self.meta_interp(f, [200, stop], vec=True, vec_all=True)
+        assert res == f(200, stop) == stop
+        self.check_wide_vectors()
+
+    def test_wide_accumulator(self):
+        myjitdriver = JitDriver(greens = [], reds = 'auto', vectorize=True)
+        def f(accum, bytecount, v):
+            i = 0
+            while i < bytecount:
+                myjitdriver.jit_merge_point()
+                accum += raw_storage_getitem(lltype.Signed, v, i)
+                i += 8
+            return accum
+        rawstorage = RawStorage()
+        va = rawstorage.new(range(61), lltype.Signed)
+        # the upper lane is folded into the sum too
+        res = self.meta_interp(f, [7, 61 * 8, va], vec=True, vec_all=True)
+        assert res == f(7, 61 * 8, va) == 7 + 61 * 60 // 2
+        rawstorage.clear()
+        self.check_wide_vectors()
+
+
+class LLGraphWideCPU(LLJitMixin.CPUClass):
+    vector_ext = LLJitMixin.CPUClass.vector_ext.__class__()
+    vector_ext.enable(32, accum=True)
+    vector_ext.setup_once = lambda asm: asm
+
+class TestLLtypeWide(LLJitMixin, WideVectorizeTests):
+    CPUClass = LLGraphWideCPU
+
+    def supports_wide_vectors(self):
+        return True
+
+
 class TestLLtype(LLJitMixin, VectorizeTests):
     # skip some tests on this backend
     def test_unpack_f(self):
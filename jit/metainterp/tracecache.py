@@ -0,0 +1,386 @@
+""" A persistent cache of the traces of loops, for warm starts.
+
+If the environment variable JITTRACECACHE names a file, the traces of
+the loops compiled by MetaInterp.compile_loop() are kept in the encoding
+of opencoder.Trace, and written to that file by the
+jit_hooks.stats_save_trace_cache() hook, typically at exit.  The next
+run of the same executable loads the file when the JIT starts; when the
+green key of one of the saved loops becomes hot, the loop is optimized
+and compiled from the saved trace, instead of being traced again.
+
+The file starts with a fingerprint of the translation: a random build
+id chosen when translating, and a digest of the jitcodes, of their
+constants and of the descrs that the trace refers to by index.  A file
+with another fingerprint is ignored and overwritten.
+
+Only some traces can be saved: the ones that start at the beginning of
+the recorded history, whose green key is made of integers and floats,
+that refer to no GC object and to no descr created at run-time, and
+that pass no constant integer to a call or to a raw memory access,
+because such a constant may be the address of a function or of raw
+memory, which moves between runs of a position-independent executable.
+Note that a trace depending on the address of raw memory allocated at
+run-time, and turned into a constant elsewhere, cannot be detected and
+would be wrong after a restart; interpreters doing this must not use
+the cache.
+"""
+
+import os
+from hashlib import md5
+
+from rpython.jit.codewriter import longlong
+from rpython.jit.metainterp.history import (ConstInt, ConstFloat, ConstPtr,
+    IntFrontendOp, FloatFrontendOp, RefFrontendOp)
+from rpython.jit.metainterp.opencoder import (Trace, TopSnapshot, Snapshot,
+    TAGINT, TAGCONSTPTR, TAGCONSTOTHER, TAGBOX, SMALL_INT_START, untag,
+    get_model, _get_model)
+from rpython.jit.metainterp.resoperation import rop
+from rpython.rlib.debug import debug_start, debug_stop, debug_print
+from rpython.rlib.rfloat import formatd, string_to_float
+from rpython.rtyper.lltypesystem import lltype, llmemory, rffi
+
+ENVIRON_VAR = 'JITTRACECACHE'
+MAGIC = 'rpython-jit-trace-cache-1'
+
+
+# the operations whose constant integer arguments may be addresses
+_RAW_ACCESSES = (rop.GETARRAYITEM_RAW_I, rop.GETARRAYITEM_RAW_F,
+                 rop.RAW_LOAD_I, rop.RAW_LOAD_F,
+                 rop.GETFIELD_RAW_I, rop.GETFIELD_RAW_R, rop.GETFIELD_RAW_F,
+                 rop.SETARRAYITEM_RAW, rop.RAW_STORE, rop.SETFIELD_RAW,
+                 rop.SETINTERIORFIELD_RAW)
+
+
+def new_build_id():
+    """NOT_RPYTHON: a random id, different for every translation."""
+    return os.urandom(16).encode('hex')
+
+def compute_fingerprint(metainterp_sd):
+    """NOT_RPYTHON: the build id of this translation, and a digest of
+    what the saved traces refer to by number, i.e. the jitcodes and the
+    descrs."""
+    m = md5()
+    m.update(metainterp_sd.cpu.__class__.__name__)
+    m.update('\0' + _get_model(metainterp_sd).__name__)
+    for jitcode in getattr(metainterp_sd, 'jitcodes', []):
+        m.update('\0%d %s\0' % (jitcode.index, jitcode.name))
+        m.update(jitcode.code)
+        for value in jitcode.constants_i:
+            m.update('\0%s' % (value,))
+        for value in jitcode.constants_f:
+            m.update('\0%s' % (value,))
+    for descr in metainterp_sd.all_descrs:
+        m.update('\0' + descr.repr_of_descr())
+    for jd in metainterp_sd.jitdrivers_sd:
+        m.update('\0%d %d' % (jd.index, jd.num_green_args))
+    return '%s-%s' % (new_build_id(), m.hexdigest())
+
+def _passes_constant_ints(trace):
+    # a constant integer given to a call or to a raw memory access may
+    # be the address of a function or of raw memory in this process
+    it = trace.get_iter()
+    while not it.done():
+        op = it.next()
+        opnum = op.getopnum()
+        if rop.is_call(opnum) or opnum in _RAW_ACCESSES:
+            for i in range(op.numargs()):
+                if isinstance(op.getarg(i), ConstInt):
+                    return True
+    return False
+
+def _float2str(floatstorage):
+    return formatd(longlong.getrealfloat(floatstorage), 'r', 0)
+
+def _str2float(s):
+    return longlong.getfloatstorage(string_to_float(s))
+
+def _new_box_like(inputarg, position):
+    if inputarg.type == 'i':
+        box = IntFrontendOp(position)
+        box.setint(inputarg.getint())
+    elif inputarg.type == 'f':
+        box = FloatFrontendOp(position)
+        box.setfloatstorage(inputarg.getfloatstorage())
+    else:
+        assert inputarg.type == 'r'
+        box = RefFrontendOp(position)
+        box.setref_base(inputarg.getref_base())
+    return box
+
+
+class _Reader(object):
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def next(self):
+        if self.pos >= len(self.tokens):
+            raise ValueError
+        s = self.tokens[self.pos]
+        self.pos += 1
+        return s
+
+    def next_int(self):
+        return int(self.next())
+
+    def next_storage_array(self, trace):
+        model = get_model(trace)
+        length = self.next_int()
+        if length < 0:
+            raise ValueError
+        array = trace.new_array(length)
+        for i in range(length):
+            v = self.next_int()
+            if not model.MIN_VALUE <= v <= model.MAX_VALUE:
+                raise ValueError
+            array[i] = rffi.cast(model.STORAGE_TP, v)
+        return array
+
+
+def _dump_storage_array(tokens, array):
+    tokens.append(str(len(array)))
+    for item in array:
+        tokens.append(str(rffi.cast(lltype.Signed, item)))
+
+
+class TraceCache(object):
+    """The saved traces, kept as the text of their line in the file,
+    indexed by their green key.  Created with MetaInterpGlobalData."""
+
+    def __init__(self, metainterp_sd):
+        self.metainterp_sd = metainterp_sd
+        self.filename = None
+        self.entries = {}
+        self.hits = 0
+
+    def fingerprint(self):
+        return '%s %s' % (MAGIC, self.metainterp_sd.trace_cache_fingerprint)
+
+    def setup_once(self):
+        filename = os.environ.get(ENVIRON_VAR, '')
+        if not filename:
+            return
+        self.filename = filename
+        try:
+            data = _read_file(filename)
+        except OSError:
+            return      # no cache saved so far
+        debug_start("jit-tracecache")
+        lines = data.split('\n')
+        if lines[0] != self.fingerprint():
+            debug_print("ignored, made by another executable:", filename)
+        else:
+            for i in range(1, len(lines)):
+                line = lines[i]
+                j = line.find(' ')
+                if j > 0:
+                    self.entries[line[:j]] = line[j + 1:]
+            debug_print("loaded", len(self.entries), "traces from", filename)
+        debug_stop("jit-tracecache")
+
+    def save(self):
+        """Write all the traces to the file.  Returns how many there are,
+        or -1 if the cache is not enabled or cannot be written."""
+        if self.filename is None:
+            return -1
+        lines = [self.fingerprint()]
+        for key, line in self.entries.items():
+            lines.append(key + ' ' + line)
+        lines.append('')
+        try:
+            _write_file(self.filename, '\n'.join(lines))
+        except OSError:
+            return -1
+        return len(self.entries)
+
+    def _make_key(self, jitdriver_sd, greenkey):
+        parts = [str(jitdriver_sd.index)]
+        for box in greenkey:
+            if isinstance(box, ConstInt):
+                value = box.getint()
+                if not isinstance(value, int):     # symbolics, in tests
+                    return None
+                parts.append('i%d' % value)
+            elif isinstance(box, ConstFloat):
+                parts.append('f' + _float2str(box.getfloatstorage()))
+            else:
+                return None
+        return ','.join(parts)
+
+    # ---------- saving ----------
+
+    def record_loop(self, jitdriver_sd, greenkey, trace, jumpargs):
+        """Called just before compiling a loop from 'trace'.  Returns the
+        key and line to pass to add_loop() if it compiles, or None."""
+        if self.filename is None:
+            return None
+        key = self._make_key(jitdriver_sd, greenkey)
+        if key is None:
+            return None
+        assert isinstance(trace, Trace)
+        if _passes_constant_ints(trace):
+            return None
+        tokens = []
+        tokens.append('T' + ''.join([box.type for box in trace.inputargs]))
+        tokens.append(str(trace._count))
+        tokens.append(str(trace._index))
+        _dump_storage_array(tokens, trace._ops[trace._start:trace._pos])
+        # encoding the jumpargs may add constants to the trace
+        _dump_storage_array(tokens, trace._list_of_boxes(jumpargs))
+        if (trace.tag_overflow or len(trace._refs) > 1 or
+                len(trace._descrs) > 1):
+            return None
+        tokens.append(str(len(trace._bigints)))
+        for value in trace._bigints:
+            if not isinstance(value, int):         # symbolics, in tests
+                return None
+            tokens.append(str(value))
+        tokens.append(str(len(trace._floats)))
+        for floatstorage in trace._floats:
+            tokens.append(_float2str(floatstorage))
+        tokens.append(str(len(trace._snapshots)))
+        for top in trace._snapshots:
+            _dump_storage_array(tokens, top.vable_array)
+            _dump_storage_array(tokens, top.vref_array)
+            frames = []
+            snapshot = top
+            while snapshot is not None:
+                frames.append(snapshot)
+                snapshot = snapshot.prev
+            tokens.append(str(len(frames)))
+            for snapshot in frames:
+                tokens.append(str(snapshot.packed_jitcode_pc))
+                _dump_storage_array(tokens, snapshot.box_array)
+        return [key, ' '.join(tokens)]
+
+    def add_loop(self, recorded):
+        self.entries[recorded[0]] = recorded[1]
+
+    # ---------- loading ----------
+
+    def load_loop(self, jitdriver_sd, greenkey, history):
+        """If there is a saved trace for 'greenkey', replace the trace of
+        'history' with it and return the boxes to close the loop with."""
+        if not self.entries:
+            return None
+        key = self._make_key(jitdriver_sd, greenkey)
+        if key is None:
+            return None
+        line = self.entries.get(key, None)
+        if line is None:
+            return None
+        inputargs = history.inputargs
+        trace = Trace(inputargs, self.metainterp_sd)
+        try:
+            jumpargs = self._load_trace(trace, _Reader(line.split(' ')))
+        except ValueError:
+            jumpargs = None
+        if jumpargs is None:
+            debug_start("jit-tracecache")
+            debug_print("bad trace for", key)
+            debug_stop("jit-tracecache")
+            del self.entries[key]
+            return None
+        history.trace = trace
+        self.hits += 1
+        return jumpargs
+
+    def _load_trace(self, trace, reader):
+        inputargs = trace.inputargs
+        types = reader.next()
+        if types != 'T' + ''.join([box.type for box in inputargs]):
+            return None
+        count = reader.next_int()
+        index = reader.next_int()
+        ops = reader.next_storage_array(trace)
+        trace._ops = trace.new_array(trace._start) + ops + trace.new_array(16)
+        trace._pos = trace._start + len(ops)
+        trace._count = count
+        trace._index = index
+        encoded_jumpargs = reader.next_storage_array(trace)
+        length = reader.next_int()
+        for i in range(length):
+            trace._bigints.append(reader.next_int())
+        length = reader.next_int()
+        for i in range(length):
+            trace._floats.append(_str2float(reader.next()))
+        length = reader.next_int()
+        for i in range(length):
+            vable_array = reader.next_storage_array(trace)
+            vref_array = reader.next_storage_array(trace)
+            nframes = reader.next_int()
+            if nframes < 1:
+                return None
+            packed = reader.next_int()
+            array = reader.next_storage_array(trace)
+            top = TopSnapshot(packed, array, vable_array, vref_array)
+            snapshot = top
+            for j in range(1, nframes):
+                packed = reader.next_int()
+                array = reader.next_storage_array(trace)
+                snapshot.prev = Snapshot(packed, array)
+                snapshot = snapshot.prev
+            trace._snapshots.append(top)
+        if len(encoded_jumpargs) != len(inputargs):
+            return None
+        jumpargs = []
+        for i in range(len(inputargs)):
+            box = self._decode_jumparg(trace, encoded_jumpargs[i], inputargs[i])
+            if box is None:
+                return None
+            jumpargs.append(box)
+        return jumpargs
+
+    def _decode_jumparg(self, trace, encoded, inputarg):
+        # the runtime value of the i-th box at the end of the loop is not
+        # known; take the one of the i-th inputarg, which has the same type
+        tag, v = untag(rffi.cast(lltype.Signed, encoded))
+        if tag == TAGBOX:
+            if not 0 <= v < trace._index:
+                return None
+            return _new_box_like(inputarg, v)
+        elif tag == TAGINT:
+            box = ConstInt(v + SMALL_INT_START)
+        elif tag == TAGCONSTOTHER:
+            if v & 1:
+                if not 0 <= (v >> 1) < len(trace._floats):
+                    return None
+                box = ConstFloat(trace._floats[v >> 1])
+            else:
+                if not 0 <= (v >> 1) < len(trace._bigints):
+                    return None
+                box = ConstInt(trace._bigints[v >> 1])
+        elif tag == TAGCONSTPTR and v == 0:
+            box = ConstPtr(lltype.nullptr(llmemory.GCREF.TO))
+        else:
+            return None
+        if box.type != inputarg.type:
+            return None
+        return box
+
+
+def _read_file(filename):
+    fd = os.open(filename, os.O_RDONLY, 0)
+    try:
+        chunks = []
+        while True:
+            data = os.read(fd, 65536)
+            if not data:
+                break
+            chunks.append(data)
+    finally:
+        os.close(fd)
+    return ''.join(chunks)
+
+def _write_file(filename, data):
+    # write to a temporary file and rename it, in case several processes
+    # save the cache at the same time
+    tmpname = '%s.%d' % (filename, os.getpid())
+    fd = os.open(tmpname, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0666)
+    try:
+        while data:
+            count = os.write(fd, data)
+            data = data[count:]
+    finally:
+        os.close(fd)
+    os.rename(tmpname, filename)
@@ -209,6 +209,7 @@ def reset_jit():
     """Helper for some tests (see micronumpy/test/test_zjit.py)"""
     reset_stats()
     pyjitpl._warmrunnerdesc.memory_manager.alive_loops.clear()
+    pyjitpl._warmrunnerdesc.memory_manager.total_code_size = 0
     pyjitpl._warmrunnerdesc.jitcounter._clear_all()
 
 def get_translator():
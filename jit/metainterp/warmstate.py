@@ -137,6 +137,7 @@ JC_TRACING         = 0x01
 JC_DONT_TRACE_HERE = 0x02
 JC_TEMPORARY       = 0x04
 JC_TRACING_OCCURRED= 0x08
+JC_COMPILE_PENDING = 0x10
 
 class BaseJitCell(object):
     """Subclasses of BaseJitCell are used in tandem with the single
@@ -183,9 +184,16 @@ class BaseJitCell(object):
         this particular function.  (We only set this flag when aborting
         due to a trace too long, so we use the same flag as a hint to
         also mean "please trace from here as soon as possible".)
+
+        JC_COMPILE_PENDING: the loop from this greenkey was traced with
+        the 'defer_compile' parameter, and 'pending_loop' is the
+        MetaInterp that will compile it.  This is done by
+        MetaInterpStaticData.compile_pending_loops(), or when the
+        JitCounter reaches the threshold again.
     """
     flags = 0     # JC_xxx flags
     wref_procedure_token = None
+    pending_loop = None
     next = None
 
     def get_procedure_token(self):
@@ -209,10 +217,18 @@ class BaseJitCell(object):
         assert token is not None
         return weakref.ref(token)
 
+    def compile_pending_loop(self):
+        metainterp = self.pending_loop
+        if metainterp is None:
+            return False
+        self.pending_loop = None
+        self.flags &= ~JC_COMPILE_PENDING
+        return metainterp.compile_pending_loop()
+
     def should_remove_jitcell(self):
         if self.get_procedure_token() is not None:
             return False    # don't remove JitCells with a procedure_token
-        if self.flags & JC_TRACING:
+        if self.flags & (JC_TRACING | JC_COMPILE_PENDING):
             return False    # don't remove JitCells that are being traced
         if self.flags & JC_DONT_TRACE_HERE:
             # if we have this flag, and we *had* a procedure_token but
@@ -225,6 +241,7 @@ class BaseJitCell(object):
 
 
 class WarmEnterState(object):
+    defer_compile = False
 
     def __init__(self, warmrunnerdesc, jitdriver_sd):
         "NOT_RPYTHON"
@@ -288,6 +305,12 @@ class WarmEnterState(object):
             self.warmrunnerdesc.memory_manager is not None):   # all for tests
             self.warmrunnerdesc.memory_manager.set_max_age(value)
 
+    def set_param_code_budget(self, value):
+        # note: it's a global parameter, not a per-jitdriver one
+        if self.warmrunnerdesc:
+            if self.warmrunnerdesc.memory_manager:
+                self.warmrunnerdesc.memory_manager.set_code_budget(value)
+
     def set_param_retrace_limit(self, value):
         if self.warmrunnerdesc:
             if self.warmrunnerdesc.memory_manager:
@@ -317,6 +340,9 @@ class WarmEnterState(object):
     def set_param_vec_cost(self, ivalue):
         self.vec_cost = ivalue
 
+    def set_param_defer_compile(self, value):
+        self.defer_compile = bool(value)
+
     def disable_noninlinable_function(self, greenkey):
         cell = self.JitCell.ensure_jit_cell_at_key(greenkey)
         cell.flags |= JC_DONT_TRACE_HERE
@@ -325,6 +351,13 @@ class WarmEnterState(object):
         debug_print("disabled inlining", loc)
         debug_stop("jit-disableinlining")
 
+    def defer_loop_compilation(self, greenkey, metainterp):
+        cell = self.JitCell.ensure_jit_cell_at_key(greenkey)
+        cell.flags |= JC_COMPILE_PENDING
+        cell.pending_loop = metainterp
+        globaldata = self.warmrunnerdesc.metainterp_sd.globaldata
+        globaldata.pending_loop_cells.append(cell)
+
     def attach_procedure_to_interp(self, greenkey, procedure_token):
         cell = self.JitCell.ensure_jit_cell_at_key(greenkey)
         old_token = cell.get_procedure_token()
@@ -455,11 +488,17 @@ class WarmEnterState(object):
 
             # Here, we have found 'cell'.
             #
-            if cell.flags & (JC_TRACING | JC_TEMPORARY):
+            if cell.flags & (JC_TRACING | JC_TEMPORARY | JC_COMPILE_PENDING):
                 if cell.flags & JC_TRACING:
                     # tracing already happening in some outer invocation of
                     # this function. don't trace a second time.
                     return
+                if cell.flags & JC_COMPILE_PENDING:
+                    # traced, but not compiled so far.  If it is still hot
+                    # when the counter fires again, compile it now
+                    if jitcounter.tick(hash, increment_threshold):
+                        cell.compile_pending_loop()
+                    return
                 # attached by compile_tmp_callback().  count normally
                 if jitcounter.tick(hash, increment_threshold):
                     bound_reached(hash, cell, *args)
@@ -27,6 +27,8 @@ REGEXES = [
     (('nvirtuals',), '^nvirtuals:\s+(\d+)$'),
     (('nvholes',), '^nvholes:\s+(\d+)$'),
     (('nvreused',), '^nvreused:\s+(\d+)$'),
+    (('resumedata_bytes',), '^resume data bytes:\s+(\d+)$'),
+    (('resumedata_saved',), '^resume data saved:\s+(\d+)$'),
     (('vecopt_tried',), '^vecopt tried:\s+(\d+)$'),
     (('vecopt_success',), '^vecopt success:\s+(\d+)$'),
     (('total_compiled_loops',),   '^Total # of loops:\s+(\d+)$'),
@@ -60,6 +62,8 @@ class OutputInfo(object):
     nvirtuals = 0
     nvholes = 0
     nvreused = 0
+    resumedata_bytes = 0
+    resumedata_saved = 0
     vecopt_tried = 0
     vecopt_success = 0
 
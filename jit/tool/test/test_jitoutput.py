@@ -62,6 +62,8 @@ abort: force quasi-immut: 3
 nvirtuals:              13
 nvholes:                14
 nvreused:               15
+resume data bytes:      2000
+resume data saved:      700
 vecopt tried:           12
 vecopt success:         4
 Total # of loops:       100
@@ -91,5 +93,7 @@ def test_parse():
     assert info.nvirtuals == 13
     assert info.nvholes == 14
     assert info.nvreused == 15
+    assert info.resumedata_bytes == 2000
+    assert info.resumedata_saved == 700
     assert info.vecopt_tried == 12
     assert info.vecopt_success == 4
@@ -137,6 +137,14 @@ def stats_asmmemmgr_allocated(warmrunnerdesc):
 def stats_asmmemmgr_used(warmrunnerdesc):
     return warmrunnerdesc.metainterp_sd.cpu.asmmemmgr.get_stats()[1]
 
+@register_helper(annmodel.SomeInteger())
+def stats_save_trace_cache(warmrunnerdesc):
+    return warmrunnerdesc.metainterp_sd.globaldata.trace_cache.save()
+
+@register_helper(annmodel.SomeInteger())
+def stats_compile_pending_loops(warmrunnerdesc):
+    return warmrunnerdesc.metainterp_sd.compile_pending_loops()
+
 # ---------------------- jitcell interface ----------------------
 
 def _new_hook(name, resulttype):
@@ -1,4 +1,5 @@
 import weakref
+import copy_reg
 from types import MethodType, NoneType
 
 from rpython.annotator.bookkeeper import analyzer_for, immutablevalue
@@ -95,6 +96,14 @@ class frozendict(dict):
         return hash(tuple(items))
 
 
+def _rebuild_lowleveltype(cls):
+    self = object.__new__(cls)
+    # until __setstate__() is called the type can already be hashed, as a
+    # key in the objects that refer to it; give it a hash that does not
+    # look at the missing fields.  __setstate__() drops it again
+    LowLevelType._LowLevelType__cached_hash.__set__(self, hash(cls))
+    return self
+
 class LowLevelType(object):
     # the following line prevents '__cached_hash' to be in the __dict__ of
     # the instance, which is needed for __eq__() and __hash__() to work.
@@ -133,6 +142,18 @@ class LowLevelType(object):
             raise TypeError
         return value
 
+    def __reduce__(self):
+        # without the cached hash, which depends on the id of the classes
+        return (_rebuild_lowleveltype, (self.__class__,), self.__dict__)
+
+    def __setstate__(self, state):
+        # drop the provisional hash given by _rebuild_lowleveltype()
+        try:
+            del self.__cached_hash
+        except AttributeError:
+            pass
+        self.__dict__.update(state)
+
     def __hash__(self, TLS=TLS):
         # cannot use saferecursive() -- see test_lltype.test_hash().
         # NB. the __cached_hash should neither be used nor updated
@@ -1416,6 +1437,19 @@ class _ptr(_abstract_ptr):
         assert not self._weak
         self._setobj(other._obj, other._solid)
 
+    def __reduce__(self):
+        # the types may not be fully loaded yet when __setstate__() is called
+        return (_rebuild_ptr, (), (self._TYPE, self._T, self._weak,
+                                   self._solid, self._obj0))
+
+    def __setstate__(self, state):
+        TYPE, T, weak, solid, obj0 = state
+        self._set_TYPE(TYPE)
+        self._set_T(T)
+        self._set_weak(weak)
+        self._set_solid(solid)
+        self._set_obj0(obj0)
+
     def _cast_to(self, PTRTYPE):
         CURTYPE = self._TYPE
         down_or_up = castable(PTRTYPE, CURTYPE)
@@ -1581,6 +1615,9 @@ class SomePtr(SomeObject):
         return result
 
 
+def _rebuild_ptr():
+    return _ptr.__new__(_ptr)
+
 class _interior_ptr(_abstract_ptr):
     __slots__ = ('_parent', '_offsets')
     def _set_parent(self, _parent):
@@ -1646,6 +1683,28 @@ class _container(object):
     def _was_freed(self):
         return False
 
+    def __reduce__(self):
+        # the __new__() of the subclasses want the TYPE, and the slots are
+        # set with object.__setattr__() like in __init__()
+        slots = {}
+        for name in copy_reg._slotnames(self.__class__):
+            try:
+                slots[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        return (_rebuild_container, (self.__class__,),
+                (getattr(self, '__dict__', None), slots))
+
+    def __setstate__(self, state):
+        dict, slots = state
+        if dict:
+            self.__dict__.update(dict)
+        for name, value in slots.items():
+            object.__setattr__(self, name, value)
+
+def _rebuild_container(cls):
+    return object.__new__(cls)
+
 class _parentable(_container):
     _kind = "?"
 
@@ -306,6 +306,14 @@ def test_hash():
     assert S == S1
     assert hash(S1) == hash(S)
 
+def test_hash_while_unpickling():
+    S = Struct('S', ('x', Signed))
+    S2 = lltype._rebuild_lowleveltype(Struct)
+    hash(S2)   # the fields are not there yet; must not recurse
+    S2.__setstate__(S.__reduce__()[2])
+    assert S2 == S
+    assert hash(S2) == hash(S)
+
 def test_array_with_non_container_elements():
     As = GcArray(Signed)
     a = malloc(As, 3)
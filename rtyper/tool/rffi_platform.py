@@ -3,6 +3,7 @@
 import os
 import sys
 import struct
+import cPickle as pickle
 import py
 from rpython.rtyper.lltypesystem import lltype
 from rpython.rtyper.lltypesystem import rffi
@@ -149,8 +150,10 @@ class ConfigResult:
 class _CWriter(object):
     """ A simple class which aggregates config parts
     """
-    def __init__(self, eci):
-        self.path = uniquefilepath()
+    def __init__(self, eci, path=None):
+        if path is None:
+            path = uniquefilepath()
+        self.path = path
         self.f = self.path.open("w")
         self.eci = eci
 
@@ -215,16 +218,112 @@ def configure(CConfig, ignore_errors=False):
         for name, result in zip(entries, results):
             res[name] = result
 
+    questions = []
     for key in dir(CConfig):
         value = getattr(CConfig, key)
         if isinstance(value, CConfigSingleEntry):
-            writer = _CWriter(eci)
-            writer.write_header()
-            res[key] = value.question(writer.ask_gcc)
+            questions.append((key, value))
+    if questions:
+        res.update(ask_questions(questions, eci))
 
     return res
 
 
+def _answer_question(entry, eci, path):
+    writer = _CWriter(eci, path)
+    writer.write_header()
+    try:
+        return True, entry.question(writer.ask_gcc)
+    except CompilationError as e:
+        return False, (e.out, e.err)     # CompilationError can't be pickled
+
+def _answer_forked(entry, eci, path):
+    """Start answering in a child process, return (pid, fd) where the
+    answer can be read."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            os.close(read_fd)
+            # the compiler is started through a helper process, don't share
+            # the pipes to the one of the parent
+            from rpython.tool import runsubprocess
+            if hasattr(runsubprocess, 'spawn_subprocess'):
+                runsubprocess.spawn_subprocess()
+            try:
+                answer = _answer_question(entry, eci, path)
+            except Exception:
+                import traceback
+                answer = None, traceback.format_exc()
+            data = pickle.dumps(answer)
+            while data:
+                data = data[os.write(write_fd, data):]
+            status = 0
+        finally:
+            os._exit(status)
+    os.close(write_fd)
+    return pid, read_fd
+
+def _read_answer(pid, read_fd):
+    f = os.fdopen(read_fd, 'rb')
+    try:
+        data = f.read()
+    finally:
+        f.close()
+    os.waitpid(pid, 0)
+    if not data:
+        raise Exception("configure probe process failed")
+    return pickle.loads(data)
+
+def ask_questions(questions, eci):
+    """Answer the CConfigSingleEntries, which each need a compilation of
+    their own.  First all the Has() probes are compiled together: if that
+    works, a single compilation answers all of them.  The remaining ones
+    are compiled in parallel by forked processes.  (Not with a
+    multiprocessing.Pool: its threads would wait forever for the import
+    lock, because this usually runs while a module is imported.)
+    """
+    res = {}
+    has = [(key, entry) for key, entry in questions if isinstance(entry, Has)]
+    if len(has) > 1:
+        writer = _CWriter(eci)
+        writer.write_header()
+        try:
+            writer.ask_gcc('\n'.join([entry.probe() for key, entry in has]))
+        except CompilationError:
+            pass      # at least one is missing, find out which one
+        else:
+            for key, entry in has:
+                res[key] = True
+            questions = [(key, entry) for key, entry in questions
+                         if key not in res]
+    # the file names are picked here, the children would share the counter
+    pending = [(entry, eci, uniquefilepath()) for key, entry in questions]
+    answers = []
+    if len(pending) > 1 and hasattr(os, 'fork'):
+        nprocesses = max_probe_processes()
+        for i in range(0, len(pending), nprocesses):
+            children = [_answer_forked(*args)
+                        for args in pending[i:i + nprocesses]]
+            answers.extend([_read_answer(*child) for child in children])
+    else:
+        answers = [_answer_question(*args) for args in pending]
+    for (key, entry), (ok, answer) in zip(questions, answers):
+        if ok is None:
+            raise Exception("in a configure probe process:\n%s" % (answer,))
+        if not ok:
+            raise CompilationError(*answer)
+        res[key] = answer
+    return res
+
+def max_probe_processes():
+    try:
+        return max(os.sysconf('SC_NPROCESSORS_ONLN'), 1)
+    except (ValueError, OSError, AttributeError):
+        return 1
+
+
 def configure_entries(entries, eci, ignore_errors=False):
     writer = _CWriter(eci)
     writer.write_header()
@@ -543,9 +642,12 @@ class Has(CConfigSingleEntry):
     def __init__(self, name):
         self.name = name
 
+    def probe(self):
+        return '(void)' + self.name + ';'
+
     def question(self, ask_gcc):
         try:
-            ask_gcc('(void)' + self.name + ';')
+            ask_gcc(self.probe())
             return True
         except CompilationError:
             return False
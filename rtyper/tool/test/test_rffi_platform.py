@@ -313,6 +313,30 @@ def test_has_0006():
     """missing include"""
     assert not rffi_platform.has("pow", "", libraries=["m"])
 
+def test_has_several():
+    class CConfig:
+        _compilation_info_ = rffi_platform.eci_from_header(
+            "int x = 3; int y = 4;")
+        HAS_X = rffi_platform.Has("x")
+        HAS_Y = rffi_platform.Has("y")
+        HAS_Z = rffi_platform.Has("z")
+        HAS_W = rffi_platform.Has("w")
+        WORKS = rffi_platform.Works()
+    res = rffi_platform.configure(CConfig)
+    assert res == {'HAS_X': True, 'HAS_Y': True, 'HAS_Z': False,
+                   'HAS_W': False, 'WORKS': None}
+    del CConfig.HAS_Z, CConfig.HAS_W
+    res = rffi_platform.configure(CConfig)
+    assert res == {'HAS_X': True, 'HAS_Y': True, 'WORKS': None}
+
+def test_works_fails():
+    class CConfig:
+        _compilation_info_ = rffi_platform.eci_from_header(
+            "#error does not work")
+        HAS_X = rffi_platform.Has("x")
+        WORKS = rffi_platform.Works()
+    py.test.raises(rffi_platform.CompilationError,
+                   rffi_platform.configure, CConfig)
 
 def test_verify_eci():
     eci = ExternalCompilationInfo()
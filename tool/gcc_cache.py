@@ -1,43 +1,186 @@
 from hashlib import md5
 import py, os, sys
+import struct, marshal
 
-def cache_file_path(c_files, eci, cachename):
-    "Builds a filename to cache compilation data"
+# the digests of the C files, as long as they are not modified
+_file_digests = {}    # path -> (fingerprint, digest)
+_eci_digests = {}     # eci -> digest
+
+def file_digest(c_file):
+    path = str(c_file)
+    st = os.stat(path)
+    fingerprint = (st.st_mtime, st.st_ctime, st.st_size, st.st_ino)
+    try:
+        oldfingerprint, digest = _file_digests[path]
+        if oldfingerprint == fingerprint:
+            return digest
+    except KeyError:
+        pass
+    digest = md5(c_file.read()).digest()
+    _file_digests[path] = fingerprint, digest
+    return digest
+
+def eci_digest(eci):
+    try:
+        return _eci_digests[eci]
+    except KeyError:
+        digest = _eci_digests[eci] = md5(repr(eci)).digest()
+        return digest
+    except TypeError:
+        # built with lists instead of tuples, not hashable
+        return md5(repr(eci)).digest()
+
+def cache_key(c_files, eci, cachename):
+    "Builds the key under which compilation data is cached"
     # Import 'platform' every time, the compiler may have been changed
     from rpython.translator.platform import platform
+    m = md5(platform.key())
+    m.update(eci_digest(eci))
+    for c_file in c_files:
+        m.update(file_digest(c_file))
+    return '%s/%s' % (cachename, m.hexdigest())
+
+
+RECORD_MAGIC = 'GCC1'
+MAX_RECORD_SIZE = 16 * 1024 * 1024
+# rewrite the file when there are more than this many records, and most
+# of them are deleted, replaced or broken
+COMPACT_MIN_RECORDS = 1024
+
+class CacheStore(object):
+    """All the cached data in a single append-only file.  A record is the
+    key and the value, marshalled.  The file is indexed in memory when it
+    is read, and read again from where it stopped when a key is missing,
+    to find the records that other processes appended in the meantime.
+    Broken records are skipped.  When the records that are no longer
+    used make up most of the file, it is rewritten with only the others;
+    the other processes notice that the file changed and read it again.
+    """
+    def __init__(self, path):
+        self.path = str(path)
+        self.index = {}
+        self.offset = 0
+        self.inode = None
+        self.nrecords = 0     # read so far, including the unused ones
+
+    def _read_new_records(self):
+        try:
+            f = open(self.path, 'rb')
+        except IOError:
+            return
+        try:
+            st = os.fstat(f.fileno())
+            if st.st_ino != self.inode or st.st_size < self.offset:
+                # a new file, or rewritten by compact()
+                self.index.clear()
+                self.offset = 0
+                self.inode = st.st_ino
+                self.nrecords = 0
+            f.seek(self.offset)
+            data = f.read()
+        finally:
+            f.close()
+        pos = 0
+        while pos + 8 <= len(data):
+            magic, size = struct.unpack('<4sI', data[pos:pos + 8])
+            end = pos + 8 + size
+            if (magic == RECORD_MAGIC and size <= MAX_RECORD_SIZE and
+                    end > len(data)):
+                break         # being appended
+            self.nrecords += 1
+            try:
+                if magic != RECORD_MAGIC or size > MAX_RECORD_SIZE:
+                    raise ValueError
+                key, value = marshal.loads(data[pos + 8:end])
+            except (ValueError, EOFError, TypeError):
+                # a broken record, e.g. from a full disk: skip to the
+                # next one
+                pos = data.find(RECORD_MAGIC, pos + 1)
+                if pos < 0:
+                    pos = len(data)
+                continue
+            if value is None:
+                self.index.pop(key, None)
+            else:
+                self.index[key] = value
+            pos = end
+        self.offset += pos
+
+    def get(self, key):
+        if key not in self.index:
+            self._read_new_records()
+        return self.index.get(key)
+
+    def put(self, key, value):
+        """Store 'value', or forget about 'key' if it is None."""
+        # a single write() in append mode, so that the records of
+        # concurrent processes are not mixed
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0666)
+        try:
+            os.write(fd, _record(key, value))
+        finally:
+            os.close(fd)
+        if value is None:
+            self.index.pop(key, None)
+        else:
+            self.index[key] = value
+        if (self.nrecords > COMPACT_MIN_RECORDS and
+                self.nrecords > 2 * len(self.index)):
+            self.compact()
+
+    def compact(self):
+        """Rewrite the file with only the records in use.  A record that
+        another process appends in the meantime can be lost, which only
+        means that its value is computed again."""
+        self._read_new_records()
+        items = sorted(self.index.items())
+        data = ''.join([_record(key, value) for key, value in items])
+        try_atomic_write(self.path, data)
+        self.inode = os.stat(self.path).st_ino
+        self.offset = len(data)
+        self.nrecords = len(items)
+
+def _record(key, value):
+    record = marshal.dumps((key, value))
+    return struct.pack('<4sI', RECORD_MAGIC, len(record)) + record
+
+_stores = {}
+
+def get_store():
     from rpython.config.translationoption import CACHE_DIR
-    cache_root = py.path.local(CACHE_DIR).ensure(dir=1)
-    cache_dir = cache_root.join(cachename).ensure(dir=1)
-    filecontents = [c_file.read() for c_file in c_files]
-    key = repr((filecontents, eci, platform.key()))
-    hash = md5(key).hexdigest()
-    return cache_dir.join(hash)
+    try:
+        return _stores[CACHE_DIR]
+    except KeyError:
+        py.path.local(CACHE_DIR).ensure(dir=1)
+        store = _stores[CACHE_DIR] = CacheStore(
+            os.path.join(CACHE_DIR, 'gcc_cache.store'))
+        return store
 
 def build_executable_cache(c_files, eci, ignore_errors=False):
     "Builds and run a program; caches the result"
     # Import 'platform' every time, the compiler may have been changed
     from rpython.translator.platform import platform
-    path = cache_file_path(c_files, eci, 'build_executable_cache')
+    key = cache_key(c_files, eci, 'build_executable_cache')
+    result = get_store().get(key)
+    if result is not None:
+        return result
+    _previous = platform.log_errors
     try:
-        return path.read()
-    except py.error.Error:
-        _previous = platform.log_errors
-        try:
-            if ignore_errors:
-                platform.log_errors = False
-            result = platform.execute(platform.compile(c_files, eci))
-            if result.err:
-                sys.stderr.write(result.err)
-        finally:
-            if ignore_errors:
-                del platform.log_errors
-            # ^^^remove from the instance --- needed so that it can
-            # compare equal to another instance without it
-            if platform.log_errors != _previous:
-                platform.log_errors = _previous
-        if not result.err:
-            try_atomic_write(path, result.out)
-        return result.out
+        if ignore_errors:
+            platform.log_errors = False
+        result = platform.execute(platform.compile(c_files, eci))
+        if result.err:
+            sys.stderr.write(result.err)
+    finally:
+        if ignore_errors:
+            del platform.log_errors
+        # ^^^remove from the instance --- needed so that it can
+        # compare equal to another instance without it
+        if platform.log_errors != _previous:
+            platform.log_errors = _previous
+    if not result.err:
+        get_store().put(key, result.out)
+    return result.out
 
 def try_atomic_write(path, data):
     path = str(path)
@@ -57,13 +200,9 @@ def try_compile_cache(c_files, eci):
     "Try to compile a program.  If it works, caches this fact."
     # Import 'platform' every time, the compiler may have been changed
     from rpython.translator.platform import platform
-    path = cache_file_path(c_files, eci, 'try_compile_cache')
-    try:
-        data = path.read()
-        if data == 'True':
-            return True
-    except py.error.Error:
-        pass
+    key = cache_key(c_files, eci, 'try_compile_cache')
+    if get_store().get(key) == 'True':
+        return True
     #
     _previous = platform.log_errors
     try:
@@ -76,5 +215,5 @@ def try_compile_cache(c_files, eci):
         # compare equal to another instance without it
         if platform.log_errors != _previous:
             platform.log_errors = _previous
-    path.write('True')
+    get_store().put(key, 'True')
     return True
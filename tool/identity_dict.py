@@ -33,6 +33,10 @@ class IdentityDictPurePython(MutableMapping):
     def __contains__(self, arg):
         return id(arg) in self._dict
 
+    def __reduce__(self):
+        # keyed by the ids, which are not the same in another process
+        return (type(self), (), None, None, self.iteritems())
+
     def copy(self):
         d = type(self)()
         d.update(self.iteritems())
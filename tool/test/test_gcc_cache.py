@@ -5,7 +5,8 @@ from rpython.tool.udir import udir
 from rpython.translator.tool.cbuild import ExternalCompilationInfo
 from rpython.translator.platform import CompilationError
 from rpython.tool.gcc_cache import (
-    cache_file_path, build_executable_cache, try_compile_cache)
+    cache_key, get_store, build_executable_cache, try_compile_cache,
+    CacheStore)
 
 localudir = udir.join('test_gcc_cache').ensure(dir=1)
 
@@ -26,9 +27,7 @@ def test_gcc_exec():
     dir2.join('test_gcc_exec.h').write('#define ANSWER 42\n')
     eci = ExternalCompilationInfo(include_dirs=[str(dir1)])
     # remove cache
-    path = cache_file_path([f], eci, 'build_executable_cache')
-    if path.check():
-        path.remove()
+    get_store().put(cache_key([f], eci, 'build_executable_cache'), None)
     res = build_executable_cache([f], eci)
     assert res == "3\n"
     assert build_executable_cache([f], eci) == "3\n"
@@ -57,9 +56,7 @@ def test_gcc_ask():
     dir2.join('test_gcc_ask.h').write('#error boom\n')
     eci = ExternalCompilationInfo(include_dirs=[str(dir1)])
     # remove cache
-    path = cache_file_path([f], eci, 'try_compile_cache')
-    if path.check():
-        path.remove()
+    get_store().put(cache_key([f], eci, 'try_compile_cache'), None)
     assert try_compile_cache([f], eci)
     assert try_compile_cache([f], eci)
     assert build_executable_cache([f], eci) == "hello\n"
@@ -114,3 +111,80 @@ def test_execute_code_show_runtime_error():
             sys.stderr = oldstderr
         assert 'hello' in capture.getvalue()
         assert output == ''
+
+def test_cache_key_follows_file_changes():
+    f = localudir.join('key.c')
+    f.write("int main() { return 0; }\n")
+    eci = ExternalCompilationInfo()
+    key1 = cache_key([f], eci, 'try_compile_cache')
+    assert cache_key([f], eci, 'try_compile_cache') == key1
+    f.write("int main() { return 1; }\n")
+    key2 = cache_key([f], eci, 'try_compile_cache')
+    assert key2 != key1
+    eci2 = ExternalCompilationInfo(include_dirs=[str(localudir)])
+    assert cache_key([f], eci2, 'try_compile_cache') != key2
+    assert cache_key([f], eci, 'build_executable_cache') != key2
+
+def test_store():
+    path = localudir.join('test_store')
+    if path.check():
+        path.remove()
+    store1 = CacheStore(path)
+    store2 = CacheStore(path)
+    assert store1.get('a') is None
+    store1.put('a', 'value of a')
+    store1.put('b', 'value of b')
+    assert store1.get('a') == 'value of a'
+    # records appended by another process are found
+    assert store2.get('b') == 'value of b'
+    store2.put('a', None)
+    store2.put('c', 'value of c')
+    assert store1.get('c') == 'value of c'
+    assert CacheStore(path).get('a') is None
+    # a record that is still being appended is read later
+    f = path.open('ab')
+    f.write('GCC1')
+    f.close()
+    store3 = CacheStore(path)
+    assert store3.get('b') == 'value of b'
+    assert store3.get('d') is None
+
+def test_store_broken_record():
+    path = localudir.join('test_store_broken_record')
+    if path.check():
+        path.remove()
+    store1 = CacheStore(path)
+    store1.put('a', 'value of a')
+    f = path.open('ab')
+    f.write('garbage from a full disk')
+    f.close()
+    store1.put('b', 'value of b')
+    store2 = CacheStore(path)
+    assert store2.get('a') == 'value of a'
+    assert store2.get('b') == 'value of b'
+    # the records after the broken one are still found
+    store1.put('c', 'value of c')
+    assert store2.get('c') == 'value of c'
+
+def test_store_compact(monkeypatch):
+    from rpython.tool import gcc_cache
+    monkeypatch.setattr(gcc_cache, 'COMPACT_MIN_RECORDS', 10)
+    path = localudir.join('test_store_compact')
+    if path.check():
+        path.remove()
+    store1 = CacheStore(path)
+    store2 = CacheStore(path)
+    store1.put('keep', 'kept value')
+    assert store2.get('keep') == 'kept value'
+    for i in range(20):
+        store1.put('x', 'value %d' % i)
+        store1.get('missing')      # reads the records back
+    # without compacting, the file would contain 21 records
+    assert path.size() < 15 * len(gcc_cache._record('x', 'value 19'))
+    assert store1.get('x') == 'value 19'
+    # the other store notices that the file was rewritten
+    store1.put('y', 'value of y')
+    assert store2.get('y') == 'value of y'
+    assert store2.get('x') == 'value 19'
+    assert store2.get('keep') == 'kept value'
+
@@ -1,6 +1,7 @@
 import contextlib
 import py
 import sys, os
+import zlib
 from rpython.rlib import exports
 from rpython.rtyper.lltypesystem.lltype import getfunctionptr
 from rpython.rtyper.lltypesystem import lltype
@@ -209,7 +210,8 @@ class CBuilder(object):
                 defines['PYPY_MAIN_FUNCTION'] = "pypy_main_startup"
         self.eci, cfile, extra, headers_to_precompile = \
                 gen_source(db, modulename, targetdir,
-                           self.eci, defines=defines, split=self.split)
+                           self.eci, defines=defines, split=self.split,
+                           stable=self.config.translation.stable_sources)
         self.c_source_filename = py.path.local(cfile)
         self.extrafiles = self.eventually_copy(extra)
         self.gen_makefile(targetdir, exe_name=exe_name,
@@ -503,6 +505,12 @@ class CStandaloneBuilder(CBuilder):
             mk.rule('lldebug0','', '$(MAKE) CFLAGS="$(DEBUGFLAGS) -O0 -DMAX_STACK_SIZE=8192000 -DRPY_ASSERT -DRPY_LL_ASSERT" debug_target'),
             mk.rule('clean', '', 'rm -f $(OBJECTS) $(DEFAULT_TARGET) $(TARGET) $(GCMAPFILES) $(ASMFILES) *.gc?? ../module_cache/*.gc??')
             mk.rule('clean_noprof', '', 'rm -f $(OBJECTS) $(DEFAULT_TARGET) $(TARGET) $(GCMAPFILES) $(ASMFILES)')
+            if self.config.translation.stable_sources:
+                # let the compiler record the headers of every object, so
+                # that make also rebuilds the objects whose headers changed
+                mk.definition('CFLAGSEXTRA',
+                              list(self.eci.compile_extra) + ['-MMD', '-MP'])
+                mk.include('$(OBJECTS:.o=.d)')
 
         #XXX: this conditional part is not tested at all
         if self.config.translation.gcrootfinder == 'asmgcc':
@@ -581,11 +589,38 @@ class CStandaloneBuilder(CBuilder):
 
 SPLIT_CRITERIA = 65535 # support VC++ 7.2
 #SPLIT_CRITERIA = 32767 # enable to support VC++ 6.0
+STABLE_SPLIT_NODES = 256  # average number of functions per file with
+                          # translation.stable_sources
 
 MARKER = '/*/*/' # provide an easy way to split after generating
 
+class WriteIfChanged(object):
+    """File-like object that keeps the content in memory and only writes
+    it out on close() if it differs from what is already on disk, so that
+    make (or ccache) only rebuilds the files that really changed."""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.name = str(filepath)
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(data)
+
+    def close(self):
+        data = ''.join(self.chunks)
+        if self.filepath.check(file=1) and self.filepath.read() == data:
+            return
+        self.filepath.write(data)
+
+def open_source_file(filepath, stable):
+    if stable:
+        return WriteIfChanged(filepath)
+    return filepath.open('w')
+
 class SourceGenerator:
     one_source_file = True
+    stable = False
 
     def __init__(self, database):
         self.database = database
@@ -594,7 +629,7 @@ class SourceGenerator:
         self.path = None
         self.namespace = NameManager()
 
-    def set_strategy(self, path, split=True):
+    def set_strategy(self, path, split=True, stable=False):
         all_nodes = list(self.database.globalcontainers())
         # split off non-function nodes. We don't try to optimize these, yet.
         funcnodes = []
@@ -606,6 +641,7 @@ class SourceGenerator:
                 othernodes.append(node)
         if split:
             self.one_source_file = False
+        self.stable = stable
         self.funcnodes = funcnodes
         self.othernodes = othernodes
         self.path = path
@@ -621,7 +657,7 @@ class SourceGenerator:
             self.extrafiles.append(filepath)
         if name.endswith('.h'):
             self.headers_to_precompile.append(filepath)
-        return filepath.open('w')
+        return open_source_file(filepath, self.stable)
 
     def getextrafiles(self):
         return self.extrafiles
@@ -674,6 +710,12 @@ class SourceGenerator:
             else:
                 nodes_by_base_cfile[c_filename] = [node]
 
+        if self.stable:
+            for item in self.splitnodesstable(nodes_by_base_cfile, nextra,
+                                              nbetween, split_criteria):
+                yield item
+            return
+
         # produce a sequence of nodes, grouped into files
         # which have no more than SPLIT_CRITERIA lines
         for basecname in sorted(nodes_by_base_cfile):
@@ -696,6 +738,39 @@ class SourceGenerator:
             while not done[0]:
                 yield self.uniquecname(basecname), subiter()
 
+    def splitnodesstable(self, nodes_by_base_cfile, nextra, nbetween,
+                         split_criteria):
+        # Deterministic variant of the above.  The nodes of every base file
+        # are sorted by C name and a new file starts at every node whose
+        # name hashes to 0 modulo STABLE_SPLIT_NODES, independently of how
+        # big the base file is.  Adding, removing or changing a function
+        # then only touches the file that contains it, and at most splits
+        # or merges it with its neighbour.  A file that would still grow
+        # past split_criteria is cut there as well, which only shifts the
+        # nodes up to the next hash boundary.
+        for basecname in sorted(nodes_by_base_cfile):
+            nodes = sorted(nodes_by_base_cfile[basecname],
+                           key=lambda node: node.name)
+            name = basecname
+            chunk = []
+            used = nextra
+            for node in nodes:
+                impl = '\n'.join(list(node.implementation())).split('\n')
+                if not impl:
+                    continue
+                cost = len(impl) + nbetween
+                key = zlib.crc32(node.name) & 0xffffffff
+                if chunk and (key % STABLE_SPLIT_NODES == 0 or
+                              used + cost > split_criteria):
+                    yield self.uniquecname(name), iter(chunk)
+                    name = '%s_%08x.c' % (basecname[:-2], key)
+                    chunk = []
+                    used = nextra
+                chunk.append((node, impl))
+                used += cost
+            if chunk:
+                yield self.uniquecname(name), iter(chunk)
+
     @contextlib.contextmanager
     def write_on_included_file(self, f, name):
         fi = self.makefile(name)
@@ -918,14 +993,14 @@ def add_extra_files(database, eci):
 
 
 def gen_source(database, modulename, targetdir,
-               eci, defines={}, split=False):
+               eci, defines={}, split=False, stable=False):
     if isinstance(targetdir, str):
         targetdir = py.path.local(targetdir)
 
     filename = targetdir.join(modulename + '.c')
-    f = filename.open('w')
+    f = open_source_file(filename, stable)
     incfilename = targetdir.join('common_header.h')
-    fi = incfilename.open('w')
+    fi = open_source_file(incfilename, stable)
     fi.write('#ifndef _PY_COMMON_HEADER_H\n#define _PY_COMMON_HEADER_H\n')
 
     #
@@ -948,7 +1023,7 @@ def gen_source(database, modulename, targetdir,
     # 2) Implementation of functions and global structures and arrays
     #
     sg = SourceGenerator(database)
-    sg.set_strategy(targetdir, split)
+    sg.set_strategy(targetdir, split, stable)
     sg.gen_readable_parts_of_source(f)
     headers_to_precompile = sg.headers_to_precompile[:]
     headers_to_precompile.insert(0, incfilename)
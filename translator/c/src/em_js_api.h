@@ -1,36 +1,56 @@
 #ifndef EM_JS_API_H
 #define EM_JS_API_H
 
-extern const char* run_safe_json(const char* json, const char* variable);
+extern const char* run_safe_json(const char* json, int handle, char* output, int output_size);
 
-extern const char* run_safe_get(const char* variable, const char* key, const char* new_variable);
+extern const char* run_safe_get(int handle, const char* key, int new_handle, char* output, int output_size);
 
-extern void run_safe_set(const char* variable, const char* key, const char* value);
+extern void run_safe_set(int handle, const char* key, const char* value);
 
-extern void run_safe_del(const char* variable, const char* key);
+extern void run_safe_del(int handle, const char* key);
 
-extern const char* run_safe_call(const char* variable, const char* args, const char* new_variable);
+extern void release_handle(int handle);
 
-extern const char* run_safe_new(const char* variable, const char* args, const char* new_variable);
+extern void release_handles(int* buffer, int count);
 
-extern void run_safe_promise(const char* arg1, const char* arg2, const char* arg3);
+extern const char* run_safe_call(int handle, const char* args, int new_handle, char* output, int output_size);
 
-extern const char* create_function(const char* id, const char* new_variable, const char* function_info);
+extern const char* run_safe_new(int handle, const char* args, int new_handle, char* output, int output_size);
 
-extern const char* create_method(const char* id, const char* method_id, const char* new_variable);
+extern void run_safe_promise(int parent_promise_id, int promise_id, const char* variables);
 
-extern const char* create_js_closure(const char* func, const char* args, const char* new_variable);
+extern void gather_promise(int* objects, int* results, int count, int new_handle);
 
-extern const char* run_safe_type_update(const char* variable);
+extern int gather_types(int handle, char* types, int count);
 
-extern const char* get_string(const char* variable);
+extern const char* create_function(const char* id, int new_handle, const char* function_info, char* output, int output_size);
 
-extern const char* get_integer(const char* variable);
+extern const char* create_method(const char* id, const char* method_id, int new_handle, char* output, int output_size);
 
-extern const char* get_float(const char* variable);
+extern const char* create_js_closure(const char* func, const char* args, int new_handle, char* output, int output_size);
 
-extern const char* get_boolean(const char* variable);
+extern const char* run_safe_type_update(int handle, char* output, int output_size);
 
-extern const char* run_unsafe_code(const char* code);
+extern const char* get_string(int handle, char* output, int output_size);
+
+extern int get_integer(int handle);
+
+extern double get_float(int handle);
+
+extern int get_boolean(int handle);
+
+extern int get_length(int handle);
+
+extern void copy_integers(int handle, int* buffer, int length);
+
+extern void copy_floats(int handle, double* buffer, int length);
+
+extern void copy_bytes(int handle, char* buffer, int length);
+
+extern const char* create_typed_array(const char* kind, const char* buffer, int length, int new_handle, char* output, int output_size);
+
+extern char* get_many(int handle, const char* keys, const char* kinds, int* new_handles);
+
+extern const char* run_unsafe_code(const char* code, char* output, int output_size);
 
 #endif
@@ -136,6 +136,9 @@ RPY_EXTERN void *boehm_fq_next_dead(struct boehm_fq_s **);
 #define GC_set_max_heap_size(a)  /* nothing */
 #define OP_GC_FQ_REGISTER(tag, obj, r)   /* nothing */
 #define OP_GC_FQ_NEXT_DEAD(tag, r)       (r = NULL)
+/* the 'none' policy uses the Boehm transformer */
+#define OP_BOEHM_FQ_REGISTER(tagindex, obj, r)  /* nothing */
+#define OP_BOEHM_FQ_NEXT_DEAD(tagindex, r)      (r = NULL)
 #endif
 
 #if (defined(PYPY_USING_BOEHM_GC) || defined(PYPY_USING_NO_GC_AT_ALL)) && !defined(PYPY_BOEHM_WITH_HEADER)
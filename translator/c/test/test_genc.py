@@ -10,6 +10,7 @@ from rpython.rlib.entrypoint import entrypoint_highlevel
 from rpython.rlib.unroll import unrolling_iterable
 from rpython.rlib.rarithmetic import r_longlong, r_ulonglong, r_uint, intmask
 from rpython.rlib.objectmodel import specialize
+from rpython.rlib import rgc
 from rpython.rtyper.lltypesystem import lltype
 from rpython.rtyper.lltypesystem.lltype import *
 from rpython.rtyper.lltypesystem.rstr import STR
@@ -633,3 +634,52 @@ def test_generated_c_source_no_gotos():
     c_src = get_generated_c_source(main, [int])
     assert 'goto' not in c_src
     assert not re.search(r'block\w*:(?! \(inlined\))', c_src)
+
+def test_finalizer_queue_without_gc():
+    # with gcpolicy="none" nothing is ever collected: registering works
+    # but next_dead() always returns None
+    class A(object):
+        def __init__(self, i):
+            self.i = i
+    class FQ(rgc.FinalizerQueue):
+        Class = A
+        def finalizer_trigger(self):
+            pass
+    fq = FQ()
+
+    def f(n):
+        for i in range(n):
+            fq.register_finalizer(A(i))
+        rgc.collect()
+        if fq.next_dead() is not None:
+            return -1
+        return n
+
+    fn = compile(f, [int])
+    assert fn(10) == 10
+
+def test_splitnodesstable():
+    class FakeNode(object):
+        def __init__(self, name):
+            self.name = name
+        def implementation(self):
+            return ['void %s(void) {' % self.name, '}']
+
+    def split(names):
+        sg = genc.SourceGenerator(None)
+        sg.stable = True
+        nodes = {'module.c': [FakeNode(name) for name in names]}
+        return dict((filename, [node.name for node, impl in subiter])
+                    for filename, subiter in
+                    sg.splitnodesstable(nodes, 10, 1, genc.SPLIT_CRITERIA))
+
+    names = ['pypy_g_function_%d' % i for i in range(2000)]
+    files = split(names)
+    assert len(files) > 1
+    assert sorted(sum(files.values(), [])) == sorted(names)
+    # adding a function only changes the file that receives it
+    files2 = split(names + ['pypy_g_new_function'])
+    changed = [filename for filename in files2
+               if files.get(filename) != files2[filename]]
+    assert len(changed) == 1
+    assert 'pypy_g_new_function' in files2[changed[0]]
@@ -520,6 +520,32 @@ class TestStandalone(StandaloneTests):
         assert not err
         assert path.check(file=0)
 
+    def test_stable_sources(self):
+        from rpython.translator.c.genc import WriteIfChanged
+        def entry_point(argv):
+            os.write(1, "hello %d\n" % len(argv))
+            return 0
+        config = get_combined_translation_config(translating=True)
+        config.translation.stable_sources = True
+        self.config = config
+        t, cbuilder = self.compile(entry_point)
+        out = cbuilder.cmdexec("a b")
+        assert out == "hello 3\n"
+        #
+        # unchanged content is not written again, so the mtime is kept
+        cfile = cbuilder.targetdir.join('common_header.h')
+        content = cfile.read()
+        cfile.setmtime(1000000000)
+        f = WriteIfChanged(cfile)
+        f.write(content)
+        f.close()
+        assert cfile.mtime() == 1000000000
+        f = WriteIfChanged(cfile)
+        f.write(content + '\n')
+        f.close()
+        assert cfile.mtime() != 1000000000
+        assert cfile.read() == content + '\n'
+
     def test_debug_start_stop_timestamp(self):
         from rpython.rlib.rtimer import read_timestamp
         def entry_point(argv):
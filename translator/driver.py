@@ -20,7 +20,7 @@ log = AnsiLogger("translation")
 
 
 def taskdef(deps, title, new_state=None, expected_states=[],
-            idemp=False, earlycheck=None):
+            idemp=False, earlycheck=None, forkable=False):
     def decorator(taskfunc):
         taskfunc.task_deps = deps
         taskfunc.task_title = title
@@ -28,6 +28,7 @@ def taskdef(deps, title, new_state=None, expected_states=[],
         taskfunc.task_expected_states = expected_states
         taskfunc.task_idempotent = idemp
         taskfunc.task_earlycheck = earlycheck
+        taskfunc.task_forkable = forkable
         return taskfunc
     return decorator
 
@@ -37,6 +38,9 @@ def taskdef(deps, title, new_state=None, expected_states=[],
 # set of translation steps to profile
 PROFILE = set([])
 
+# the tasks after which --checkpoint-dir saves the state
+CHECKPOINT_GOALS = ['annotate', 'rtype', 'backendopt', 'database', 'source']
+
 class Instrument(Exception):
     pass
 
@@ -84,6 +88,11 @@ class TranslationDriver(SimpleTaskEngine):
         if setopts is not None:
             self.config.set(**setopts)
 
+        if self.config.translation.object_cache_size:
+            from rpython.translator.platform import objcache
+            objcache.enable(
+                maxsize=self.config.translation.object_cache_size << 20)
+
         self.exe_name = exe_name
         self.extmod_name = extmod_name
 
@@ -208,6 +217,25 @@ class TranslationDriver(SimpleTaskEngine):
                 self.secondary_entrypoints.extend(points)
 
         self.translator.driver_instrument_result = self.instrument_result
+        self.setup_checkpoints()
+
+    def setup_checkpoints(self):
+        # the objects made when importing the target are found again by
+        # name when resuming, so this must run once the target is set up
+        config = self.config.translation
+        self.checkpointer = None
+        if config.resume_from and not config.checkpoint_dir:
+            raise Exception("--resume-from needs --checkpoint-dir")
+        if not config.checkpoint_dir:
+            return
+        from rpython.translator.goal.checkpoint import Checkpointer
+        self.checkpointer = Checkpointer(self.config)
+        self.checkpointer.remember_imports([self])
+        if config.resume_from:
+            goal, = self.backend_select_goals([config.resume_from])
+            self.checkpointer.load_driver(self, goal,
+                                          py.path.local(config.checkpoint_dir))
+        self.checkpointed = set(self.done)
 
     def setup_library(self, libdef, policy=None, extra={}, empty_translator=None):
         """ Used by carbon python only. """
@@ -304,18 +332,24 @@ class TranslationDriver(SimpleTaskEngine):
         self.log.info('with policy: %s.%s' % (policy.__class__.__module__, policy.__class__.__name__))
 
         annotator = translator.buildannotator(policy=policy)
+        if self.config.translation.parallel_flowgraphs:
+            translator.start_parallel_flow(
+                self.config.translation.parallel_flowgraphs)
 
-        if self.secondary_entrypoints is not None:
-            for func, inputtypes in self.secondary_entrypoints:
-                if inputtypes == Ellipsis:
-                    continue
-                annotator.build_types(func, inputtypes, False)
-
-        if self.entry_point:
-            s = annotator.build_types(self.entry_point, self.inputtypes)
-            translator.entry_point_graph = annotator.bookkeeper.getdesc(self.entry_point).getuniquegraph()
-        else:
-            s = None
+        try:
+            if self.secondary_entrypoints is not None:
+                for func, inputtypes in self.secondary_entrypoints:
+                    if inputtypes == Ellipsis:
+                        continue
+                    annotator.build_types(func, inputtypes, False)
+
+            if self.entry_point:
+                s = annotator.build_types(self.entry_point, self.inputtypes)
+                translator.entry_point_graph = annotator.bookkeeper.getdesc(self.entry_point).getuniquegraph()
+            else:
+                s = None
+        finally:
+            translator.stop_parallel_flow()
 
         self.sanity_check_annotation()
         if self.entry_point and self.standalone and s.knowntype != int:
@@ -362,7 +396,8 @@ class TranslationDriver(SimpleTaskEngine):
         #
         self.log.info("the JIT compiler was generated")
 
-    @taskdef([RTYPE], "test of the JIT on the llgraph backend")
+    @taskdef([RTYPE], "test of the JIT on the llgraph backend",
+             forkable=True)
     def task_jittest_lltype(self):
         """ Run with the JIT on top of the llgraph backend
         """
@@ -526,7 +561,8 @@ class TranslationDriver(SimpleTaskEngine):
         else:
             self.c_entryp = cbuilder.get_entry_point()
 
-    @taskdef([STACKCHECKINSERTION, '?'+BACKENDOPT, RTYPE], "LLInterpreting")
+    @taskdef([STACKCHECKINSERTION, '?'+BACKENDOPT, RTYPE], "LLInterpreting",
+             forkable=True)
     def task_llinterpret_lltype(self):
         from rpython.rtyper.llinterp import LLInterpreter
 
@@ -590,6 +626,17 @@ class TranslationDriver(SimpleTaskEngine):
             "cannot fork because the rtyper has already been imported")
     prereq_checkpt_rtype_lltype = prereq_checkpt_rtype
 
+    def _can_fork(self):
+        return self.config.translation.fork_tasks and hasattr(os, 'fork')
+
+    def _forked_done(self, goal, elapsed):
+        taskcallable, _ = self.tasks[goal]
+        if not taskcallable.task_idempotent:
+            self.done[goal] = True
+        self.timer.record_event(goal, elapsed)
+        self.log.info("%s done in a forked process (%.1f s)" %
+                      (taskcallable.task_title, elapsed))
+
     # checkpointing support
     def _event(self, kind, goal, func):
         if kind == 'planned' and func.task_earlycheck:
@@ -604,6 +651,14 @@ class TranslationDriver(SimpleTaskEngine):
                         prereq()
                     from rpython.translator.goal import unixcheckpoint
                     unixcheckpoint.restartable_point(auto='run')
+        if kind == 'post' and getattr(self, 'checkpointer', None):
+            if (goal in self.backend_select_goals(CHECKPOINT_GOALS) and
+                    goal not in self.checkpointed):
+                self.checkpointed.add(goal)
+                directory = py.path.local(
+                    self.config.translation.checkpoint_dir)
+                directory.ensure(dir=1)
+                self.checkpointer.save_driver(self, goal, directory)
 
 def mkexename(name):
     if sys.platform == 'win32':
@@ -0,0 +1,721 @@
+"""Durable checkpoints of the translation driver.
+
+After every task the state of the driver (the translator with its graphs,
+annotator and rtyper, the C database, ...) is pickled into a directory.
+A later run of the same target with --resume-from=<task> loads the state
+saved after <task> and continues from there, so that e.g. the C backend
+options or the compiler flags can be changed without annotating and
+rtyping again.
+
+The state refers to a lot of objects that the program created when it
+was imported: modules, classes, functions, prebuilt instances...  These
+are not pickled by value but by the path under which they can be found
+again starting from a module (e.g. 'mod.Class.method.__closure__[0]'),
+because the resuming process imports the same target and must keep using
+the very same objects.  Everything else is pickled by value.  Functions
+and code objects created during the translation are rebuilt from their
+code, and so are the classes.  Objects that are found by name only after
+the translation started are looked up by name too, and made again from
+their value when the path does not lead to them in the resuming process.
+"""
+
+import sys
+import types
+import marshal
+import weakref
+import copy_reg
+import cPickle as pickle
+
+from rpython.config.config import Config
+from rpython.tool.ansi_print import AnsiLogger
+
+log = AnsiLogger("checkpoint")
+
+# the driver attributes that make up the state of the translation
+STATE_ATTRIBUTES = ['done', 'translator', 'entry_point', 'inputtypes',
+                    'standalone', 'policy', 'secondary_entrypoints',
+                    'libdef', 'cbuilder', 'database', 'c_entryp',
+                    'jitpolicy']
+
+MAX_PATH_DEPTH = 6
+
+# builtin methods, found again as attributes of their class or object
+DESCRIPTOR_TYPES = (type(object.__init__), type(str.join),
+                    type(dict.__dict__['fromkeys']),
+                    types.MemberDescriptorType, types.GetSetDescriptorType)
+BOUND_BUILTIN_TYPES = (type(object().__init__), types.BuiltinMethodType)
+
+# pickling the graphs recurses along the links between blocks: about
+# 9 levels and 1.5KB of C stack per block, with some margin here
+STACK_PER_BLOCK = 4096
+RECURSION_PER_BLOCK = 16
+MIN_STACK_SIZE = 16 * 1024 * 1024
+MAX_STACK_SIZE = 512 * 1024 * 1024
+
+
+class CheckpointError(Exception):
+    pass
+
+
+def checkpoint_filename(directory, goal):
+    return directory.join('%s.checkpoint' % (goal,))
+
+def count_blocks(translator):
+    # an upper bound of how deep the pickler goes along the links, which
+    # can lead from one graph to the next through the constants
+    if translator is None:
+        return 0
+    return sum([len(list(graph.iterblocks()))
+                for graph in translator.graphs])
+
+def call_with_big_stack(nblocks, func, *args):
+    import threading
+    result = []
+    errors = []
+    def run():
+        try:
+            result.append(func(*args))
+        except:
+            errors.append(sys.exc_info())
+    stack_size = min(max(nblocks * STACK_PER_BLOCK, MIN_STACK_SIZE),
+                     MAX_STACK_SIZE)
+    old_size = threading.stack_size(stack_size)
+    old_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(old_limit, stack_size // STACK_PER_BLOCK *
+                                         RECURSION_PER_BLOCK))
+    try:
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+    finally:
+        threading.stack_size(old_size)
+        sys.setrecursionlimit(old_limit)
+    if errors:
+        exc_type, exc_value, tb = errors[0]
+        raise exc_type, exc_value, tb
+    return result[0]
+
+
+# ____________________________________________________________
+# finding objects by name
+
+# the real namespace, without triggering lazy modules like py.test
+_module_dict = types.ModuleType.__dict__['__dict__'].__get__
+
+def _children(obj):
+    """Yield (step, value) for the places where import-time objects are
+    looked up.  The steps must not depend on anything but the names, so
+    that they are the same in the process that resumes."""
+    if isinstance(obj, types.ModuleType):
+        namespace = _module_dict(obj)
+    elif isinstance(obj, (type, types.ClassType)):
+        namespace = obj.__dict__
+    elif isinstance(obj, types.FunctionType):
+        for i, cell in enumerate(obj.func_closure or ()):
+            try:
+                yield ('closure', i), cell.cell_contents
+            except ValueError:     # empty cell
+                pass
+        for i, value in enumerate(obj.func_defaults or ()):
+            yield ('default', i), value
+        return
+    elif isinstance(obj, (staticmethod, classmethod)):
+        yield ('func',), obj.__func__
+        return
+    elif type(obj) in (list, tuple):
+        for i, value in enumerate(obj):
+            yield ('item', i), value
+        return
+    elif type(obj) is dict:
+        namespace = obj
+    else:
+        namespace = getattr(obj, '__dict__', None)
+        if type(namespace) is not dict:
+            return
+        keys = [key for key in namespace if type(key) is str]
+        keys.sort()
+        for key in keys:
+            yield ('attr', key), namespace[key]
+        return
+    keys = [key for key in namespace if type(key) is str]
+    keys.sort()
+    for key in keys:
+        yield ('key', key), namespace[key]
+
+def _follow(obj, step):
+    kind = step[0]
+    if kind == 'key':
+        if isinstance(obj, types.ModuleType):
+            return _module_dict(obj)[step[1]]
+        if isinstance(obj, (type, types.ClassType)):
+            return obj.__dict__[step[1]]
+        return obj[step[1]]
+    if kind == 'attr':
+        return obj.__dict__[step[1]]
+    if kind == 'closure':
+        return obj.func_closure[step[1]].cell_contents
+    if kind == 'default':
+        return obj.func_defaults[step[1]]
+    if kind == 'func':
+        return obj.__func__
+    if kind == 'item':
+        return obj[step[1]]
+    raise ValueError(step)
+
+def _is_leaf(value):
+    # immutable values are pickled by value, no need to find them again
+    return value is None or type(value) in (int, long, float, bool, str,
+                                            unicode, complex)
+
+def loaded_modules():
+    modnames = [name for name, module in sys.modules.items()
+                if module is not None]
+    modnames.sort()
+    return modnames
+
+def find_named_objects(modnames, exclude=()):
+    """Map id(obj) to (obj, modulename, path) for every object reachable by
+    name from the given modules, taking the shortest path (and then the
+    first one in alphabetical order).  The objects in 'exclude' are not
+    followed: they are the state being saved, even if a module refers to
+    it."""
+    named = {}
+    for obj in exclude:
+        named[id(obj)] = None
+    for modname in modnames:
+        named.setdefault(id(sys.modules[modname]),
+                         (sys.modules[modname], modname, ()))
+    pending = [(sys.modules[modname], modname, ()) for modname in modnames]
+    depth = 0
+    while pending and depth < MAX_PATH_DEPTH:
+        depth += 1
+        next_pending = []
+        for obj, modname, path in pending:
+            for step, value in _children(obj):
+                if _is_leaf(value) or id(value) in named:
+                    continue
+                if isinstance(value, types.ModuleType):
+                    continue        # found by its own name
+                entry = (value, modname, path + (step,))
+                named[id(value)] = entry
+                next_pending.append(entry)
+        pending = next_pending
+    for obj in exclude:
+        named.pop(id(obj), None)
+    return named
+
+def is_global(obj):
+    # what pickle itself saves by name
+    if not isinstance(obj, (types.FunctionType, type, types.ClassType)):
+        return False
+    module = sys.modules.get(getattr(obj, '__module__', None))
+    return getattr(module, obj.__name__, None) is obj
+
+def lookup_named(modname, path):
+    __import__(modname)
+    obj = sys.modules[modname]
+    try:
+        for step in path:
+            obj = _follow(obj, step)
+    except (KeyError, IndexError, AttributeError, TypeError, ValueError):
+        raise CheckpointError("cannot find %s%s" % (modname,
+                                                    format_path(path)))
+    return obj
+
+def lookup_late(modname, path, cls):
+    try:
+        obj = lookup_named(modname, path)
+    except CheckpointError:
+        if cls is None:
+            raise
+    else:
+        if cls is None or type(obj) is cls:
+            return obj
+    # it was set during the translation, the rest is set by fill_rebuilt()
+    if cls in (dict, list, set):
+        obj = cls()
+    else:
+        obj = cls.__new__(cls)
+    _rebuilt[id(obj)] = obj
+    if len(path) == 1 and path[0][0] == 'key':
+        # a global of the module, e.g. a cache
+        setattr(sys.modules[modname], path[0][1], obj)
+    return obj
+
+def fill_rebuilt(obj, state, listitems, dictitems):
+    if id(obj) not in _rebuilt:
+        return
+    if state is not None:
+        setstate = getattr(obj, '__setstate__', None)
+        if setstate is not None:
+            setstate(state)
+        else:
+            slots = None
+            if isinstance(state, tuple):
+                state, slots = state
+            if state:
+                obj.__dict__.update(state)
+            if slots:
+                for key, value in slots.items():
+                    setattr(obj, key, value)
+    if isinstance(obj, set):
+        obj.update(listitems)
+    else:
+        for item in listitems:
+            obj.append(item)
+    for key, value in dictitems:
+        obj[key] = value
+
+def format_path(path):
+    result = []
+    for step in path:
+        if step[0] in ('key', 'attr'):
+            result.append('.%s' % (step[1],))
+        elif step[0] == 'closure':
+            result.append('.__closure__[%d]' % (step[1],))
+        elif step[0] == 'default':
+            result.append('.__defaults__[%d]' % (step[1],))
+        elif step[0] == 'func':
+            result.append('.__func__')
+        else:
+            result.append('[%d]' % (step[1],))
+    return ''.join(result)
+
+
+# ____________________________________________________________
+# rebuilding the objects that are not pickled by value
+
+def _make_cell():
+    if False:
+        value = None
+    return (lambda: value).func_closure[0]
+
+def _cell_set_template(value):
+    lambda: cell      # makes 'cell' a cell variable, set with STORE_DEREF
+    cell = value
+
+# the same code, but where 'cell' is the first free variable: a function
+# made from it with a given closure sets that cell.  Unlike PyCell_Set()
+# this works on every host that runs the translation.
+_co = _cell_set_template.func_code
+_cell_set_code = types.CodeType(
+    _co.co_argcount, _co.co_nlocals, _co.co_stacksize, _co.co_flags,
+    _co.co_code, _co.co_consts, _co.co_names, _co.co_varnames,
+    _co.co_filename, '_set_cell', _co.co_firstlineno, _co.co_lnotab,
+    _co.co_cellvars, ())
+del _co
+
+def _set_cell(cell, value):
+    types.FunctionType(_cell_set_code, {}, '_set_cell', None, (cell,))(value)
+
+def rebuild_function(code, modname, name, ncells):
+    module = sys.modules[modname] if modname in sys.modules else None
+    globals = module.__dict__ if module is not None else {}
+    closure = tuple([_make_cell() for i in range(ncells)]) or None
+    return types.FunctionType(code, globals, name, None, closure)
+
+def rebuild_code(data):
+    return marshal.loads(data)
+
+def rebuild_weakref(obj):
+    return weakref.ref(obj)
+
+class _Dead(object):
+    pass
+
+def rebuild_dead_weakref():
+    return weakref.ref(_Dead())
+
+def lookup_descriptor(cls, name):
+    # not getattr(), which gives e.g. the dictproxy for '__dict__'
+    return cls.__dict__[name]
+
+def rebuild_method(func, obj, cls):
+    return types.MethodType(func, obj, cls)
+
+def rebuild_weakdict(cls, items):
+    return cls(items)
+
+def lookup_class(base, modname, name, index, metaclass, bases, slots, doc):
+    __import__(modname)
+    found = [subcls for subcls in type.__subclasses__(base)
+             if subcls.__module__ == modname and subcls.__name__ == name]
+    if index < len(found):
+        return found[index]
+    # made during the translation, the rest is set by fill_class()
+    namespace = {'__module__': modname, '__doc__': doc}
+    if slots is not None:
+        namespace['__slots__'] = slots
+    cls = metaclass(name, bases, namespace)
+    _rebuilt_classes.add(cls)
+    return cls
+
+def fill_class(cls, items):
+    if cls in _rebuilt_classes:
+        for key, value in items:
+            setattr(cls, key, value)
+
+def class_items(cls):
+    slots = cls.__dict__.get('__slots__', ())
+    if isinstance(slots, str):
+        slots = (slots,)
+    items = []
+    for key, value in cls.__dict__.items():
+        if key in ('__dict__', '__weakref__', '__module__', '__doc__',
+                   '__slots__'):
+            continue
+        if key in slots and isinstance(value, types.MemberDescriptorType):
+            continue
+        items.append((key, value))
+    return items
+
+def current_driver():
+    return _loading_driver
+
+def current_config(path):
+    config = _loading_config
+    for name in path:
+        config = getattr(config, name)
+    return config
+
+def config_path(config):
+    path = []
+    while config._cfgimpl_parent is not None:
+        parent = config._cfgimpl_parent
+        for name, value in parent._cfgimpl_values.items():
+            if value is config:
+                path.append(name)
+                break
+        config = parent
+    path.reverse()
+    return tuple(path)
+
+
+class Reduced(object):
+    """Stands for an object that is not pickled by value.  It is what
+    persistent_id() returns, so it is memoized like any other object, and
+    the unpickler finds the object that its reduce tuple rebuilds."""
+
+    def __init__(self, reduced, obj=None):
+        self.reduced = reduced
+        self.obj = obj
+
+    def __reduce__(self):
+        return self.reduced
+
+def fill_function(func, defaults, dict, cells):
+    func.func_defaults = defaults
+    func.func_dict.update(dict)
+    for cell, value in zip(func.func_closure or (), cells):
+        if value is not _Dead:
+            _set_cell(cell, value)
+
+def fill_dict(d, items):
+    for key, value in items:
+        d[key] = value
+
+def fill_set(s, items):
+    s.update(items)
+
+REGISTRY_TYPES = (dict, list, set, weakref.WeakValueDictionary,
+                  weakref.WeakKeyDictionary)
+
+def is_registry(obj, modname, path):
+    # the weak dictionaries are old-style instances
+    return (len(path) == 1 and
+            getattr(obj, '__class__', None) in REGISTRY_TYPES and
+            modname.startswith('rpython.'))
+
+def registry_contents(registry):
+    if isinstance(registry, list):
+        return list(registry)
+    if isinstance(registry, set):
+        return [(item, None) for item in registry]
+    return registry.items()
+
+def fill_registry(registry, contents):
+    if isinstance(registry, list):
+        registry[:] = contents
+    elif isinstance(registry, set):
+        registry.update([item for item, _ in contents])
+    else:
+        for key, value in contents:
+            registry[key] = value
+
+# what completes the objects whose content is pickled after the main
+# state, see Checkpointer.dump()
+
+def function_fixup(func):
+    cells = []
+    for cell in func.func_closure or ():
+        try:
+            cells.append(cell.cell_contents)
+        except ValueError:
+            cells.append(_Dead)    # an empty cell
+    return (fill_function, func, func.func_defaults, func.func_dict, cells)
+
+def class_fixup(cls):
+    return (fill_class, cls, class_items(cls))
+
+def container_fixup(obj):
+    if isinstance(obj, dict):
+        return (fill_dict, obj, obj.items())
+    return (fill_set, obj, list(obj))
+
+def rebuilt_fixup(obj):
+    if type(obj) is dict:
+        return (fill_rebuilt, obj, None, [], obj.items())
+    if type(obj) in (list, set):
+        return (fill_rebuilt, obj, None, list(obj), [])
+    rv = obj.__reduce_ex__(2)
+    state = rv[2] if len(rv) > 2 else None
+    listitems = list(rv[3]) if len(rv) > 3 and rv[3] is not None else []
+    dictitems = list(rv[4]) if len(rv) > 4 and rv[4] is not None else []
+    return (fill_rebuilt, obj, state, listitems, dictitems)
+
+def has_simple_keys(container):
+    for key in container:
+        if not _is_leaf(key):
+            return False
+    return True
+
+
+# ____________________________________________________________
+
+_loading_config = None
+_loading_driver = None
+_rebuilt_classes = set()
+_rebuilt = {}         # id -> objects made again by lookup_late()
+
+
+class Checkpointer(object):
+    def __init__(self, config):
+        self.config = config
+        self.driver = None
+        self.named = None
+        self.late = None
+        self.reduced = {}
+        self.pending = []
+
+    def remember_imports(self, exclude=()):
+        """Find the objects reachable by name once the target is imported,
+        before the translation starts to change the modules.  The process
+        that resumes finds them at the same point.  They are kept alive,
+        so that their ids stay unique."""
+        self.named = find_named_objects(loaded_modules(), exclude)
+        # the module globals filled during the translation, like
+        # llgroup._membership, are saved with their new content
+        self.registries = {}
+        for obj, modname, path in self.named.values():
+            if is_registry(obj, modname, path):
+                self.registries[id(obj)] = len(obj)
+
+    def changed_registries(self):
+        # self.late also has the globals of the modules imported since then
+        return [obj for obj, modname, path in self.late.values()
+                if is_registry(obj, modname, path) and
+                   len(obj) != self.registries.get(id(obj), 0)]
+
+    def persistent_id(self, obj):
+        if _is_leaf(obj):
+            return None
+        try:
+            return self.reduced[id(obj)]
+        except KeyError:
+            pass
+        reduced = self.reduce(obj)
+        if reduced is None:
+            return None
+        result = self.reduced[id(obj)] = Reduced(reduced, obj)
+        return result
+
+    def reduce(self, obj):
+        if (isinstance(obj, Config) and
+                obj._cfgimpl_get_toplevel() is self.config):
+            # the options given to the process that resumes are used
+            return (current_config, (config_path(obj),))
+        if obj is self.driver:
+            # e.g. in the bound methods that the translator calls back
+            return (current_driver, ())
+        if is_global(obj):
+            return None
+        entry = self.named.get(id(obj))
+        if entry is not None and entry[0] is obj:
+            return (lookup_named, entry[1:])
+        entry = self.late.get(id(obj))
+        if entry is not None and entry[0] is obj:
+            return self._reduce_late(obj, entry[1], entry[2])
+        if isinstance(obj, types.FunctionType):
+            return self._reduce_function(obj)
+        if type(obj) in (dict, set) and not has_simple_keys(obj):
+            # the keys are hashed when inserted, so not before their own
+            # state is loaded, which is not the case in a cycle
+            self.pending.append((container_fixup, obj))
+            return (type(obj), ())
+        if isinstance(obj, types.CodeType):
+            return (rebuild_code, (marshal.dumps(obj),))
+        if isinstance(obj, weakref.ref) and type(obj) is weakref.ref:
+            target = obj()
+            if target is None:
+                return (rebuild_dead_weakref, ())
+            return (rebuild_weakref, (target,))
+        if isinstance(obj, types.MethodType):
+            return (rebuild_method, (obj.im_func, obj.im_self, obj.im_class))
+        if isinstance(obj, (weakref.WeakValueDictionary,
+                            weakref.WeakKeyDictionary)):
+            return (rebuild_weakdict, (type(obj), obj.items()))
+        if isinstance(obj, types.ModuleType):
+            return (lookup_named, (obj.__name__, ()))
+        if isinstance(obj, DESCRIPTOR_TYPES):
+            return (lookup_descriptor, (obj.__objclass__, obj.__name__))
+        if (isinstance(obj, BOUND_BUILTIN_TYPES) and
+                obj.__self__ is not None and
+                not isinstance(obj.__self__, types.ModuleType)):
+            return (getattr, (obj.__self__, obj.__name__))
+        if isinstance(obj, (staticmethod, classmethod)):
+            return (type(obj), (obj.__func__,))
+        if isinstance(obj, property):
+            return (property, (obj.fget, obj.fset, obj.fdel, obj.__doc__))
+        if isinstance(obj, (type, types.ClassType)):
+            return self._reduce_class(obj)
+        return None
+
+    def _reduce_class(self, cls):
+        from rpython.rtyper.lltypesystem import lltype
+        if issubclass(cls, lltype._struct) and cls.__name__ == '_struct1':
+            # made by lltype._struct_variety()
+            return (lltype._struct_variety, (cls.__slots__[:-1],))
+        if not isinstance(cls, type) or not cls.__bases__:
+            raise CheckpointError("cannot find the class %r by name" % (cls,))
+        # a class defined twice under the same name in a module, or made by
+        # a function: found among the subclasses of its base, or made again
+        # if it was made during the translation
+        self.pending.append((class_fixup, cls))
+        base = cls.__bases__[0]
+        same_name = [subcls for subcls in type.__subclasses__(base)
+                     if subcls.__module__ == cls.__module__ and
+                        subcls.__name__ == cls.__name__]
+        return (lookup_class, (base, cls.__module__, cls.__name__,
+                               same_name.index(cls), type(cls), cls.__bases__,
+                               cls.__dict__.get('__slots__'), cls.__doc__))
+
+    def _reduce_function(self, func):
+        # the closure, defaults and attributes may refer back to the
+        # function, they are pickled afterwards
+        self.pending.append((function_fixup, func))
+        ncells = len(func.func_closure or ())
+        return (rebuild_function, (func.func_code, func.__module__,
+                                   func.func_name, ncells))
+
+    def _reduce_late(self, obj, modname, path):
+        # found by name only now: set during the translation, so it is
+        # made again from its value if the path does not lead to it in the
+        # process that resumes
+        cls = None
+        if type(obj) in (dict, list, set):
+            cls = type(obj)
+        elif not isinstance(obj, (type, types.ClassType,
+                                  types.FunctionType)):
+            try:
+                rv = obj.__reduce_ex__(2)
+            except (TypeError, AttributeError):   # old-style instances
+                rv = None
+            if (isinstance(rv, tuple) and rv[0] is copy_reg.__newobj__ and
+                    rv[1] == (type(obj),)):
+                cls = type(obj)
+        if cls is not None:
+            self.pending.append((rebuilt_fixup, obj))
+        return (lookup_late, (modname, path, cls))
+
+    def dump(self, state, f):
+        pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = self.persistent_id
+        # modules imported during the translation register things for the
+        # annotator and the rtyper when they are imported
+        pickler.dump(loaded_modules())
+        pickler.dump(state)
+        registries = [(obj, registry_contents(obj))
+                      for obj in self.changed_registries()]
+        pickler.dump(registries)
+        # the pickler keeps its memo between dumps, so the objects found so
+        # far are completed by the next ones (which can find more)
+        batches = []
+        while self.pending:
+            batch = [make_fixup(obj) for make_fixup, obj in self.pending]
+            del self.pending[:]
+            batches.append(batch)     # kept alive, the memo uses ids
+            pickler.dump(batch)
+        pickler.dump(None)
+
+    def load(self, f):
+        global _loading_config, _loading_driver
+        _loading_config = self.config
+        _loading_driver = self.driver
+        try:
+            unpickler = pickle.Unpickler(f)
+            unpickler.persistent_load = lambda obj: obj
+            for modname in unpickler.load():
+                if modname not in sys.modules:
+                    try:
+                        __import__(modname)
+                    except ImportError:
+                        pass
+            state = unpickler.load()
+            registries = unpickler.load()
+            while True:
+                batch = unpickler.load()
+                if batch is None:
+                    break
+                for entry in batch:
+                    entry[0](*entry[1:])
+            # only now that the keys are complete
+            for registry, contents in registries:
+                fill_registry(registry, contents)
+        finally:
+            _loading_config = None
+            _loading_driver = None
+            _rebuilt_classes.clear()
+            _rebuilt.clear()
+        return state
+
+    def save_driver(self, driver, goal, directory):
+        state = {}
+        for name in STATE_ATTRIBUTES:
+            if name in driver.__dict__:
+                state[name] = driver.__dict__[name]
+        filename = checkpoint_filename(directory, goal)
+        tmpname = filename.new(basename=filename.basename + '~')
+        if self.named is None:
+            self.remember_imports([driver])
+        self.late = find_named_objects(loaded_modules(),
+                                       [driver] + state.values())
+        self.driver = driver
+        nblocks = count_blocks(state.get('translator'))
+        f = tmpname.open('wb')
+        try:
+            pickle.dump(nblocks, f, pickle.HIGHEST_PROTOCOL)
+            call_with_big_stack(nblocks, self.dump, state, f)
+        finally:
+            f.close()
+            self.driver = None
+            self.late = None
+            self.reduced = {}
+            del self.pending[:]
+        tmpname.rename(filename)
+        log.info('state after %s saved to %s' % (goal, filename))
+
+    def load_driver(self, driver, goal, directory):
+        filename = checkpoint_filename(directory, goal)
+        if not filename.check():
+            raise CheckpointError("no checkpoint for %r in %s" %
+                                  (goal, directory))
+        self.driver = driver
+        f = filename.open('rb')
+        try:
+            nblocks = pickle.load(f)
+            state = call_with_big_stack(nblocks, self.load, f)
+        finally:
+            f.close()
+            self.driver = None
+        driver.__dict__.update(state)
+        log.info('state after %s loaded from %s' % (goal, filename))
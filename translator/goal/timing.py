@@ -29,6 +29,10 @@ class Timer(object):
         self.next_event = None
         self.tk = now
 
+    def record_event(self, event, duration):
+        # for an event timed elsewhere, e.g. in a forked process
+        self.events.append((event, duration))
+
     def ttime(self):
         try:
             return self.tk - self.t0
@@ -212,6 +212,22 @@ def log_config(config, header="config used"):
     for warning in config.get_warnings():
         log.WARNING(warning)
 
+def write_loaded_modules(filename):
+    """Write the source file of every module imported so far, one per line,
+    so that build tools can tell when a translation has to be redone."""
+    sources = set()
+    for module in sys.modules.values():
+        source = getattr(module, '__file__', None)
+        if not source:
+            continue
+        if source.endswith(('.pyc', '.pyo')):
+            source = source[:-1]
+        if os.path.isfile(source):
+            sources.add(os.path.abspath(source))
+    with open(filename, 'w') as f:
+        for source in sorted(sources):
+            f.write(source + '\n')
+
 def main():
     sys.setrecursionlimit(2000)  # PyPy can't translate within cpython's 1k limit
     targetspec_dic, translateconfig, config, args = parse_options_and_load_target()
@@ -326,6 +342,8 @@ def main():
         raise SystemExit(1)
     else:
         finish_profiling()
+        if os.environ.get('RPYTHON_DEPS_FILE'):
+            write_loaded_modules(os.environ['RPYTHON_DEPS_FILE'])
         if translateconfig.pdb:
             debug(False)
 
@@ -0,0 +1,229 @@
+"""Experimental parallel building of flow graphs.
+
+Worker processes are forked from the translator once all the modules are
+imported.  Every time a graph is built, the plain functions it calls are
+sent to the workers, which run build_flow() and the simplifications ahead
+of the annotator; buildflowgraph() then takes the ready graph instead of
+building it itself.
+
+Graphs are sent back pickled.  Objects that existed when the workers were
+forked (functions, classes, prebuilt instances and containers, ...) are
+sent by identity: a snapshot of them is taken before forking and kept
+alive, so their id() is the same on both sides.  Everything else must be
+a flow model object or a plain value.  A graph that refers to any other
+object created by the worker (which would arrive as a copy with a new
+identity) is not transferred, and the function is simply built again in
+the translator process.
+
+Flow graphs are built from the heap as it was at fork time.  The workers
+also send back the globals and closure cells that the function can read;
+a graph is only used if they still have the same values in the
+translator process.  The mode is experimental and off by default.
+"""
+
+import gc
+import types
+import cPickle as pickle
+from cStringIO import StringIO
+
+from rpython.flowspace.model import (FunctionGraph, Block, Link,
+    SpaceOperation, Variable, Constant)
+from rpython.flowspace.argument import Signature
+from rpython.flowspace.objspace import build_flow
+from rpython.translator import simplify
+from rpython.tool.ansi_print import AnsiLogger
+
+log = AnsiLogger("parallelflow")
+
+# set up before forking, inherited by the workers
+_snapshot = None
+
+# objects not in the snapshot that can be sent by value: plain values,
+# and the flow model objects (including their subclasses) of the graph
+VALUE_TYPES = (int, long, float, complex, bool, str, unicode, types.NoneType,
+               tuple, list, dict)
+MODEL_TYPES = (FunctionGraph, Block, Link, SpaceOperation, Variable,
+               Constant, Signature)
+
+
+class Unshareable(Exception):
+    pass
+
+
+class Snapshot(object):
+    def __init__(self, config):
+        self.config = config
+        self.objects = gc.get_objects()    # keeps them (and their ids) alive
+        self.by_id = {}
+        types_seen = {}
+        for obj in self.objects:
+            self.by_id[id(obj)] = obj
+            # static types (int, ValueError, ...) are not tracked by the gc
+            types_seen[id(type(obj))] = type(obj)
+            if type(obj) is dict:
+                for value in obj.values():
+                    if type(value) is type:
+                        types_seen[id(value)] = value
+        for cls in types_seen.values():
+            for base in cls.__mro__:
+                self.by_id[id(base)] = base
+
+    def persistent_id(self, obj):
+        if id(obj) in self.by_id:
+            return ('id', id(obj))
+        if type(obj) is types.MethodType:
+            return ('method', obj.im_func, obj.im_self, obj.im_class)
+        if type(obj) not in VALUE_TYPES and not isinstance(obj, MODEL_TYPES):
+            raise Unshareable(obj)
+        return None
+
+    def persistent_load(self, pid):
+        if pid[0] == 'id':
+            return self.by_id[pid[1]]
+        if pid[0] == 'method':
+            return types.MethodType(pid[1], pid[2], pid[3])
+        raise ValueError(pid)
+
+    def dumps(self, obj):
+        f = StringIO()
+        pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = self.persistent_id
+        pickler.dump(obj)
+        return f.getvalue()
+
+    def loads(self, data):
+        unpickler = pickle.Unpickler(StringIO(data))
+        unpickler.persistent_load = self.persistent_load
+        return unpickler.load()
+
+
+def read_globals(func):
+    """Return the globals and closure cells that the flow space can read
+    when building the graph of 'func', with their current values."""
+    reads = []
+    for name in func.func_code.co_names:
+        if name in func.func_globals:
+            reads.append(('global', name, func.func_globals[name]))
+        else:
+            reads.append(('missing', name, None))
+    for i, cell in enumerate(func.func_closure or ()):
+        reads.append(('cell', i, cell.cell_contents))
+    return reads
+
+def same_value(value, expected):
+    return value is expected or (type(value) is type(expected) and
+                                 type(value) in VALUE_TYPES and
+                                 value == expected)
+
+def globals_unchanged(func, reads):
+    for kind, key, expected in reads:
+        if kind == 'missing':
+            if key in func.func_globals:
+                return False
+            continue
+        try:
+            if kind == 'global':
+                value = func.func_globals[key]
+            else:
+                value = func.func_closure[key].cell_contents
+        except (KeyError, ValueError):
+            return False
+        if not same_value(value, expected):
+            return False
+    return True
+
+
+def build_in_worker(key):
+    snapshot = _snapshot
+    func = snapshot.by_id.get(key)
+    if not isinstance(func, types.FunctionType):
+        return None
+    try:
+        reads = read_globals(func)
+        graph = build_flow(func)
+        simplify.simplify_graph(graph)
+        if snapshot.config.translation.list_comprehension_operations:
+            simplify.detect_list_comprehension(graph)
+        return snapshot.dumps((graph, reads))
+    except Exception:
+        # unshareable, or an error that the translator process will
+        # report itself when it builds the graph
+        return None
+
+
+def fix_variable_names(graph):
+    # the names are only numbered lazily, but the name prefixes must be
+    # the canonical strings of this process' Variable.namesdict
+    namesdict = Variable.namesdict
+    for block in graph.iterblocks():
+        variables = list(block.inputargs)
+        variables.extend([op.result for op in block.operations])
+        for link in block.exits:
+            variables.extend([v for v in link.getextravars()
+                              if isinstance(v, Variable)])
+        for v in variables:
+            if v._name == Variable.dummyname:
+                v._name = Variable.dummyname
+            else:
+                v._name = namesdict.setdefault(v._name, (v._name, 0))[0]
+            v._nr = -1
+
+
+class ParallelFlowBuilder(object):
+    def __init__(self, config, processes):
+        global _snapshot
+        import multiprocessing
+        _snapshot = Snapshot(config)
+        self.snapshot = _snapshot
+        self.pool = multiprocessing.Pool(processes)
+        self.pending = {}
+        self.wait = 0.0     # seconds to wait for a graph that is not ready
+        self.hits = 0
+        self.misses = 0
+        log.info('%d workers forked' % (processes,))
+
+    def prefetch_callees(self, graph):
+        for block in graph.iterblocks():
+            for op in block.operations:
+                if op.opname not in ('simple_call', 'call_args'):
+                    continue
+                c_func = op.args[0]
+                if not isinstance(c_func, Constant):
+                    continue
+                func = c_func.value
+                if (not isinstance(func, types.FunctionType) or
+                        func in self.pending or
+                        id(func) not in self.snapshot.by_id):
+                    continue
+                self.pending[func] = self.pool.apply_async(build_in_worker,
+                                                           (id(func),))
+
+    def get(self, func):
+        result = self.pending.pop(func, None)
+        if result is None:
+            return None
+        if self.wait:
+            result.wait(self.wait)
+        if not result.ready():
+            self.misses += 1
+            return None
+        data = result.get()
+        if data is None:
+            self.misses += 1
+            return None
+        graph, reads = self.snapshot.loads(data)
+        if not globals_unchanged(func, reads):
+            self.misses += 1
+            return None
+        fix_variable_names(graph)
+        self.hits += 1
+        return graph
+
+    def stop(self):
+        global _snapshot
+        self.pool.terminate()
+        self.pool.join()
+        self.pending.clear()
+        _snapshot = None
+        log.info('%d graphs built by the workers, %d built again here' %
+                 (self.hits, self.misses))
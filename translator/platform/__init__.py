@@ -76,9 +76,34 @@ class Platform(object):
             if str(cfile).lower().endswith('.asm'):
                 ofiles.append(self._compile_c_file(self.masm, cfile, []))
             else:
-                ofiles.append(self._compile_c_file(self.cc, cfile, compile_args))
+                ofiles.append(self._compile_c_file_cached(self.cc, cfile,
+                                                          compile_args))
         return ofiles
 
+    def _compile_c_file_cached(self, cc, cfile, compile_args):
+        from rpython.translator.platform import objcache
+        cache = objcache.object_cache
+        if cache is None:
+            return self._compile_c_file(cc, cfile, compile_args)
+        ifile = self._preprocess_c_file(cc, cfile, compile_args)
+        if ifile is None:
+            # not supported, or an error that the compiler will report
+            return self._compile_c_file(cc, cfile, compile_args)
+        source = objcache.normalize(ifile.read(), cfile.dirpath())
+        key = cache.key(self.key(), cc, source, compile_args)
+        ofile = self._make_o_file(cfile, ext='o')
+        if cache.get(key, ofile):
+            return ofile
+        # compile the preprocessed file, not the C file a second time
+        ofile = self._compile_c_file(cc, ifile, compile_args)
+        cache.put(key, ofile)
+        return ofile
+
+    def _preprocess_c_file(self, cc, cfile, compile_args):
+        """Write the preprocessed 'cfile' next to its object file and
+        return its path, or None."""
+        return None
+
     def execute(self, executable, args=None, env=None, compilation_info=None):
         if env is None:
             env = os.environ.copy()
@@ -0,0 +1,187 @@
+"""A cache of compiled object files, shared by all the translations.
+
+Platform.compile() looks up every C file in it before calling the
+compiler, and the Makefiles written while the cache is enabled run the
+compiler through this file (see makefile_cc() and main()).  The key is
+the preprocessed source, with the directory of the C file removed from
+the line markers, together with the compiler arguments and the version
+of the compiler, so that an object file is reused from another usession
+directory as long as it would be compiled the same.  On a miss the
+preprocessed file is compiled, so the C file is only preprocessed once.
+The cache is bounded in size: the least recently used entries are
+removed when it grows too big.
+"""
+
+import os
+import sys
+import random
+import shutil
+import subprocess
+from hashlib import md5
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__),
+                                    '..', '..', '..'))
+import py
+
+from rpython.tool.runsubprocess import run_subprocess
+from rpython.tool.gcc_cache import try_atomic_write
+from rpython.tool.ansi_print import AnsiLogger
+
+log = AnsiLogger("objcache")
+
+# the cache used by Platform.compile(), or None
+object_cache = None
+
+# how many entries are stored between two checks of the total size
+EVICT_CHECK_INTERVAL = 64
+
+
+def enable(directory=None, maxsize=512 * 1024 * 1024):
+    global object_cache
+    if directory is None:
+        from rpython.config.translationoption import CACHE_DIR
+        directory = py.path.local(CACHE_DIR).join('object_cache')
+    object_cache = ObjectCache(directory, maxsize)
+    return object_cache
+
+def disable():
+    global object_cache
+    object_cache = None
+
+def makefile_cc(cc):
+    """The CC of a Makefile: 'cc' itself, or 'cc' run through main() if
+    the cache is enabled."""
+    if object_cache is None:
+        return cc
+    return '%s %s %s %d %s' % (sys.executable, os.path.abspath(__file__),
+                               object_cache.directory,
+                               object_cache.maxsize, cc)
+
+def normalize(source, dirname):
+    """Remove the directory of the C file from the line markers of its
+    preprocessed source."""
+    return source.replace(str(dirname) + os.sep, '')
+
+
+class ObjectCache(object):
+    def __init__(self, directory, maxsize):
+        self.directory = py.path.local(directory).ensure(dir=1)
+        self.maxsize = maxsize
+        self.stored = 0
+        self.hits = 0
+        self.misses = 0
+        self._versions = {}
+
+    def compiler_version(self, cc):
+        try:
+            return self._versions[cc]
+        except KeyError:
+            pass
+        cclist = cc.split()
+        try:
+            returncode, stdout, stderr = run_subprocess(
+                cclist[0], cclist[1:] + ['--version'])
+        except OSError:
+            stdout = ''
+        self._versions[cc] = stdout
+        return stdout
+
+    def key(self, platform_key, cc, source, compile_args):
+        """'source' is the normalized preprocessed C file."""
+        m = md5()
+        m.update(platform_key)
+        m.update('\0%s\0%s\0' % (cc, self.compiler_version(cc)))
+        m.update('\0'.join(compile_args))
+        m.update('\0')
+        m.update(source)
+        return m.hexdigest()
+
+    def get(self, key, ofile):
+        """Copy the cached object file to 'ofile' and return True if
+        there is one."""
+        path = self.directory.join(key + '.o')
+        try:
+            shutil.copyfile(str(path), str(ofile))
+            os.utime(str(path), None)      # recently used
+        except (IOError, OSError):
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def put(self, key, ofile):
+        path = self.directory.join(key + '.o')
+        try_atomic_write(path, ofile.read('rb'))
+        self.stored += 1
+        if self.stored % EVICT_CHECK_INTERVAL == 1:
+            self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache is
+        below 3/4 of its maximum size."""
+        entries = []
+        total = 0
+        for path in self.directory.listdir('*.o'):
+            try:
+                st = path.stat()
+            except py.error.Error:
+                continue
+            entries.append((st.mtime, st.size, path))
+            total += st.size
+        if total <= self.maxsize:
+            return
+        entries.sort()
+        goal = self.maxsize * 3 // 4
+        removed = 0
+        for mtime, size, path in entries:
+            if total <= goal:
+                break
+            try:
+                path.remove()
+            except py.error.Error:
+                continue
+            total -= size
+            removed += 1
+        log.info('removed %d old object files from %s' % (removed,
+                                                          self.directory))
+
+
+def main(argv):
+    """Run as the CC of a Makefile: 'objcache.py directory maxsize cc args'.
+    Compiling a single C file goes through the cache, everything else
+    (linking, assembler files, dependency generation) runs unchanged."""
+    directory, maxsize = argv[1], int(argv[2])
+    command = argv[3:]
+    args = command[1:]
+    sources = [arg for arg in args if arg.endswith('.c')]
+    if ('-c' not in args or '-o' not in args or len(sources) != 1 or
+            [arg for arg in args if arg.startswith('-M')]):
+        return subprocess.call(command)
+    cfile = sources[0]
+    ofile = args[args.index('-o') + 1]
+    ifile = os.path.splitext(ofile)[0] + '.i'
+    def replace(old, new):
+        return [new if arg == old else arg for arg in command]
+    preprocess = replace('-c', '-E')
+    preprocess[preprocess.index(ofile)] = ifile
+    if subprocess.call(preprocess) != 0:
+        return subprocess.call(command)
+    cache = ObjectCache(directory, maxsize)
+    # a single store per process: check the size as often on average
+    cache.stored = random.randrange(EVICT_CHECK_INTERVAL)
+    f = open(ifile, 'r')
+    try:
+        source = normalize(f.read(), os.path.dirname(os.path.abspath(cfile)))
+    finally:
+        f.close()
+    key = cache.key('make', command[0], source, args)
+    if cache.get(key, py.path.local(ofile)):
+        return 0
+    returncode = subprocess.call(replace(cfile, ifile))
+    if returncode == 0:
+        cache.put(key, py.path.local(ofile))
+    return returncode
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
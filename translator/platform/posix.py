@@ -3,6 +3,7 @@
 import py, os, sys
 
 from rpython.translator.platform import Platform, log, _run_subprocess
+from rpython.translator.platform import objcache
 from rpython.config.support import detect_pax
 
 import rpython
@@ -42,6 +43,17 @@ class BasePosix(Platform):
                                  cwd=str(cfile.dirpath()))
         return oname
 
+    def _preprocess_c_file(self, cc, cfile, compile_args):
+        ifile = self._make_o_file(cfile, ext='i')
+        cclist = cc.split()
+        args = cclist[1:] + ['-E'] + compile_args + [str(cfile),
+                                                     '-o', str(ifile)]
+        returncode, stdout, stderr = _run_subprocess(
+            cclist[0], args, self.c_environ, str(cfile.dirpath()))
+        if returncode != 0:
+            return None
+        return ifile
+
     def _link_args_from_eci(self, eci, standalone):
         return Platform._link_args_from_eci(self, eci, standalone)
 
@@ -185,7 +197,7 @@ class BasePosix(Platform):
             ('LDFLAGS', linkflags),
             ('LDFLAGS_LINK', list(self.link_flags)),
             ('LDFLAGSEXTRA', list(eci.link_extra)),
-            ('CC', self.cc),
+            ('CC', objcache.makefile_cc(self.cc)),
             ('CC_LINK', eci.use_cpp_linker and 'g++' or '$(CC)'),
             ('LINKFILES', eci.link_files),
             ('RPATH_FLAGS', self.get_rpath_flags(rel_libdirs)),
@@ -290,6 +302,13 @@ class Comment(object):
     def write(self, f):
         f.write('# %s\n' % (self.body,))
 
+class Include(object):
+    def __init__(self, pattern):
+        self.pattern = pattern
+
+    def write(self, f):
+        f.write('-include %s\n' % (self.pattern,))
+
 class GnuMakefile(object):
     def __init__(self, path=None):
         self.defs = {}
@@ -323,6 +342,9 @@ class GnuMakefile(object):
     def comment(self, body):
         self.lines.append(Comment(body))
 
+    def include(self, pattern):
+        self.lines.append(Include(pattern))
+
     def write(self, out=None):
         if out is None:
             f = self.makefile_dir.join('Makefile').open('w')
@@ -0,0 +1,70 @@
+import os
+import py
+from rpython.tool.udir import udir
+from rpython.translator.platform import host, objcache
+from rpython.translator.tool.cbuild import ExternalCompilationInfo
+
+
+def compile_and_run(cfile):
+    executable = host.compile([cfile], ExternalCompilationInfo())
+    return host.execute(executable).out
+
+def test_reuse_object_files():
+    tmpdir = udir.join('test_objcache').ensure(dir=1)
+    cache = objcache.enable(tmpdir.join('cache'))
+    try:
+        for i, dirname in enumerate(['session1', 'session2']):
+            cfile = tmpdir.join(dirname).ensure(dir=1).join('main.c')
+            cfile.write('''
+            #include <stdio.h>
+            int main() { printf("42\\n"); return 0; }
+            ''')
+            assert compile_and_run(cfile) == '42\n'
+        if cache.hits == 0:
+            assert host._preprocess_c_file(host.cc, cfile, []) is None
+            return      # not supported on this platform
+        assert (cache.hits, cache.misses) == (1, 1)
+        # a different source is compiled again
+        cfile.write('''
+        #include <stdio.h>
+        int main() { printf("43\\n"); return 0; }
+        ''')
+        assert compile_and_run(cfile) == '43\n'
+        assert (cache.hits, cache.misses) == (1, 2)
+    finally:
+        objcache.disable()
+
+def test_evict_least_recently_used():
+    cache = objcache.ObjectCache(udir.join('test_objcache_evict'), 2500)
+    ofile = udir.join('test_objcache_evict.o')
+    ofile.write('x' * 1000)
+    for i, key in enumerate(['a', 'b', 'c']):
+        cache.put(key, ofile)
+        os.utime(str(cache.directory.join(key + '.o')), (i, i))
+    assert cache.get('a', udir.join('test_objcache_copy.o'))
+    cache.evict()
+    names = sorted([path.basename for path in cache.directory.listdir()])
+    assert names == ['a.o']
+
+def test_makefile_build():
+    if host.name == 'msvc':
+        py.test.skip("the Makefile hook is only for POSIX platforms")
+    tmpdir = udir.join('test_objcache_makefile').ensure(dir=1)
+    cache = objcache.enable(tmpdir.join('cache'))
+    try:
+        for dirname in ['session1', 'session2']:
+            sessiondir = tmpdir.join(dirname).ensure(dir=1)
+            cfile = sessiondir.join('main.c')
+            cfile.write('''
+            #include <stdio.h>
+            int main() { printf("42\\n"); return 0; }
+            ''')
+            mk = host.gen_makefile([cfile], ExternalCompilationInfo(),
+                                   path=sessiondir)
+            mk.write()
+            host.execute_makefile(mk)
+            res = host.execute(mk.exe_name)
+            assert res.out == '42\n'
+        assert len(cache.directory.listdir('*.o')) == 1
+    finally:
+        objcache.disable()
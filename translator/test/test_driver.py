@@ -90,3 +90,37 @@ def test_shutil_copy():
     a.write('hello')
     shutil_copy(str(a), str(b))
     assert b.read() == 'hello'
+
+def checkpoint_entry_point(n):
+    return n * 3
+
+def test_checkpoint_resume():
+    entry_point = checkpoint_entry_point
+    checkpoint_dir = udir.join('test_checkpoint_resume')
+    td = TranslationDriver(overrides={
+        'translation.checkpoint_dir': str(checkpoint_dir)})
+    td.setup(entry_point, [int])
+    td.proceed(['rtype'])
+    assert checkpoint_dir.join('annotate.checkpoint').check()
+    assert checkpoint_dir.join('rtype_lltype.checkpoint').check()
+
+    td = TranslationDriver(overrides={
+        'translation.checkpoint_dir': str(checkpoint_dir),
+        'translation.resume_from': 'rtype'})
+    td.setup(entry_point, [int])
+    assert 'rtype_lltype' in td.done
+    assert td.translator.config is td.config
+    graph = td.translator.graphs[0]
+    assert graph.func is entry_point
+    assert graph.getreturnvar().concretetype.__name__ == 'Signed'
+    td.proceed(['backendopt'])
+    assert 'backendopt_lltype' in td.done
+    assert checkpoint_dir.join('backendopt_lltype.checkpoint').check()
+
+def test_checkpoint_set_cell():
+    from rpython.translator.goal.checkpoint import _make_cell, _set_cell
+    cell = _make_cell()
+    _set_cell(cell, 42)
+    assert cell.cell_contents == 42
+    _set_cell(cell, cell)
+    assert cell.cell_contents is cell
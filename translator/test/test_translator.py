@@ -12,3 +12,52 @@ def test_example():
     t.buildflowgraph(example)
     # this specific example triggered a bug in simplify.py
     #t.view()
+
+def parallel_helper(x):
+    if x < 0:
+        raise ValueError
+    return x * 2 + 1
+
+def parallel_other(x):
+    try:
+        return parallel_helper(x) - 3
+    except ValueError:
+        return 0
+
+def parallel_main(n):
+    total = 0
+    for i in range(-2, n):
+        total += parallel_other(i)
+    return total
+
+def test_parallel_flow():
+    from rpython.rtyper.llinterp import LLInterpreter
+    t = TranslationContext()
+    t.start_parallel_flow(2)
+    t.parallel_flow.wait = 60.0
+    try:
+        a = t.buildannotator()
+        a.build_types(parallel_main, [int])
+        hits = t.parallel_flow.hits
+    finally:
+        t.stop_parallel_flow()
+    assert t.parallel_flow is None
+    assert hits == 2
+    # the graphs built by the workers go through the rest of the pipeline
+    t.buildrtyper().specialize()
+    interp = LLInterpreter(t.rtyper)
+    assert interp.eval_graph(t.graphs[0], [10]) == parallel_main(10)
+
+def test_parallel_flow_stale_globals():
+    from rpython.translator import parallelflow
+    def f(x):
+        return parallel_helper(x)
+    reads = parallelflow.read_globals(f)
+    assert ('global', 'parallel_helper', parallel_helper) in reads
+    assert parallelflow.globals_unchanged(f, reads)
+    saved = f.func_globals['parallel_helper']
+    f.func_globals['parallel_helper'] = parallel_other
+    try:
+        assert not parallelflow.globals_unchanged(f, reads)
+    finally:
+        f.func_globals['parallel_helper'] = saved
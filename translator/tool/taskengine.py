@@ -1,3 +1,10 @@
+import os
+import sys
+import signal
+import time
+import traceback
+
+
 class SimpleTaskEngine(object):
     def __init__(self):
         self._plan_cache = {}
@@ -81,6 +88,24 @@ class SimpleTaskEngine(object):
 
         return plan
 
+    def _schedule(self, goals, skip=[]):
+        """Group the plan into waves: a task only depends on tasks of the
+        previous waves, so the tasks of a wave can run at the same time."""
+        waves = []
+        wave_of = {}
+        for goal in self._plan(goals, skip=skip):
+            taskcallable, deps = self.tasks[goal]
+            level = 0
+            for dep in deps:
+                dep = dep.lstrip('?')
+                if dep in wave_of:
+                    level = max(level, wave_of[dep] + 1)
+            wave_of[goal] = level
+            if level == len(waves):
+                waves.append([])
+            waves[level].append(goal)
+        return waves
+
     def _depending_on(self, goal):
         l = []
         for task_name, (task, task_deps) in self.tasks.iteritems():
@@ -103,28 +128,103 @@ class SimpleTaskEngine(object):
     def _execute(self, goals, *args, **kwds):
         task_skip = kwds.get('task_skip', [])
         res = None
-        goals = self._plan(goals, skip=task_skip)
-        for goal in goals:
+        plan = self._plan(goals, skip=task_skip)
+        for goal in plan:
             taskcallable, _ = self.tasks[goal]
             self._event('planned', goal, taskcallable)
-        for goal in goals:
-            taskcallable, _ = self.tasks[goal]
-            self._event('pre', goal, taskcallable)
+        if not self._can_fork():
+            for goal in plan:
+                res = self._run(goal, *args, **kwds)
+            return res
+        for wave in self._schedule(goals, skip=task_skip):
+            # the tasks that don't change the state run in forked processes
+            # while the others run here, one after the other
+            forked = []
+            if len(wave) > 1:
+                for goal in wave:
+                    taskcallable, _ = self.tasks[goal]
+                    if getattr(taskcallable, 'task_forkable', False):
+                        forked.append(self._fork(goal, *args, **kwds))
             try:
-                res = self._do(goal, taskcallable, *args, **kwds)
-            except (SystemExit, KeyboardInterrupt):
-                raise
+                for goal in wave:
+                    if goal not in [child[0] for child in forked]:
+                        res = self._run(goal, *args, **kwds)
             except:
-                self._error(goal)
+                for goal, pid, read_fd in forked:
+                    os.kill(pid, signal.SIGTERM)
+                    os.waitpid(pid, 0)
+                    os.close(read_fd)
                 raise
-            self._event('post', goal, taskcallable)
+            # reap all the children even if one of them failed
+            error = None
+            for child in forked:
+                try:
+                    self._join(*child)
+                except Exception:
+                    if error is None:
+                        error = sys.exc_info()
+            if error is not None:
+                raise error[0], error[1], error[2]
+        return res
+
+    def _run(self, goal, *args, **kwds):
+        taskcallable, _ = self.tasks[goal]
+        self._event('pre', goal, taskcallable)
+        try:
+            res = self._do(goal, taskcallable, *args, **kwds)
+        except (SystemExit, KeyboardInterrupt):
+            raise
+        except:
+            self._error(goal)
+            raise
+        self._event('post', goal, taskcallable)
         return res
 
+    def _fork(self, goal, *args, **kwds):
+        taskcallable, _ = self.tasks[goal]
+        self._event('pre', goal, taskcallable)
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            status = 1
+            try:
+                start = time.time()
+                self._do(goal, taskcallable, *args, **kwds)
+                os.write(write_fd, '%f' % (time.time() - start,))
+                status = 0
+            except:
+                traceback.print_exc()
+            finally:
+                os._exit(status)
+        os.close(write_fd)
+        return goal, pid, read_fd
+
+    def _join(self, goal, pid, read_fd):
+        f = os.fdopen(read_fd, 'r')
+        try:
+            elapsed = f.read()
+        finally:
+            f.close()
+        _, status = os.waitpid(pid, 0)
+        taskcallable, _ = self.tasks[goal]
+        if status != 0:
+            self._error(goal)
+            raise Exception("task %r failed in a forked process" % (goal,))
+        self._forked_done(goal, float(elapsed))
+        self._event('post', goal, taskcallable)
+
     def _do(self, goal, func, *args, **kwds):
         return func()
 
     def _event(self, kind, goal, func):
         pass
 
+    def _can_fork(self):
+        return False
+
+    def _forked_done(self, goal, elapsed):
+        pass
+
     def _error(self, goal):
         pass
@@ -148,3 +148,129 @@ def test_driver():
     assert drv._plan(['D', 'T', 'R']) == ['A', 'R', 'b', 'H', 'T', 'B', 'D']
     assert drv._plan(['D', 'T']) == ['A', 'R', 'b', 'H', 'T', 'B', 'D']
     assert drv._plan(['D', 'T'], skip=['B']) == ['A', 'R', 'b', 'H', 'T', 'D']
+
+def test_schedule():
+    class ABC(SimpleTaskEngine):
+
+        def task_A(self):
+            pass
+        task_A.task_deps = ['B', '?C']
+
+        def task_B(self):
+            pass
+
+        def task_C(self):
+            pass
+        task_C.task_deps = ['B']
+
+        def task_D(self):
+            pass
+        task_D.task_deps = ['B', '??E']
+
+        def task_E(self):
+            pass
+
+    def schedule(goals, skip=[]):
+        return [sorted(wave) for wave in abc._schedule(goals, skip)]
+
+    abc = ABC()
+    assert schedule(['B']) == [['B']]
+    assert schedule(['A']) == [['B'], ['C'], ['A']]
+    assert schedule(['A'], skip=['C']) == [['B'], ['A']]
+    assert schedule(['A', 'D']) == [['B'], ['C', 'D'], ['A']]
+    assert schedule(['D', 'E']) == [['B', 'E'], ['D']]
+
+def test_execute_forked():
+    import os
+    from rpython.tool.udir import udir
+    marker = udir.join('test_execute_forked')
+
+    class ABC(SimpleTaskEngine):
+
+        def __init__(self):
+            SimpleTaskEngine.__init__(self)
+            self.done = []
+            self.forked = []
+
+        def task_A(self):
+            self.done.append('A')
+        task_A.task_deps = ['B', 'C']
+
+        def task_B(self):
+            self.done.append('B')
+
+        def task_C(self):
+            marker.write(str(os.getpid()))
+            self.done.append('C')
+        task_C.task_deps = ['B']
+        task_C.task_forkable = True
+
+        def task_D(self):
+            self.done.append('D')
+        task_D.task_deps = ['B']
+
+        def _can_fork(self):
+            return True
+
+        def _forked_done(self, goal, elapsed):
+            assert elapsed >= 0.0
+            self.forked.append(goal)
+
+    abc = ABC()
+    abc._execute(['A', 'D'])
+    assert abc.done == ['B', 'D', 'A']
+    assert abc.forked == ['C']
+    assert int(marker.read()) != os.getpid()
+
+    # alone in its wave, it runs here
+    abc = ABC()
+    abc._execute(['C'])
+    assert abc.done == ['B', 'C']
+    assert abc.forked == []
+
+def test_execute_forked_failure():
+    import os, errno, py
+
+    class ABC(SimpleTaskEngine):
+
+        def __init__(self):
+            SimpleTaskEngine.__init__(self)
+            self.errors = []
+
+        def task_A(self):
+            pass
+        task_A.task_deps = ['B', 'C', 'D']
+
+        def task_B(self):
+            pass
+
+        def task_C(self):
+            raise ValueError
+        task_C.task_deps = ['B']
+        task_C.task_forkable = True
+
+        def task_D(self):
+            pass
+        task_D.task_deps = ['B']
+        task_D.task_forkable = True
+
+        def _can_fork(self):
+            return True
+
+        def _fork(self, goal, *args, **kwds):
+            child = SimpleTaskEngine._fork(self, goal, *args, **kwds)
+            self.pids.append(child[1])
+            return child
+
+        def _error(self, goal):
+            self.errors.append(goal)
+
+    abc = ABC()
+    abc.pids = []
+    py.test.raises(Exception, abc._execute, ['A'])
+    assert abc.errors == ['C']
+    # the child that ran D was reaped too
+    assert len(abc.pids) == 2
+    for pid in abc.pids:
+        e = py.test.raises(OSError, os.waitpid, pid, os.WNOHANG)
+        assert e.value.errno == errno.ECHILD
@@ -38,6 +38,7 @@ class TranslationContext(object):
         self.graphs = []      # [graph]
         self.callgraph = {}   # {opaque_tag: (caller-graph, callee-graph)}
         self._prebuilt_graphs = {}   # only used by the pygame viewer
+        self.parallel_flow = None     # see start_parallel_flow()
         self._call_at_startup = []
 
     def buildflowgraph(self, func, mute_dot=False):
@@ -50,15 +51,33 @@ class TranslationContext(object):
         else:
             if self.config.translation.verbose:
                 log(nice_repr_for_func(func))
-            graph = build_flow(func)
-            simplify.simplify_graph(graph)
-            if self.config.translation.list_comprehension_operations:
-                simplify.detect_list_comprehension(graph)
+            graph = None
+            if self.parallel_flow is not None:
+                graph = self.parallel_flow.get(func)
+            if graph is None:
+                graph = build_flow(func)
+                simplify.simplify_graph(graph)
+                if self.config.translation.list_comprehension_operations:
+                    simplify.detect_list_comprehension(graph)
+            if self.parallel_flow is not None:
+                self.parallel_flow.prefetch_callees(graph)
             if not self.config.translation.verbose and not mute_dot:
                 log.dot()
             self.graphs.append(graph)   # store the graph in our list
         return graph
 
+    def start_parallel_flow(self, processes):
+        """Fork workers that build the flow graphs of the functions called
+        by every new graph ahead of time (experimental)."""
+        from rpython.translator.parallelflow import ParallelFlowBuilder
+        if self.parallel_flow is None:
+            self.parallel_flow = ParallelFlowBuilder(self.config, processes)
+
+    def stop_parallel_flow(self):
+        if self.parallel_flow is not None:
+            self.parallel_flow.stop()
+            self.parallel_flow = None
+
     def update_call_graph(self, caller_graph, callee_graph, position_tag):
         # update the call graph
         key = caller_graph, callee_graph, position_tag
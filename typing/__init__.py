@@ -61,16 +61,26 @@ def adapt_object_to_field(type):
     #    return
     raise Exception('Cannot determine type')
 
+#Primitive fields are read together through Object.get_many, one letter per field
+batch_kinds = {str: 's', int: 'i', float: 'f', bool: 'b'}
+
 def configure_object(object):
     loads = object_loads_template
     indent = ' ' * 4
     count = 0
     namespace = {}
     import os
+    batch_keys = [key for key in object.structure if isclass(object.structure[key]) and object.structure[key] in batch_kinds]
+    if batch_keys:
+        loads += '\n' + indent + 'batch = values.get_many(' + repr(batch_keys) + ", '" + ''.join([batch_kinds[object.structure[key]] for key in batch_keys]) + "')"
     for key in object.structure:
         count += 1
         field = object.structure[key]
-        if field == JSObjectInstance:
+        if key in batch_keys:
+            getter = {'s': 'toString', 'i': 'toInteger', 'f': 'toFloat', 'b': 'toBoolean'}[batch_kinds[field]]
+            index = str(batch_keys.index(key))
+            loads += '\n' + indent + 'if batch.defined(' + index + '): self.' + key + ' = batch.' + getter + '(' + index + ')'
+        elif field == JSObjectInstance:
             loads += '\n' + indent + "self." + key + " = values.unsafe_get_item('" + key  + "')"
         elif isclass(field) and issubclass(field, JSObject):
             variable = 'class_' + str(count)
@@ -158,6 +168,9 @@ if os.getenv('RPY_USE_EMSCRIPTEN') == 'true':
     JSObjectEmscripten.fromBool = javascript.toBool
     JSObjectEmscripten.fromList = javascript.toList
     JSObjectEmscripten.fromDict = javascript.toDict
+    JSObjectEmscripten.fromListInteger = javascript.toListInteger
+    JSObjectEmscripten.fromListFloat = javascript.toListFloat
+    JSObjectEmscripten.fromBytes = javascript.toBytes
     JSObjectEmscripten.fromFunction = javascript.toFunction
     JSObjectEmscripten.createClosure = javascript.create_closure
     JSObjectEmscripten.get = javascript.unsafe_global_get